@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+__doc__ = ''' Coroutine (asyncio) API of the pyxf backends, Python 3.7 or later
+ by the pyxf contributors, 2026
+
+ The classes in this module are mixed into the backends of pyxf.pyxf
+ and pyxf.datalog, which import them on Python 3 only, so both keep
+ working on Python 2. They add aquery(), aquery_batch(), aload(), aloadfacts() and
+ aclose() to every backend (and aaddfacts() to flora2); aspawn starts an
+ engine from asyncio code. After a goal is written the engine output is
+ read without blocking until the answer is complete, and the synchronous
+ parsers of pyxf.pyxf then read it from the pexpect buffer.
+
+ This library is free software; you can redistribute it and/or
+ modify it under the terms of the GNU Lesser General Public
+ License as published by the Free Software Foundation; either
+ version 2.1 of the License, or (at your option) any later version.'''
+
+import asyncio
+import os
+import re
+import time
+
+import pexpect as px
+
+
+class _aprepared:
+    '''Private mixin with the coroutines of PreparedQuery.'''
+    async def aquery(self, *args):
+        '''Coroutine counterpart of query()
+        Usage: await instance.aquery( *args )'''
+        item = self.bind(*args)
+        engine = self.engine
+        async with engine._alock():
+            return await engine._awithin('query', item[0], None, engine._acached, item[0], lambda query: engine._arun(item))
+
+    async def aquery_batch(self, rows):
+        '''Coroutine counterpart of query_batch()
+        Usage: await instance.aquery_batch( rows )'''
+        async with self.engine._alock():
+            return await self._aquery_batch(rows)
+
+    async def _aquery_batch(self, rows):
+        '''Private coroutine running aquery_batch() with the engine lock held.'''
+        engine = self.engine
+        if engine.observer is not None and engine._probe is None:
+            return await engine._aobserved('query_batch', str(len(rows)) + ' rows of ' + self.template, self._aquery_batch, rows)
+        return await engine._abatch_items([self.bind(*row) for row in rows])
+
+
+class _abackend:
+    '''Private mixin with the coroutines shared by all backends.'''
+    _alocked = None  # ( event loop, asyncio.Lock ), see _alock()
+
+    async def _aobserved(self, kind, text, call, *args):
+        '''Private coroutine counterpart of _observed().'''
+        probe = self._begin(kind, text)
+        start = time.time()
+        result = None
+        try:
+            result = await call(*args)
+            return result
+        except Exception as e:
+            probe.error = e
+            raise
+        finally:
+            self._probe = None
+            self._report(probe, start, result)
+
+    async def _areadable(self):
+        '''Private coroutine waiting until the engine has output to read.
+
+        Raises: pexpect.TIMEOUT'''
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        fd = self.engine.child_fd
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await asyncio.wait_for(ready, self._wait())
+        except asyncio.TimeoutError:
+            raise px.TIMEOUT('Timeout exceeded.')
+        finally:
+            loop.remove_reader(fd)
+
+    async def _afill(self, ends, record=None):
+        '''Private coroutine reading engine output into the pexpect buffer without blocking.
+        Usage: await instance._afill( ends, record )
+        ends - list of regexes that have to appear in the output, in order
+        record - sentinel of _prolog records, if given ends are only looked
+          for at the start of lines outside of records, as _lines() does
+          (default: None)
+
+        Once it returns, the synchronous methods reading the answer find
+        everything they need in the buffer and never wait for the engine.
+        Without record only the last self.window bytes of old output are
+        searched again after every read.'''
+        data = bytearray(self.engine.buffer)
+        pos = scan = 0
+        inside = False  # within a record at the start of the line at pos, see record
+        for end in ends:
+            end = re.compile(end.encode('utf-8'))
+            while True:
+                if record is None:
+                    match = end.search(data, max(pos, scan))
+                    if match:
+                        pos = scan = match.end()
+                        break
+                    scan = max(pos, len(data) - self.window)
+                else:
+                    match = None if inside else end.match(data, pos)
+                    if match:
+                        pos = match.end()
+                        break
+                    nl = data.find(b'\n', pos)
+                    if nl >= 0:
+                        inside = self._inside(data[pos:nl].decode('utf-8', 'replace'), record, inside)
+                        pos = nl + 1
+                        continue
+                start = time.time()
+                await self._areadable()
+                if self._probe is not None:
+                    self._probe.read += time.time() - start
+                data += self._recv(0)
+        self._unread(bytes(data))
+
+    def _alock(self):
+        '''Private method returning the asyncio.Lock that keeps the coroutines of the running event loop from using the engine at the same time.'''
+        loop = asyncio.get_running_loop()
+        if self._alocked is None or self._alocked[0] is not loop:
+            self._alocked = (loop, asyncio.Lock())
+        return self._alocked[1]
+
+    async def aquery(self, query, timeout=None, decode=None, resultset=False, limit=None, offset=0):
+        '''Coroutine counterpart of query()
+        Usage: await instance.aquery( query, timeout, decode, resultset, limit, offset )
+        Arguments are those of query().
+
+        The engine is read without blocking, so one event loop can drive
+        many engines at once without threads. Coroutines sharing an engine
+        take turns. A query that exceeds its deadline is interrupted as in
+        query(), with the recovery running in the default executor.
+
+        Returns: see query()'''
+        options = self._options(decode, resultset, limit, offset)
+        async with self._alock():
+            return await self._awithin('query', query, timeout, self._acached, self._terminate(query), self._aquery, *options)
+
+    async def _awithin(self, kind, text, timeout, call, *args):
+        '''Private coroutine counterpart of _within().'''
+        if self.observer is not None and self._probe is None:
+            return await self._aobserved(kind, text, self._awithin, kind, text, timeout, call, *args)
+        if timeout is None:
+            return await call(*args)
+        self._deadline = time.time() + timeout
+        try:
+            return await call(*args)
+        except px.TIMEOUT:
+            self._deadline = None
+            action = await asyncio.get_running_loop().run_in_executor(None, self._recover)
+            raise self._expired(kind, text, timeout, action)
+        finally:
+            self._deadline = None
+
+    async def _acached(self, query, run, *args):
+        '''Private coroutine counterpart of _cached().'''
+        if self.cache is None:
+            return await run(query, *args)
+        if self._updates(query):
+            try:
+                return await run(query, *args)
+            finally:
+                self._invalidate()
+        key = self.cache.key(query)
+        if args:
+            key = (key,) + args
+        hit, result = self.cache.get(key)
+        if not hit:
+            result = await run(query, *args)
+            self.cache.put(key, result)
+        return self._copy(result, bool(args) and args[0] is not None)
+
+    async def _aquery(self, query, decode=None, resultset=False, page=None):
+        '''Private coroutine counterpart of _query().'''
+        if decode is None and not resultset and page is None:
+            return await self._arun(self._items([query])[0])
+        columns = self._columns(self._variables(query), decode)
+        return self._decoded(await self._arun(self._items([query], columns, page)[0], columns, resultset, page), columns)
+
+    async def _arun(self, item, columns=(), resultset=False, page=None):
+        '''Private coroutine counterpart of _run(): the whole answer is in the buffer before _reply() parses it.'''
+        self._write([item])
+        await self._afill(self._ends([item]), self._record)
+        return self._reply(item, columns, resultset, page)
+
+    async def aquery_batch(self, queries):
+        '''Coroutine counterpart of query_batch()
+        Usage: await instance.aquery_batch( queries )
+
+        Returns: see query_batch()'''
+        async with self._alock():
+            return await self._aquery_batch(queries)
+
+    async def _aquery_batch(self, queries):
+        '''Private coroutine running aquery_batch() with the engine lock held.'''
+        if self.observer is not None and self._probe is None:
+            return await self._aobserved('query_batch', str(len(queries)) + ' queries', self._aquery_batch, queries)
+        return await self._abatch_items(self._items([self._terminate(q) for q in queries]))
+
+    async def _abatch_items(self, items):
+        '''Private coroutine counterpart of _batch_items().'''
+        if self.cache is not None:
+            queries = [item[0] for item in items]
+            results, missing = self._lookup(queries)
+            answers = await self._arun_items([items[i] for i in missing])
+            return self._store(queries, results, missing, answers)
+        return await self._arun_items(items)
+
+    async def _arun_items(self, items):
+        '''Private coroutine counterpart of _run_items().'''
+        results = []
+        for group in self._groups(items):
+            self._write(group)
+            await self._afill(self._ends(group), self._record)
+            results.extend(self._read(group))
+        return results
+
+    async def aload(self, module):
+        '''Coroutine counterpart of load()
+        Usage: await instance.aload( path )'''
+        async with self._alock():
+            await self._aload(module)
+
+    async def _aload(self, module):
+        '''Private coroutine running aload() with the engine lock held.'''
+        self._sendline("['" + module + "'].")
+        await self._afill([self.prompt])
+        self._loaded(module)
+
+    async def aclose(self):
+        '''Coroutine counterpart of close()
+        Usage: await instance.aclose()'''
+        async with self._alock():
+            await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+class _aprolog:
+    '''Private mixin with the coroutines of the Prolog backends (xsb, swipl and eclipse).'''
+    async def _aload(self, module):
+        '''Private coroutine running aload() with the engine lock held.
+        With self.compiled set the module is loaded in the default executor.'''
+        if self.compiled is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._load_compiled, module)
+            return
+        await _abackend._aload(self, module)
+
+    async def aloadfacts(self, facts, predicate=None, progress=None):
+        '''Coroutine counterpart of loadfacts()
+        Usage: await instance.aloadfacts( facts, predicate, progress )'''
+        path, count = self._dump(self._facts(facts, predicate, progress), '.P')
+        try:
+            await self.aquery(self._consult(path))
+        finally:
+            os.remove(path)
+        if progress is not None:
+            progress(count)
+        return count
+
+
+class _aflora2:
+    '''Private mixin with the coroutines of the flora2 backend.'''
+    async def aloadfacts(self, facts, predicate=None, progress=None):
+        '''Coroutine counterpart of loadfacts()
+        Usage: await instance.aloadfacts( facts, predicate, progress )'''
+        count = 0
+        commands, command = [], []
+        size = 0
+        for fact in self._facts(facts, predicate, progress):
+            if command and size + len(fact) > self.batchsize:
+                commands.append('insert{' + ','.join(command) + '}.')
+                command, size = [], 0
+            command.append(fact)
+            size += len(fact) + 1
+            count += 1
+            if len(commands) == 64:
+                await self._ainsert(commands)
+                commands = []
+        if command:
+            commands.append('insert{' + ','.join(command) + '}.')
+        await self._ainsert(commands)
+        if progress is not None:
+            progress(count)
+        return count
+
+    async def aaddfacts(self, facts):
+        '''Coroutine counterpart of addfacts()
+        Usage: await instance.aaddfacts( facts )
+
+        Raises Flora2FactError on error inserting fact.'''
+        await self._ainsert(['insert{' + f + '}.' for f in facts])
+
+    async def _ainsert(self, commands):
+        '''Private coroutine running insert commands and raising Flora2FactError if one fails.'''
+        self._inserted(commands, await self.aquery_batch(commands))
+
+
+class _ades:
+    '''Private mixin with the coroutines of the des backend.'''
+    async def _aload(self, module):
+        '''Private coroutine running aload() with the engine lock held.'''
+        self._sendline("/tapi /restore_ddb " + module)
+        await self._afill([self._tapiend])
+        self._loaded(module)
+
+    async def aloadfacts(self, facts, predicate=None, progress=None):
+        '''Coroutine counterpart of loadfacts()
+        Usage: await instance.aloadfacts( facts, predicate, progress )'''
+        path, count = self._dump(self._facts(facts, predicate, progress), '.dl')
+        try:
+            async with self._alock():
+                self._sendline('/tapi /reconsult ' + path)
+                await self._afill([self._tapiend])
+                self._reconsulted()
+        finally:
+            os.remove(path)
+        if progress is not None:
+            progress(count)
+        return count
+
+
+class aspawn:
+    '''Starts an engine for use from asyncio code
+    Usage: async with aspawn( backend, *args, **kwargs ) as engine: ...
+       or: engine = await aspawn( backend, *args, **kwargs )
+    backend - backend class (example: xsb, swipl, eclipse, flora2, des)
+    args, kwargs - passed to the backend constructor (path, args, ...)
+
+    The backend constructor, which waits for the first prompt, runs in the
+    default executor of the event loop; all further communication with
+    the engine (aquery(), aload(), ...) happens on the loop itself. Leaving
+    the context closes the engine.'''
+    def __init__(self, backend, *args, **kwargs):
+        self.backend = backend
+        self.args = args
+        self.kwargs = kwargs
+        self.instance = None
+
+    async def _start(self):
+        loop = asyncio.get_running_loop()
+        self.instance = await loop.run_in_executor(None, lambda: self.backend(*self.args, **self.kwargs))
+        return self.instance
+
+    def __await__(self):
+        return self._start().__await__()
+
+    async def __aenter__(self):
+        return await self._start()
+
+    async def __aexit__(self, *exc):
+        await self.instance.aclose()
+
+
+class _adatalog:
+    '''Private mixin with the coroutines of the in-process datalog engine, which never wait for I/O.'''
+    async def aquery(self, query, timeout=None, decode=None, resultset=False, limit=None, offset=0):
+        '''Coroutine counterpart of query()
+        Usage: await instance.aquery( query, timeout, decode, resultset, limit, offset )'''
+        return self.query(query, timeout, decode, resultset, limit, offset)
+
+    async def aquery_batch(self, queries):
+        '''Coroutine counterpart of query_batch()
+        Usage: await instance.aquery_batch( queries )'''
+        return self.query_batch(queries)
+
+    async def aload(self, module):
+        '''Coroutine counterpart of load()
+        Usage: await instance.aload( path )'''
+        self.load(module)
+
+    async def aloadfacts(self, facts, predicate=None, progress=None):
+        '''Coroutine counterpart of loadfacts()
+        Usage: await instance.aloadfacts( facts, predicate, progress )'''
+        return self.loadfacts(facts, predicate, progress)
+
+    async def aclose(self):
+        '''Coroutine counterpart of close()
+        Usage: await instance.aclose()'''
+        self.close()
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+__doc__ = ''' Benchmarks for pyxf
+ by the pyxf contributors, 2026
+
+ kb - synthetic knowledge bases in the dialect of every backend
+ fake - stand-in engine speaking the conventions of every backend, also used by the tests
+ run - benchmark scenarios, JSON results and comparisons
+
+ Usage: python -m pyxf.bench --backend xsb --output results.json
+        python -m pyxf.bench --backend xsb --compare results.json
+
+ This library is free software; you can redistribute it and/or
+ modify it under the terms of the GNU Lesser General Public
+ License as published by the Free Software Foundation; either
+ version 2.1 of the License, or (at your option) any later version.'''
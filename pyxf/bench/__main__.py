@@ -0,0 +1,3 @@
+from pyxf.bench.run import main
+
+main()
@@ -0,0 +1,2117 @@
+# -*- coding: utf-8 -*-
+__doc__ = ''' Stand-in engine speaking the conventions of the interpreters driven by pyxf
+ by the pyxf contributors, 2026
+
+ Usage: python fake.py [-x state] dialect [--nointerrupt] [--delay seconds]
+ dialect - xsb, swipl, eclipse, flora2 or des
+ --nointerrupt - ignore SIGINT, so an interrupted engine has to be restarted
+ --delay - seconds DES takes for every query it answers without /tapi
+ -x - saved state of SWI-Prolog to start from
+
+ XSB, SWI-Prolog, ECLiPSe, Flora-2 and DES are not available where the
+ tests and benchmarks run, so this is a small Prolog interpreter: goals
+ are parsed with the standard operator table and run by a backtracking
+ solver with cut, if-then-else, negation, catch/throw, the dynamic
+ database and the builtins pyxf uses (global variables and counters,
+ streams, statistics, limit/2 and offset/2). Clauses are indexed on an
+ atomic first argument, so the benchmark knowledge bases are searched
+ quickly. It deliberately imports nothing from pyxf, so it starts
+ quickly and runs from any directory.
+
+ The interpreter sits behind the toplevel of the dialect, which behaves
+ like the real one where pyxf depends on it: on a terminal it writes the
+ prompt of the dialect (without a terminal none at all), errors are
+ written in the format of the dialect, an interrupt asks the question of
+ the dialect, and after a solution that leaves named variables bound it
+ writes their bindings and waits for ';' or a newline before writing the
+ next prompt. A goal sent by pyxf that leaves bindings behind therefore
+ makes pyxf wait for a prompt, as with the real engines.
+
+ For Flora-2 the reader takes ?x for variables and turns F-logic frames
+ like john[likes->?y] into likes(john, ?y); insert{}, delete{} and their
+ transactional t_ forms update the database. For DES the same
+ interpreter evaluates Datalog queries and commands of the textual API
+ (/tapi, /assert, /output, /csv, /restore_ddb, /test_tapi), and select *
+ from relations declared with type/1.
+
+ This library is free software; you can redistribute it and/or
+ modify it under the terms of the GNU Lesser General Public
+ License as published by the Free Software Foundation; either
+ version 2.1 of the License, or (at your option) any later version.'''
+
+import functools
+import io
+import os
+import re
+import shutil
+import signal
+import sys
+import time
+
+
+class Var(object):
+    '''Logical variable, bound when ref is set.'''
+    __slots__ = ('ref', 'id')
+    count = 0
+
+    def __init__(self):
+        Var.count += 1
+        self.id = Var.count
+        self.ref = None
+
+
+class Atom(object):
+    '''Atom, one instance per name, so atoms are compared by identity.'''
+    __slots__ = ('name',)
+    table = {}
+
+    def __new__(cls, name):
+        atom = cls.table.get(name)
+        if atom is None:
+            atom = cls.table[name] = object.__new__(cls)
+            atom.name = name
+        return atom
+
+
+class Struct(object):
+    '''Compound term.'''
+    __slots__ = ('name', 'args')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = tuple(args)
+
+
+NIL = Atom('[]')
+TRUE = Atom('true')
+EOF = Atom('end_of_file')
+
+
+class PrologError(Exception):
+    '''Exception thrown by throw/1 or a builtin, term is the ball.'''
+    def __init__(self, term):
+        Exception.__init__(self)
+        self.term = term
+
+
+class Cut(Exception):
+    '''Raised when backtracking into a cut, caught by the call it belongs to.'''
+    def __init__(self, barrier):
+        Exception.__init__(self)
+        self.barrier = barrier
+
+
+class Halt(Exception):
+    '''Raised by halt/0,1.'''
+    def __init__(self, code=0):
+        Exception.__init__(self)
+        self.code = code
+
+
+def deref(t):
+    while type(t) is Var and t.ref is not None:
+        t = t.ref
+    return t
+
+
+def mk(name, *args):
+    return Struct(name, args) if args else Atom(name)
+
+
+def mklist(items, tail=NIL):
+    for item in reversed(items):
+        tail = Struct('.', (item, tail))
+    return tail
+
+
+def pylist(t):
+    '''Returns the elements of a proper list, or None.'''
+    items = []
+    t = deref(t)
+    while type(t) is Struct and t.name == '.' and len(t.args) == 2:
+        items.append(t.args[0])
+        t = deref(t.args[1])
+    return items if t is NIL else None
+
+
+def conjuncts(t):
+    '''Returns the goals of a conjunction.'''
+    t = deref(t)
+    if type(t) is Struct and t.name == ',' and len(t.args) == 2:
+        return conjuncts(t.args[0]) + conjuncts(t.args[1])
+    return [t]
+
+
+def error(kind, *args):
+    return PrologError(Struct('error', (mk(kind, *args), Var())))
+
+
+def type_error(kind, culprit):
+    return error('type_error', Atom(kind), culprit)
+
+
+def instantiation():
+    return error('instantiation_error')
+
+
+def indicator(name, arity):
+    return Struct('/', (Atom(name), arity))
+
+
+def copy(t, mapping):
+    '''Copies a term with fresh variables, mapping holds the variables copied so far.'''
+    t = deref(t)
+    if type(t) is Var:
+        v = mapping.get(t)
+        if v is None:
+            v = mapping[t] = Var()
+        return v
+    if type(t) is not Struct:
+        return t
+    if t.name == '.' and len(t.args) == 2:  # lists iteratively, they may be long
+        items = []
+        while type(t) is Struct and t.name == '.' and len(t.args) == 2:
+            items.append(copy(t.args[0], mapping))
+            t = deref(t.args[1])
+        return mklist(items, copy(t, mapping))
+    return Struct(t.name, [copy(a, mapping) for a in t.args])
+
+
+def text(t):
+    '''Returns the name of an atom or the text of a number.'''
+    t = deref(t)
+    if type(t) is Atom:
+        return t.name
+    if type(t) in (int, float):
+        return fmt(t)
+    if type(t) is Var:
+        raise instantiation()
+    raise type_error('atomic', t)
+
+
+def rank(t):
+    if type(t) is Var:
+        return 0
+    if type(t) in (int, float):
+        return 1
+    if type(t) is Atom:
+        return 3
+    return 4
+
+
+def compare(a, b):
+    '''Compares two terms in the standard order, returning -1, 0 or 1.'''
+    a, b = deref(a), deref(b)
+    if a is b:
+        return 0
+    ra, rb = rank(a), rank(b)
+    if ra != rb:
+        return -1 if ra < rb else 1
+    if ra == 0:
+        return -1 if a.id < b.id else 1
+    if ra == 1:
+        if a == b:
+            if type(a) is type(b):
+                return 0
+            return -1 if type(a) is float else 1
+        return -1 if a < b else 1
+    if ra == 3:
+        return -1 if a.name < b.name else (1 if a.name > b.name else 0)
+    if len(a.args) != len(b.args):
+        return -1 if len(a.args) < len(b.args) else 1
+    if a.name != b.name:
+        return -1 if a.name < b.name else 1
+    for x, y in zip(a.args, b.args):
+        c = compare(x, y)
+        if c:
+            return c
+    return 0
+
+
+# Reader
+
+prefix_ops = {':-': (1200, 'fx'), '?-': (1200, 'fx'), 'dynamic': (1150, 'fx'), 'table': (1150, 'fx'),
+              'discontiguous': (1150, 'fx'), 'multifile': (1150, 'fx'), 'initialization': (1150, 'fx'),
+              '\\+': (900, 'fy'), '-': (200, 'fy'), '+': (200, 'fy'), '\\': (200, 'fy')}
+infix_ops = {':-': (1200, 'xfx'), '-->': (1200, 'xfx'), ';': (1100, 'xfy'), '|': (1100, 'xfy'),
+             '->': (1050, 'xfy'), '*->': (1050, 'xfy'), ',': (1000, 'xfy'), 'as': (1000, 'xfx'),
+             '=': (700, 'xfx'), '\\=': (700, 'xfx'), '==': (700, 'xfx'), '\\==': (700, 'xfx'),
+             '@<': (700, 'xfx'), '@>': (700, 'xfx'), '@=<': (700, 'xfx'), '@>=': (700, 'xfx'),
+             '=..': (700, 'xfx'), 'is': (700, 'xfx'), '=:=': (700, 'xfx'), '=\\=': (700, 'xfx'),
+             '<': (700, 'xfx'), '>': (700, 'xfx'), '=<': (700, 'xfx'), '>=': (700, 'xfx'),
+             ':': (200, 'xfy'), '+': (500, 'yfx'), '-': (500, 'yfx'), '/\\': (500, 'yfx'), '\\/': (500, 'yfx'),
+             'xor': (500, 'yfx'), '*': (400, 'yfx'), '/': (400, 'yfx'), '//': (400, 'yfx'),
+             'rem': (400, 'yfx'), 'mod': (400, 'yfx'), '<<': (400, 'yfx'), '>>': (400, 'yfx'),
+             '**': (200, 'xfx'), '^': (200, 'xfy')}
+
+token_re = re.compile(r'''
+    (?P<layout>(?:\s+|%[^\n]*|/\*.*?\*/)+)
+  | (?P<float>[0-9]+\.[0-9]+(?:[eE][-+]?[0-9]+)?)
+  | (?P<char>0'(?:\\.|''|[^\\]))
+  | (?P<int>[0-9]+)
+  | (?P<var>[_A-Z][a-zA-Z0-9_]*)
+  | (?P<name>[a-z][a-zA-Z0-9_]*)
+  | (?P<quoted>'(?:[^'\\]|''|\\.|\\\n)*')
+  | (?P<string>"(?:[^"\\]|""|\\.)*")
+  | (?P<symbol>[-+*/\\^<>=~:.?@\#&$]+)
+  | (?P<solo>[!;])
+  | (?P<punct>[(),|\[\]{}])
+''', re.S | re.X)
+# Flora-2: ?x variables, names of any case, // comments, \naf and no ? in symbols
+flora_re = re.compile(r'''
+    (?P<layout>(?:\s+|%[^\n]*|//[^\n]*|/\*.*?\*/)+)
+  | (?P<float>[0-9]+\.[0-9]+(?:[eE][-+]?[0-9]+)?)
+  | (?P<int>[0-9]+)
+  | (?P<var>\?[a-zA-Z0-9_]*)
+  | (?P<naf>\\naf(?![a-zA-Z0-9_]))
+  | (?P<name>[a-zA-Z_][a-zA-Z0-9_]*)
+  | (?P<quoted>'(?:[^'\\]|''|\\.|\\\n)*')
+  | (?P<string>"(?:[^"\\]|""|\\.)*")
+  | (?P<symbol>[-+*/\\^<>=~:.@\#&$]+)
+  | (?P<solo>[!;])
+  | (?P<punct>[(),|\[\]{}])
+''', re.S | re.X)
+layout_re = re.compile(r'(?:\s+|%[^\n]*|/\*.*?\*/)*$', re.S)
+escapes = {'n': '\n', 't': '\t', 'r': '\r', 'a': '\a', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0',
+           '\\': '\\', "'": "'", '"': '"', '`': '`', '\n': ''}
+
+
+class SyntaxErr(Exception):
+    pass
+
+
+def unescape(body, quote):
+    out = []
+    i = 0
+    while i < len(body):
+        c = body[i]
+        if c == quote:  # doubled quote
+            out.append(c)
+            i += 2
+        elif c == '\\':
+            c = body[i + 1]
+            if c == 'x':
+                end = body.index('\\', i + 2)
+                out.append(chr(int(body[i + 2:end], 16)))
+                i = end + 1
+            elif c.isdigit():
+                end = body.index('\\', i + 1)
+                out.append(chr(int(body[i + 1:end], 8)))
+                i = end + 1
+            else:
+                out.append(escapes.get(c, c))
+                i += 2
+        else:
+            out.append(c)
+            i += 1
+    return ''.join(out)
+
+
+def scan(data, flora=False):
+    '''Splits the first clause of data into tokens, read as Flora-2 if flora is true.
+
+    Returns: ( tokens, end position ), or None if data holds no complete clause
+
+    Raises: SyntaxErr'''
+    tokens = []
+    pos = 0
+    layout = True
+    while True:
+        if pos == len(data):
+            return None
+        m = (flora_re if flora else token_re).match(data, pos)
+        if m is None:
+            if data[pos] in '\'"' or data.startswith('/*', pos):
+                return None  # quoted atom or comment still open
+            raise SyntaxErr('illegal character')
+        kind, value = m.lastgroup, m.group()
+        pos = m.end()
+        if kind == 'layout':
+            layout = True
+            continue
+        if kind == 'symbol' and value == '.' and (pos == len(data) or data[pos] in ' \t\r\n%'):
+            if pos == len(data):
+                return None  # might be the start of a longer symbol
+            tokens.append(('end', '.', False, layout))
+            return tokens, pos + 1
+        if kind == 'float':
+            kind, value = 'num', float(value)
+        elif kind == 'int':
+            kind, value = 'num', int(value)
+        elif kind == 'char':
+            kind, value = 'num', ord(unescape(value[2:], "'") if value[2:] != "''" else "'")
+        elif kind == 'quoted':
+            kind, value = 'atom', unescape(value[1:-1], "'")
+        elif kind == 'string':
+            kind, value = 'str', unescape(value[1:-1], '"')
+        elif kind in ('name', 'symbol', 'solo'):
+            kind = 'atom'
+        elif kind == 'naf':
+            kind, value = 'atom', '\\+'
+        elif kind == 'var' and flora:
+            value = value[1:] or '_'
+        functional = kind == 'atom' and data.startswith('(', pos)
+        tokens.append((kind, value, functional, layout))
+        layout = False
+
+
+class Parser(object):
+    '''Operator precedence parser for the tokens of one clause.
+
+    With flora, name{ term } is read as name( term ) and a frame
+    subject[ a->v, ... ] as the conjunction a( subject, v ), ...'''
+    def __init__(self, tokens, flora=False):
+        self.tokens = tokens
+        self.flora = flora
+        self.pos = 0
+        self.names = {}  # variable name -> Var, in order of appearance
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, value):
+        kind, v, functional, layout = self.next()
+        if kind != 'punct' or v != value:
+            raise SyntaxErr(value + ' expected')
+
+    def clause(self):
+        term = self.parse(1200)
+        if self.peek()[0] != 'end':
+            raise SyntaxErr('operator expected')
+        return term
+
+    def parse(self, maxprec):
+        left, prec = self.primary(maxprec)
+        while self.flora and prec == 0 and self.peek()[:2] == ('punct', '[') and not self.peek()[3]:
+            left = self.frame(left)
+        return self.infix(left, prec, maxprec)[0]
+
+    def frame(self, subject):
+        self.next()
+        goals = []
+        while True:
+            attribute = deref(self.parse(999))
+            kind, value, functional, layout = self.next()
+            if type(attribute) is not Atom or value != '->':
+                raise SyntaxErr('attribute->value expected')
+            goals.append(Struct(attribute.name, (subject, self.parse(999))))
+            if self.peek()[:2] != ('punct', ','):
+                break
+            self.next()
+        self.expect(']')
+        return functools.reduce(lambda right, left: Struct(',', (left, right)), reversed(goals))
+
+    def stop(self):
+        kind, value, functional, layout = self.peek()
+        return kind == 'end' or (kind == 'punct' and value in ')]},|')
+
+    def arguments(self):
+        args = [self.parse(999)]
+        while self.peek()[:2] == ('punct', ','):
+            self.next()
+            args.append(self.parse(999))
+        return args
+
+    def primary(self, maxprec):
+        kind, value, functional, layout = self.next()
+        if kind == 'num':
+            return value, 0
+        if kind == 'var':
+            if value == '_':
+                return Var(), 0
+            if value not in self.names:
+                self.names[value] = Var()
+            return self.names[value], 0
+        if kind == 'str':
+            return Atom(value), 0
+        if kind == 'punct':
+            if value == '(':
+                term = self.parse(1200)
+                self.expect(')')
+                return term, 0
+            if value == '[':
+                if self.peek()[:2] == ('punct', ']'):
+                    self.next()
+                    return NIL, 0
+                items = self.arguments()
+                tail = NIL
+                if self.peek()[:2] == ('punct', '|'):
+                    self.next()
+                    tail = self.parse(999)
+                self.expect(']')
+                return mklist(items, tail), 0
+            if value == '{':
+                if self.peek()[:2] == ('punct', '}'):
+                    self.next()
+                    return Atom('{}'), 0
+                term = self.parse(1200)
+                self.expect('}')
+                return Struct('{}', (term,)), 0
+            raise SyntaxErr('unexpected ' + value)
+        if kind == 'end':
+            raise SyntaxErr('unexpected end of clause')
+        if functional:
+            self.next()
+            args = self.arguments()
+            self.expect(')')
+            return Struct(value, args), 0
+        if self.flora and self.peek()[:2] == ('punct', '{') and not self.peek()[3]:
+            self.next()
+            term = self.parse(1200)
+            self.expect('}')
+            return Struct(value, (term,)), 0
+        if value == '-' and self.peek()[0] == 'num' and not self.peek()[3]:
+            return -self.next()[1], 0
+        op = prefix_ops.get(value)
+        if op is not None and not self.stop():
+            kind2, value2, functional2, layout2 = self.peek()
+            if not (kind2 == 'atom' and value2 in infix_ops and not functional2 and value2 not in prefix_ops):
+                prec, type = op
+                if prec > maxprec:
+                    prec = 999
+                arg = self.parse(prec if type == 'fy' else prec - 1)
+                return Struct(value, (arg,)), prec
+        return Atom(value), 0
+
+    def infix(self, left, leftprec, maxprec):
+        while True:
+            kind, value, functional, layout = self.peek()
+            if kind not in ('atom', 'punct') or (kind == 'punct' and value not in ',|'):
+                return left, leftprec
+            op = infix_ops.get(value)
+            if op is None:
+                return left, leftprec
+            prec, type = op
+            if prec > maxprec or leftprec > (prec if type == 'yfx' else prec - 1):
+                return left, leftprec
+            self.next()
+            right = self.parse(prec if type == 'xfy' else prec - 1)
+            left = Struct(';' if value == '|' else value, (left, right))
+            leftprec = prec
+
+
+class Input(object):
+    '''Input stream reading lines on demand, clauses are read as Flora-2 if flora is true.'''
+    def __init__(self, readline, flora=False):
+        self.readline = readline
+        self.flora = flora
+        self.data = ''
+        self.eof = False
+
+    def more(self):
+        if self.eof:
+            return False
+        line = self.readline()
+        if not line:
+            self.eof = True
+            return False
+        self.data += line
+        return True
+
+    def line(self):
+        '''Returns the rest of the current line.'''
+        while '\n' not in self.data and self.more():
+            pass
+        line, nl, self.data = self.data.partition('\n')
+        return line
+
+    def term(self):
+        '''Reads a clause.
+
+        Returns: ( term, { variable name: Var } ), end_of_file at the end
+
+        Raises: PrologError for syntax errors'''
+        while True:
+            data = self.data + ' ' if self.eof else self.data  # a full stop may end the input
+            try:
+                found = scan(data, self.flora)
+            except SyntaxErr as e:
+                self.data = ''
+                raise error('syntax_error', Atom(str(e)))
+            if found is not None:
+                tokens, end = found
+                self.data = data[end:]
+                parser = Parser(tokens, self.flora)
+                try:
+                    term = parser.clause()
+                except (SyntaxErr, IndexError) as e:
+                    raise error('syntax_error', Atom(str(e) or 'operator expected'))
+                return term, parser.names
+            if self.eof:
+                junk, self.data = self.data, ''
+                if not layout_re.match(junk):
+                    raise error('syntax_error', Atom('end of file in clause'))
+                return EOF, {}
+            self.more()
+
+    def term_of(self, data):
+        '''Reads a clause from data instead of the stream.'''
+        self.data = data
+        self.eof = True
+        return self.term()
+
+
+# Writer
+
+alpha_re = re.compile('[a-z][a-zA-Z0-9_]*$')
+symbol_re = re.compile('[-+*/\\\\^<>=~:.?@#&$]+$')
+
+
+def atom_text(name, quoted):
+    if not quoted or alpha_re.match(name) or (symbol_re.match(name) and name != '.') or name in ('[]', '!', ';', '{}'):
+        return name
+    out = []
+    for c in name:
+        if c == "'" or c == '\\':
+            out.append('\\' + c)
+        elif c == '\n':
+            out.append('\\n')
+        elif c == '\t':
+            out.append('\\t')
+        else:
+            out.append(c)
+    return "'" + ''.join(out) + "'"
+
+
+def fmt_float(f):
+    if f != f:
+        return 'nan'
+    if f in (float('inf'), float('-inf')):
+        return 'inf' if f > 0 else '-inf'
+    r = repr(f)
+    if 'e' in r:
+        mantissa, exponent = r.split('e')
+        if '.' not in mantissa:
+            mantissa += '.0'
+        return mantissa + 'e' + str(int(exponent))
+    return r
+
+
+def fmt(t, quoted=False, ops=True, prec=1200):
+    '''Returns the text write/1 (or writeq/1, write_canonical/1) writes for t.'''
+    t = deref(t)
+    if type(t) is Var:
+        return '_G' + str(t.id)
+    if type(t) is int:
+        return str(t)
+    if type(t) is float:
+        return fmt_float(t)
+    if type(t) is Atom:
+        return atom_text(t.name, quoted)
+    name, args = t.name, t.args
+    if name == '.' and len(args) == 2:
+        items = []
+        while type(t) is Struct and t.name == '.' and len(t.args) == 2:
+            items.append(fmt(t.args[0], quoted, ops, 999))
+            t = deref(t.args[1])
+        tail = '' if t is NIL else '|' + fmt(t, quoted, ops, 999)
+        return '[' + ','.join(items) + tail + ']'
+    if ops:
+        if name == '{}' and len(args) == 1:
+            return '{' + fmt(args[0], quoted, ops, 1200) + '}'
+        if len(args) == 2 and name in infix_ops:
+            p, type_ = infix_ops[name]
+            left = fmt(args[0], quoted, ops, p if type_ == 'yfx' else p - 1)
+            right = fmt(args[1], quoted, ops, p if type_ == 'xfy' else p - 1)
+            op = atom_text(name, quoted)
+            if name == ',':
+                s = left + ',' + right
+            elif alpha_re.match(name) or (symbol_re.match(left[-1:]) or symbol_re.match(right[:1])):
+                s = left + ' ' + op + ' ' + right
+            else:
+                s = left + op + right
+            return '(' + s + ')' if p > prec else s
+        if len(args) == 1 and name in prefix_ops and type(deref(args[0])) not in (int, float):
+            p, type_ = prefix_ops[name]
+            arg = fmt(args[0], quoted, ops, p if type_ == 'fy' else p - 1)
+            op = atom_text(name, quoted)
+            sep = ' ' if alpha_re.match(name) or symbol_re.match(arg[:1]) or arg[:1] == '(' else ''
+            s = op + sep + arg
+            return '(' + s + ')' if p > prec else s
+    return atom_text(name, quoted) + '(' + ','.join(fmt(a, quoted, ops, 999) for a in args) + ')'
+
+
+# Arithmetic
+
+def _div(a, b):
+    if b == 0:
+        raise error('evaluation_error', Atom('zero_divisor'))
+    if type(a) is int and type(b) is int and a % b == 0:
+        return a // b
+    return a / b
+
+
+def _intdiv(a, b):
+    if type(a) is not int or type(b) is not int:
+        raise type_error('integer', a if type(a) is not int else b)
+    if b == 0:
+        raise error('evaluation_error', Atom('zero_divisor'))
+    q = abs(a) // abs(b)
+    return q if (a >= 0) == (b >= 0) else -q
+
+
+def _mod(a, b):
+    if b == 0:
+        raise error('evaluation_error', Atom('zero_divisor'))
+    return a % b
+
+
+arithmetic = {
+    ('+', 2): lambda a, b: a + b, ('-', 2): lambda a, b: a - b, ('*', 2): lambda a, b: a * b,
+    ('/', 2): _div, ('//', 2): _intdiv, ('mod', 2): _mod, ('rem', 2): lambda a, b: a - b * _intdiv(a, b),
+    ('min', 2): min, ('max', 2): max, ('-', 1): lambda a: -a, ('+', 1): lambda a: a,
+    ('abs', 1): abs, ('sign', 1): lambda a: (a > 0) - (a < 0), ('float', 1): float,
+    ('integer', 1): lambda a: int(round(a)), ('truncate', 1): int, ('round', 1): lambda a: int(round(a)),
+    ('floor', 1): lambda a: int(a // 1), ('ceiling', 1): lambda a: -int(-a // 1),
+    ('sqrt', 1): lambda a: a ** 0.5, ('**', 2): lambda a, b: float(a) ** b, ('^', 2): lambda a, b: a ** b,
+    ('>>', 2): lambda a, b: a >> b, ('<<', 2): lambda a, b: a << b, ('/\\', 2): lambda a, b: a & b,
+    ('\\/', 2): lambda a, b: a | b, ('xor', 2): lambda a, b: a ^ b, ('\\', 1): lambda a: ~a,
+}
+
+
+def evaluate(t):
+    t = deref(t)
+    if type(t) in (int, float):
+        return t
+    if type(t) is Var:
+        raise instantiation()
+    if type(t) is Atom:
+        if t.name == 'pi':
+            return 3.141592653589793
+        if t.name == 'cputime':
+            return time.process_time()
+        if t.name == 'realtime':
+            return int(time.time())
+        if t.name == 'max_tagged_integer':
+            return (1 << 60) - 1
+        raise type_error('evaluable', indicator(t.name, 0))
+    if type(t) is Struct and t.name == '.' and len(t.args) == 2 and deref(t.args[1]) is NIL:
+        return evaluate(t.args[0])
+    fn = arithmetic.get((t.name, len(t.args)))
+    if fn is None:
+        raise type_error('evaluable', indicator(t.name, len(t.args)))
+    return fn(*[evaluate(a) for a in t.args])
+
+
+# Engine
+
+class Engine(object):
+    '''Solver and toplevel, the toplevel output is that of the dialect subclasses.'''
+    extensions = ('', '.pl')
+    flora = False  # read clauses as Flora-2
+    unknown = 'error'  # calling a predicate without clauses raises an existence error, or 'fail'
+
+    def __init__(self):
+        self.trail = []
+        self.barriers = 0
+        self.db = {}  # ( name, arity ) -> list of [ head, body ] clauses
+        self.dynamic = set()
+        self.globals = {}
+        self.inferences = 0
+        self.stdin = Input(self.readline, self.flora)
+        self.streams = {}
+        self.tty = sys.stdin.isatty()
+        self.builtins = {}
+        for name in dir(self):
+            if name.startswith('bi_'):
+                method = getattr(self, name)
+                spec = method.__doc__.split()[0]
+                key = spec.rsplit('/', 1)
+                self.builtins[(key[0], int(key[1]))] = method
+
+    def readline(self):
+        sys.stdout.flush()
+        return sys.stdin.readline()
+
+    def out(self, data):
+        sys.stdout.write(data)
+
+    # bindings
+
+    def bind(self, v, t):
+        v.ref = t
+        self.trail.append(v)
+
+    def undo(self, mark):
+        trail = self.trail
+        while len(trail) > mark:
+            trail.pop().ref = None
+
+    def unify(self, a, b):
+        stack = [(a, b)]
+        while stack:
+            a, b = stack.pop()
+            a, b = deref(a), deref(b)
+            if a is b:
+                continue
+            if type(a) is Var:
+                self.bind(a, b)
+            elif type(b) is Var:
+                self.bind(b, a)
+            elif type(a) is Struct:
+                if type(b) is not Struct or a.name != b.name or len(a.args) != len(b.args):
+                    return False
+                stack.extend(zip(a.args, b.args))
+            elif type(a) is Atom or type(b) is Atom or type(a) is not type(b) or a != b:
+                return False
+        return True
+
+    # solving
+
+    def barrier(self):
+        self.barriers += 1
+        return self.barriers
+
+    def solve(self, goal, barrier):
+        '''Generator yielding once per solution of goal, cut to barrier raises Cut( barrier ).'''
+        goal = deref(goal)
+        if type(goal) is Atom:
+            name, args = goal.name, ()
+        elif type(goal) is Struct:
+            name, args = goal.name, goal.args
+        elif type(goal) is Var:
+            raise instantiation()
+        else:
+            raise type_error('callable', goal)
+        self.inferences += 1
+        key = (name, len(args))
+        if key == (',', 2):
+            for _ in self.solve(args[0], barrier):
+                for _ in self.solve(args[1], barrier):
+                    yield
+            return
+        if key == ('true', 0):
+            yield
+            return
+        if key == ('!', 0):
+            yield
+            raise Cut(barrier)
+        if key == (';', 2):
+            left = deref(args[0])
+            if type(left) is Struct and left.name == '->' and len(left.args) == 2:
+                for _ in self.ite(left.args[0], left.args[1], args[1], barrier):
+                    yield
+                return
+            for _ in self.solve(left, barrier):
+                yield
+            for _ in self.solve(args[1], barrier):
+                yield
+            return
+        if key == ('->', 2):
+            for _ in self.ite(args[0], args[1], Atom('fail'), barrier):
+                yield
+            return
+        builtin = self.builtins.get(key)
+        if builtin is not None:
+            mark = len(self.trail)
+            result = builtin(*args)
+            if result is True:
+                yield
+            elif result is not False and result is not None:
+                for _ in result:
+                    yield
+            self.undo(mark)
+            return
+        clauses = self.db.get(key)
+        if clauses is None:
+            if name == '.' and len(args) == 2:
+                for _ in self.solve(Struct('consult', (goal,)), barrier):
+                    yield
+                return
+            if key in self.dynamic or self.unknown == 'fail':
+                return
+            raise error('existence_error', Atom('procedure'), indicator(name, len(args)))
+        mark = len(self.trail)
+        inner = self.barrier()
+        first = deref(args[0]) if args else None
+        if type(first) not in (Atom, int, float):
+            first = None
+        try:
+            for head, body in list(clauses):
+                if first is not None and type(head.args[0]) in (Atom, int, float) and head.args[0] != first:
+                    continue  # first argument index
+                mapping = {}
+                head, body = copy(head, mapping), copy(body, mapping)
+                if self.unify(Struct('', args), Struct('', head.args) if type(head) is Struct else Struct('', ())):
+                    for _ in self.solve(body, inner):
+                        yield
+                self.undo(mark)
+        except Cut as c:
+            if c.barrier != inner:
+                raise
+            self.undo(mark)
+
+    def call(self, goal):
+        '''Generator yielding the solutions of goal with its own cut barrier.'''
+        mark = len(self.trail)
+        inner = self.barrier()
+        try:
+            for _ in self.solve(goal, inner):
+                yield
+        except Cut as c:
+            if c.barrier != inner:
+                raise
+            self.undo(mark)
+
+    def once(self, goal):
+        '''Returns True and keeps the bindings of the first solution of goal, or False.'''
+        mark = len(self.trail)
+        for _ in self.call(goal):
+            return True
+        self.undo(mark)
+        return False
+
+    def ite(self, cond, then, otherwise, barrier):
+        mark = len(self.trail)
+        if self.once(cond):
+            for _ in self.solve(then, barrier):
+                yield
+        else:
+            for _ in self.solve(otherwise, barrier):
+                yield
+        self.undo(mark)
+
+    # database
+
+    def clause(self, term):
+        term = deref(term)
+        if type(term) is Struct and term.name == ':-' and len(term.args) == 2:
+            head, body = deref(term.args[0]), deref(term.args[1])
+        else:
+            head, body = term, TRUE
+        if type(head) is Var:
+            raise instantiation()
+        if type(head) not in (Atom, Struct):
+            raise type_error('callable', head)
+        key = (head.name, len(head.args) if type(head) is Struct else 0)
+        mapping = {}
+        return key, [copy(head, mapping), copy(body, mapping)]
+
+    def add(self, term, front=False):
+        key, clause = self.clause(term)
+        if key in self.builtins or key in ((',', 2), (';', 2), ('->', 2), ('!', 0), ('true', 0)):
+            raise error('permission_error', Atom('modify'), Atom('static_procedure'), indicator(*key))
+        clauses = self.db.setdefault(key, [])
+        if front:
+            clauses.insert(0, clause)
+        else:
+            clauses.append(clause)
+
+    def indicators(self, t):
+        t = deref(t)
+        if type(t) is Struct and t.name in (',', 'as') and len(t.args) == 2:
+            return self.indicators(t.args[0]) + (self.indicators(t.args[1]) if t.name == ',' else [])
+        items = pylist(t)
+        if items is not None:
+            return [i for item in items for i in self.indicators(item)]
+        if type(t) is Struct and t.name == '/' and len(t.args) == 2:
+            return [(text(t.args[0]), deref(t.args[1]))]
+        raise type_error('predicate_indicator', t)
+
+    def find(self, path):
+        '''Returns the file a consulted path names, trying self.extensions.'''
+        for extension in self.extensions:
+            if os.path.isfile(path + extension):
+                return path + extension
+        raise error('existence_error', Atom('source_sink'), Atom(path))
+
+    def consult(self, path):
+        path = self.find(path)
+        with open(path) as f:
+            stream = Input(f.readline, self.flora)
+            seen = set()
+            while True:
+                try:
+                    term, names = stream.term()
+                except PrologError as e:
+                    self.report(e.term)
+                    continue
+                if term is EOF:
+                    break
+                if type(term) is Struct and term.name == ':-' and len(term.args) == 1:
+                    try:
+                        if not self.once(term.args[0]):
+                            self.warn('Goal (directive) failed')
+                    except PrologError as e:
+                        self.report(e.term)
+                    self.undo(0)
+                    continue
+                for term in self.terms(term):
+                    key, clause = self.clause(term)
+                    if key not in seen:
+                        seen.add(key)
+                        self.db[key] = []
+                    self.add(term)
+
+    def terms(self, term):
+        '''Returns the clauses a term read from a source file stands for.'''
+        return [term]
+
+    # builtins, the first word of the docstring is the indicator
+
+    def bi_call1(self, g):
+        'call/1'
+        return self.call(g)
+
+    def _calln(self, g, *extra):
+        g = deref(g)
+        if type(g) is Atom:
+            g = Struct(g.name, extra)
+        elif type(g) is Struct:
+            g = Struct(g.name, g.args + extra)
+        elif type(g) is Var:
+            raise instantiation()
+        else:
+            raise type_error('callable', g)
+        return self.call(g)
+
+    def bi_call2(self, g, a):
+        'call/2'
+        return self._calln(g, a)
+
+    def bi_call3(self, g, a, b):
+        'call/3'
+        return self._calln(g, a, b)
+
+    def bi_not(self, g):
+        '\\+/1'
+        mark = len(self.trail)
+        found = self.once(g)
+        self.undo(mark)
+        return not found
+
+    def bi_not2(self, g):
+        'not/1'
+        return self.bi_not(g)
+
+    def bi_once(self, g):
+        'once/1'
+        return self.once(g)
+
+    def bi_ignore(self, g):
+        'ignore/1'
+        self.once(g)
+        return True
+
+    def bi_fail(self):
+        'fail/0'
+        return False
+
+    def bi_false(self):
+        'false/0'
+        return False
+
+    def bi_otherwise(self):
+        'otherwise/0'
+        return True
+
+    def bi_repeat(self):
+        'repeat/0'
+        while True:
+            yield
+
+    def bi_catch(self, goal, catcher, recovery):
+        'catch/3'
+        mark = len(self.trail)
+        inner = self.barrier()
+        try:
+            for _ in self.solve(goal, inner):
+                yield
+        except Cut as c:
+            if c.barrier != inner:
+                raise
+            self.undo(mark)
+        except PrologError as e:
+            self.undo(mark)
+            if not self.unify(catcher, e.term):
+                self.undo(mark)
+                raise
+            for _ in self.call(recovery):
+                yield
+
+    def bi_throw(self, ball):
+        'throw/1'
+        ball = deref(ball)
+        if type(ball) is Var:
+            raise instantiation()
+        raise PrologError(copy(ball, {}))
+
+    def bi_findall(self, template, goal, result):
+        'findall/3'
+        found = []
+        for _ in self.call(goal):
+            found.append(copy(template, {}))
+        return self.unify(result, mklist(found))
+
+    def bi_forall(self, cond, action):
+        'forall/2'
+        for _ in self.call(cond):
+            mark = len(self.trail)
+            ok = self.once(action)
+            self.undo(mark)
+            if not ok:
+                return False
+        return True
+
+    def bi_limit(self, n, goal):
+        'limit/2'
+        n = evaluate(n)
+        count = 0
+        if n <= 0:
+            return
+        for _ in self.call(goal):
+            count += 1
+            yield
+            if count >= n:
+                return
+
+    def bi_offset(self, n, goal):
+        'offset/2'
+        n = evaluate(n)
+        count = 0
+        for _ in self.call(goal):
+            count += 1
+            if count > n:
+                yield
+
+    def bi_between(self, low, high, x):
+        'between/3'
+        low = evaluate(low)
+        high = deref(high)
+        high = float('inf') if type(high) is Atom and high.name in ('inf', 'infinite') else evaluate(high)
+        x = deref(x)
+        if type(x) is not Var:
+            if low <= x <= high:
+                yield
+            return
+        i = low
+        while i <= high:
+            mark = len(self.trail)
+            self.bind(x, i)
+            yield
+            self.undo(mark)
+            i += 1
+
+    def bi_member(self, x, items):
+        'member/2'
+        items = deref(items)
+        while type(items) is Struct and items.name == '.' and len(items.args) == 2:
+            mark = len(self.trail)
+            if self.unify(x, items.args[0]):
+                yield
+            self.undo(mark)
+            items = deref(items.args[1])
+
+    def bi_append(self, a, b, c):
+        'append/3'
+        a = deref(a)
+        items = pylist(a)
+        if items is not None:
+            if self.unify(c, mklist(items, b)):
+                yield
+            return
+        c_items = pylist(c)
+        if c_items is None:
+            raise instantiation()
+        for i in range(len(c_items) + 1):
+            mark = len(self.trail)
+            if self.unify(a, mklist(c_items[:i])) and self.unify(b, mklist(c_items[i:])):
+                yield
+            self.undo(mark)
+
+    def bi_length(self, items, n):
+        'length/2'
+        found = pylist(items)
+        if found is not None:
+            return self.unify(n, len(found))
+        n = deref(n)
+        if type(n) is int:
+            return self.unify(items, mklist([Var() for i in range(n)]))
+        raise instantiation()
+
+    def bi_reverse(self, items, result):
+        'reverse/2'
+        return self.unify(result, mklist(list(reversed(pylist(items)))))
+
+    def bi_msort(self, items, result):
+        'msort/2'
+        return self.unify(result, mklist(sorted(pylist(items), key=functools.cmp_to_key(compare))))
+
+    def bi_sort(self, items, result):
+        'sort/2'
+        unique = []
+        for item in sorted(pylist(items), key=functools.cmp_to_key(compare)):
+            if not unique or compare(unique[-1], item):
+                unique.append(item)
+        return self.unify(result, mklist(unique))
+
+    def bi_unify(self, a, b):
+        '=/2'
+        return self.unify(a, b)
+
+    def bi_not_unify(self, a, b):
+        '\\=/2'
+        mark = len(self.trail)
+        found = self.unify(a, b)
+        self.undo(mark)
+        return not found
+
+    def bi_eq(self, a, b):
+        '==/2'
+        return compare(a, b) == 0
+
+    def bi_neq(self, a, b):
+        '\\==/2'
+        return compare(a, b) != 0
+
+    def bi_lt(self, a, b):
+        '@</2'
+        return compare(a, b) < 0
+
+    def bi_gt(self, a, b):
+        '@>/2'
+        return compare(a, b) > 0
+
+    def bi_le(self, a, b):
+        '@=</2'
+        return compare(a, b) <= 0
+
+    def bi_ge(self, a, b):
+        '@>=/2'
+        return compare(a, b) >= 0
+
+    def bi_compare(self, order, a, b):
+        'compare/3'
+        return self.unify(order, Atom('<=>'[compare(a, b) + 1]))
+
+    def bi_is(self, x, e):
+        'is/2'
+        return self.unify(x, evaluate(e))
+
+    def bi_ar_eq(self, a, b):
+        '=:=/2'
+        return evaluate(a) == evaluate(b)
+
+    def bi_ar_ne(self, a, b):
+        '=\\=/2'
+        return evaluate(a) != evaluate(b)
+
+    def bi_ar_lt(self, a, b):
+        '</2'
+        return evaluate(a) < evaluate(b)
+
+    def bi_ar_gt(self, a, b):
+        '>/2'
+        return evaluate(a) > evaluate(b)
+
+    def bi_ar_le(self, a, b):
+        '=</2'
+        return evaluate(a) <= evaluate(b)
+
+    def bi_ar_ge(self, a, b):
+        '>=/2'
+        return evaluate(a) >= evaluate(b)
+
+    def bi_succ(self, a, b):
+        'succ/2'
+        a = deref(a)
+        if type(a) is int:
+            return self.unify(b, a + 1)
+        return self.unify(a, evaluate(b) - 1)
+
+    def bi_var(self, t):
+        'var/1'
+        return type(deref(t)) is Var
+
+    def bi_nonvar(self, t):
+        'nonvar/1'
+        return type(deref(t)) is not Var
+
+    def bi_atom(self, t):
+        'atom/1'
+        return type(deref(t)) is Atom
+
+    def bi_number(self, t):
+        'number/1'
+        return type(deref(t)) in (int, float)
+
+    def bi_integer(self, t):
+        'integer/1'
+        return type(deref(t)) is int
+
+    def bi_float(self, t):
+        'float/1'
+        return type(deref(t)) is float
+
+    def bi_atomic(self, t):
+        'atomic/1'
+        return type(deref(t)) in (Atom, int, float)
+
+    def bi_compound(self, t):
+        'compound/1'
+        return type(deref(t)) is Struct
+
+    def bi_callable(self, t):
+        'callable/1'
+        return type(deref(t)) in (Atom, Struct)
+
+    def bi_is_list(self, t):
+        'is_list/1'
+        return pylist(t) is not None
+
+    def bi_functor(self, t, name, arity):
+        'functor/3'
+        t = deref(t)
+        if type(t) is Struct:
+            return self.unify(name, Atom(t.name)) and self.unify(arity, len(t.args))
+        if type(t) is not Var:
+            return self.unify(name, t) and self.unify(arity, 0)
+        n, name = evaluate(arity), deref(name)
+        return self.unify(t, Struct(name.name, [Var() for i in range(n)]) if n else name)
+
+    def bi_arg(self, n, t, a):
+        'arg/3'
+        t, n = deref(t), evaluate(n)
+        return 0 < n <= len(t.args) and self.unify(a, t.args[n - 1])
+
+    def bi_univ(self, t, items):
+        '=../2'
+        t = deref(t)
+        if type(t) is Struct:
+            return self.unify(items, mklist([Atom(t.name)] + list(t.args)))
+        if type(t) is not Var:
+            return self.unify(items, mklist([t]))
+        found = pylist(items)
+        head = deref(found[0])
+        return self.unify(t, Struct(head.name, found[1:]) if len(found) > 1 else head)
+
+    def bi_copy_term(self, a, b):
+        'copy_term/2'
+        return self.unify(b, copy(a, {}))
+
+    def bi_atom_codes(self, a, codes):
+        'atom_codes/2'
+        if type(deref(a)) is not Var:
+            return self.unify(codes, mklist([ord(c) for c in text(a)]))
+        return self.unify(a, Atom(''.join(chr(deref(c)) for c in pylist(codes))))
+
+    def bi_atom_chars(self, a, chars):
+        'atom_chars/2'
+        if type(deref(a)) is not Var:
+            return self.unify(chars, mklist([Atom(c) for c in text(a)]))
+        return self.unify(a, Atom(''.join(text(c) for c in pylist(chars))))
+
+    def bi_atom_length(self, a, n):
+        'atom_length/2'
+        return self.unify(n, len(text(a)))
+
+    def bi_atom_concat(self, a, b, c):
+        'atom_concat/3'
+        return self.unify(c, Atom(text(a) + text(b)))
+
+    def bi_atom_number(self, a, n):
+        'atom_number/2'
+        try:
+            found = Input(None).term_of(text(a) + ' .')[0]
+        except PrologError:
+            return False
+        return type(found) in (int, float) and self.unify(n, found)
+
+    def bi_atom_to_term(self, a, t, bindings):
+        'atom_to_term/3'
+        term, names = Input(None).term_of(text(a) + ' .')
+        return self.unify(t, term) and self.unify(bindings, mklist([Struct('=', (Atom(k), v)) for k, v in names.items()]))
+
+    def bi_term_to_atom(self, t, a):
+        'term_to_atom/2'
+        if type(deref(t)) is Var:
+            return self.unify(t, Input(None).term_of(text(a) + ' .')[0])
+        return self.unify(a, Atom(fmt(t, True)))
+
+    def bi_atomic_list_concat(self, items, result):
+        'atomic_list_concat/2'
+        return self.unify(result, Atom(''.join(text(i) for i in pylist(items))))
+
+    def bi_atomic_list_concat3(self, items, sep, result):
+        'atomic_list_concat/3'
+        return self.unify(result, Atom(text(sep).join(text(i) for i in pylist(items))))
+
+    def bi_assert(self, t):
+        'assert/1'
+        self.add(t)
+        return True
+
+    def bi_assertz(self, t):
+        'assertz/1'
+        self.add(t)
+        return True
+
+    def bi_asserta(self, t):
+        'asserta/1'
+        self.add(t, True)
+        return True
+
+    def bi_retract(self, t):
+        'retract/1'
+        t = deref(t)
+        if type(t) is Struct and t.name == ':-' and len(t.args) == 2:
+            head, body = t.args
+        else:
+            head, body = t, TRUE
+        key, clause = self.clause(Struct(':-', (head, body)))
+        for stored in list(self.db.get(key, [])):
+            mark = len(self.trail)
+            mapping = {}
+            if self.unify(head, copy(stored[0], mapping)) and self.unify(body, copy(stored[1], mapping)):
+                self.db[key].remove(stored)
+                return True
+            self.undo(mark)
+        return False
+
+    def bi_retractall(self, head):
+        'retractall/1'
+        key, clause = self.clause(head)
+        self.dynamic.add(key)
+        kept = []
+        for stored in self.db.get(key, []):
+            mark = len(self.trail)
+            if not self.unify(head, copy(stored[0], {})):
+                kept.append(stored)
+            self.undo(mark)
+        self.db[key] = kept
+        return True
+
+    def bi_abolish(self, spec):
+        'abolish/1'
+        for key in self.indicators(spec):
+            self.db.pop(key, None)
+        return True
+
+    def bi_dynamic(self, spec):
+        'dynamic/1'
+        for key in self.indicators(spec):
+            self.dynamic.add(key)
+            self.db.setdefault(key, [])
+        return True
+
+    def bi_table(self, spec):
+        'table/1'
+        self.indicators(spec)
+        return True
+
+    def bi_abolish_all_tables(self):
+        'abolish_all_tables/0'
+        return True
+
+    def bi_abolish_table_pred(self, spec):
+        'abolish_table_pred/1'
+        self.indicators(spec)
+        return True
+
+    def bi_consult(self, files):
+        'consult/1'
+        for f in pylist(files) if pylist(files) is not None else [files]:
+            self.consult(text(f))
+        return True
+
+    def bi_ensure_loaded(self, f):
+        'ensure_loaded/1'
+        self.consult(text(f))
+        return True
+
+    def bi_conset(self, name, value):
+        'conset/2'
+        self.globals[text(name)] = evaluate(value)
+        return True
+
+    def bi_conget(self, name, value):
+        'conget/2'
+        return self.unify(value, self.globals.get(text(name), 0))
+
+    def bi_setval(self, name, value):
+        'setval/2'
+        self.globals[text(name)] = copy(value, {})
+        return True
+
+    def bi_getval(self, name, value):
+        'getval/2'
+        if text(name) not in self.globals:
+            raise error('existence_error', Atom('variable'), Atom(text(name)))
+        return self.unify(value, self.globals[text(name)])
+
+    def bi_incval(self, name):
+        'incval/1'
+        self.globals[text(name)] = self.globals.get(text(name), 0) + 1
+        return True
+
+    def bi_decval(self, name):
+        'decval/1'
+        self.globals[text(name)] = self.globals.get(text(name), 0) - 1
+        return True
+
+    def bi_nb_setval(self, name, value):
+        'nb_setval/2'
+        return self.bi_setval(name, value)
+
+    def bi_b_setval(self, name, value):
+        'b_setval/2'
+        return self.bi_setval(name, value)
+
+    def bi_nb_getval(self, name, value):
+        'nb_getval/2'
+        return self.bi_getval(name, value)
+
+    def bi_b_getval(self, name, value):
+        'b_getval/2'
+        return self.bi_getval(name, value)
+
+    def bi_statistics(self, key, value):
+        'statistics/2'
+        key = text(key)
+        if key in ('cputime', 'process_cputime'):
+            return self.unify(value, time.process_time())
+        if key == 'runtime':
+            ms = int(time.process_time() * 1000)
+            return self.unify(value, mklist([ms, 0]))
+        if key == 'inferences':
+            return self.unify(value, self.inferences)
+        if key == 'table_space_used':
+            return self.unify(value, 0)
+        if key == 'tablespace':
+            return self.unify(value, mklist([0, 0]))
+        raise error('domain_error', Atom('statistics_key'), Atom(key))
+
+    def bi_cputime(self, value):
+        'cputime/1'
+        return self.unify(value, time.process_time())
+
+    def bi_sleep(self, seconds):
+        'sleep/1'
+        time.sleep(evaluate(seconds))
+        return True
+
+    def bi_halt(self):
+        'halt/0'
+        raise Halt()
+
+    def bi_halt1(self, code):
+        'halt/1'
+        raise Halt(evaluate(code))
+
+    # streams
+
+    def stream(self, t, output=True):
+        t = deref(t)
+        if type(t) is Atom:
+            if t.name in ('user_output', 'output', 'user'):
+                return sys.stdout if output else self.stdin
+            if t.name in ('user_error', 'error'):
+                return sys.stderr
+            if t.name in ('user_input', 'input'):
+                return self.stdin
+        if type(t) is Struct and t.name == '$stream' and t.args[0] in self.streams:
+            return self.streams[t.args[0]]
+        if type(t) is Var:
+            raise instantiation()
+        raise error('existence_error', Atom('stream'), t)
+
+    def bi_open(self, path, mode, stream):
+        'open/3'
+        mode = text(mode)
+        path = deref(path)
+        try:
+            if type(path) is Struct and path.name == 'string' and len(path.args) == 1:  # ECLiPSe string stream
+                f = io.StringIO(text(path.args[0]))
+                f.seek(0, 0 if mode == 'read' else 2)
+            elif mode == 'read':
+                f = open(text(path))
+            else:
+                f = open(text(path), {'write': 'w', 'append': 'a'}[mode])
+        except (IOError, OSError):
+            raise error('existence_error', Atom('source_sink'), path)
+        handle = f
+        if mode == 'read':
+            handle = Input(f.readline)
+            handle.close = f.close
+        n = max(self.streams or [2]) + 1
+        self.streams[n] = handle
+        return self.unify(stream, Struct('$stream', (n,)))
+
+    def bi_open4(self, path, mode, stream, options):
+        'open/4'
+        return self.bi_open(path, mode, stream)
+
+    def bi_close(self, stream):
+        'close/1'
+        t = deref(stream)
+        handle = self.stream(t)
+        if handle not in (sys.stdout, sys.stderr, self.stdin):
+            handle.close()
+            del self.streams[t.args[0]]
+        return True
+
+    def bi_close2(self, stream, options):
+        'close/2'
+        return self.bi_close(stream)
+
+    def bi_get_stream_info(self, stream, key, value):
+        'get_stream_info/3'
+        handle = self.stream(stream)
+        if text(key) != 'name':
+            raise error('domain_error', Atom('stream_property'), deref(key))
+        return self.unify(value, Atom(handle.getvalue() if isinstance(handle, io.StringIO) else getattr(handle, 'name', 'user')))
+
+    def bi_string_length(self, string, n):
+        'string_length/2'
+        return self.unify(n, len(text(string).encode('utf-8')))  # ECLiPSe strings are bytes
+
+    def bi_write(self, t):
+        'write/1'
+        self.out(fmt(t))
+        return True
+
+    def bi_print(self, t):
+        'print/1'
+        self.out(fmt(t, True))
+        return True
+
+    def bi_writeq(self, t):
+        'writeq/1'
+        self.out(fmt(t, True))
+        return True
+
+    def bi_write_canonical(self, t):
+        'write_canonical/1'
+        self.out(fmt(t, True, False))
+        return True
+
+    def bi_writeln(self, t):
+        'writeln/1'
+        self.out(fmt(t) + '\n')
+        return True
+
+    def bi_nl(self):
+        'nl/0'
+        self.out('\n')
+        return True
+
+    def bi_tab(self, n):
+        'tab/1'
+        self.out(' ' * evaluate(n))
+        return True
+
+    def bi_write2(self, s, t):
+        'write/2'
+        self.stream(s).write(fmt(t))
+        return True
+
+    def bi_writeq2(self, s, t):
+        'writeq/2'
+        self.stream(s).write(fmt(t, True))
+        return True
+
+    def bi_write_canonical2(self, s, t):
+        'write_canonical/2'
+        self.stream(s).write(fmt(t, True, False))
+        return True
+
+    def bi_nl1(self, s):
+        'nl/1'
+        self.stream(s).write('\n')
+        return True
+
+    def bi_flush_output(self):
+        'flush_output/0'
+        sys.stdout.flush()
+        return True
+
+    def bi_flush_output1(self, s):
+        'flush_output/1'
+        self.stream(s).flush()
+        return True
+
+    def bi_flush(self, s):
+        'flush/1'
+        return self.bi_flush_output1(s)
+
+    def bi_read(self, t):
+        'read/1'
+        return self.unify(t, self.stdin.term()[0])
+
+    def bi_read2(self, s, t):
+        'read/2'
+        return self.unify(t, self.stream(s, False).term()[0])
+
+    # toplevel
+
+    def toplevel(self):
+        '''Reads and answers goals until the end of the input.'''
+        n = 1
+        while True:
+            try:
+                if self.tty:
+                    self.out(self.prompt(n))
+                try:
+                    goal, names = self.stdin.term()
+                except PrologError as e:
+                    self.report(e.term)
+                    continue
+                if goal is EOF:
+                    return
+                n += 1
+                self.answer(goal, names)
+            except KeyboardInterrupt:
+                self.undo(0)
+                self.interrupt()
+
+    def answer(self, goal, names):
+        '''Runs a goal read by the toplevel, writing its bindings and asking for more.'''
+        if self.stdin.data.strip() == '':
+            self.stdin.data = ''  # rest of the line of the goal
+        solutions = self.call(goal)
+        try:
+            for _ in solutions:
+                bound = [(name, v) for name, v in names.items() if not name.startswith('_') and type(deref(v)) is not Var]
+                if not bound:
+                    self.yes()
+                    return
+                self.bindings(bound)
+                if not self.stdin.line().strip().startswith(';'):
+                    self.yes(True)
+                    return
+            self.no()
+        except PrologError as e:
+            self.report(e.term)
+        finally:
+            solutions.close()
+            self.undo(0)
+
+    def interrupt(self):
+        '''Reacts to SIGINT: aborts the running goal.'''
+        self.out('\n')
+
+    def ask(self, question):
+        '''Writes question and reads a single key from the terminal.'''
+        self.out(question)
+        sys.stdout.flush()
+        if not self.tty:
+            return 'a'
+        import termios
+        import tty
+        saved = termios.tcgetattr(0)
+        try:
+            tty.setcbreak(0)
+            return os.read(0, 1).decode()
+        finally:
+            termios.tcsetattr(0, termios.TCSADRAIN, saved)
+
+    def describe(self, ball):
+        return fmt(ball, True)
+
+    def warn(self, message):
+        self.out('Warning: ' + message + '\n')
+
+
+class XSB(Engine):
+    '''Toplevel of XSB.
+
+    Consulting a source file writes its object file next to it, as XSB
+    does; the object file of the stand-in is a copy of the source.'''
+    extensions = ('', '.P', '.pl', '.xwam')
+
+    def consult(self, path):
+        path = self.find(path)
+        Engine.consult(self, path)
+        base, extension = os.path.splitext(path)
+        if extension != '.xwam':
+            try:
+                shutil.copyfile(path, base + '.xwam')
+            except (IOError, OSError):  # XSB loads sources from read-only directories as well
+                pass
+
+    def prompt(self, n):
+        return '\n| ?- '
+
+    def bindings(self, bound):
+        self.out(''.join('\n' + name + ' = ' + fmt(v, True) for name, v in bound))
+        sys.stdout.flush()
+
+    def yes(self, asked=False):
+        self.out('\nyes\n')
+
+    def no(self):
+        self.out('\nno\n')
+
+    def report(self, ball):
+        self.out('++Error[XSB/Runtime/P]: [' + self.describe(ball) + ']\n')
+
+
+class SWI(Engine):
+    '''Toplevel of SWI-Prolog.'''
+    extensions = ('', '.pl', '.prolog')
+
+    def prompt(self, n):
+        return '?- '
+
+    def bindings(self, bound):
+        self.out(',\n'.join(name + ' = ' + fmt(v, True) for name, v in bound) + ' ')
+        sys.stdout.flush()
+
+    def yes(self, asked=False):
+        self.out('.\n\n' if asked else 'true.\n\n')
+
+    def no(self):
+        self.out('false.\n\n')
+
+    def report(self, ball):
+        self.out('ERROR: ' + self.describe(ball) + '\n')
+
+    def interrupt(self):
+        self.ask('\nAction (h for help) ? ')
+        self.out('abort\n% Execution Aborted\n')
+
+    def bi_qcompile(self, f):
+        'qcompile/1'
+        path = self.find(text(f))
+        self.consult(path)
+        shutil.copyfile(path, os.path.splitext(path)[0] + '.qlf')
+        return True
+
+    def bi_qsave_program(self, f):
+        'qsave_program/1'
+        with open(text(f), 'w') as state:  # a saved state of the stand-in is a source file
+            for name, arity in sorted(self.dynamic):
+                state.write(':- dynamic ' + fmt(indicator(name, arity), True) + '.\n')
+            for clauses in self.db.values():
+                for head, body in clauses:
+                    state.write(fmt(head if body is TRUE else Struct(':-', (head, body)), True) + '.\n')
+        return True
+
+
+class ECLiPSe(Engine):
+    '''Toplevel of ECLiPSe.'''
+    extensions = ('', '.ecl', '.pl')
+
+    def prompt(self, n):
+        return '[eclipse ' + str(n) + ']: '
+
+    def bindings(self, bound):
+        self.out('\n' + '\n'.join(name + ' = ' + fmt(v, True) for name, v in bound) + '\nYes (0.00s cpu, solution 1, maybe more) ? ')
+        sys.stdout.flush()
+
+    def yes(self, asked=False):
+        self.out('\n' if asked else '\nYes (0.00s cpu)\n')
+
+    def no(self):
+        self.out('\nNo (0.00s cpu)\n')
+
+    def report(self, ball):
+        ball = deref(ball)
+        if type(ball) is Struct and ball.name == 'error' and type(deref(ball.args[0])) is Struct and deref(ball.args[0]).name == 'syntax_error':
+            self.out('syntax error: ' + self.describe(ball.args[0]) + '\n')
+            return
+        self.out('uncaught exception in call: ' + self.describe(ball) + '\nAbort\n')
+
+    def interrupt(self):
+        self.ask('\ninterruption: type a, b, c, e, or h for help : ? ')
+        self.out('\nAborting execution ...\nAbort\n')
+
+    def bi_compile(self, f):
+        'compile/1'
+        self.consult(text(f))
+        return True
+
+    def bi_compile2(self, f, options):
+        'compile/2'
+        path = self.find(text(f))
+        if 'output:eco' in fmt(options):  # writes the object file instead of loading
+            shutil.copyfile(path, os.path.splitext(path)[0] + '.eco')
+            return True
+        self.consult(path)
+        return True
+
+
+class Flora2(Engine):
+    '''Shell of Flora-2, reading F-logic.
+
+    Answers are sets: every distinct solution is written once, as one
+    ?name = value line per variable, followed by the number of
+    solutions and Yes or No. Calling an attribute or predicate without
+    clauses fails. The updates of t_insert{} and t_delete{} are undone
+    when the command they belong to fails.'''
+    extensions = ('', '.flr')
+    flora = True
+    unknown = 'fail'
+
+    def __init__(self):
+        Engine.__init__(self)
+        self.journal = []  # ( clauses, clause, index ) per transactional update, index None for inserts
+
+    def prompt(self, n):
+        return '\nflora2 ?- '
+
+    def answer(self, goal, names):
+        if self.stdin.data.strip() == '':
+            self.stdin.data = ''
+        names = [(name, v) for name, v in names.items() if not name.startswith('_')]
+        rows = []
+        seen = set()
+        solutions = self.call(goal)
+        try:
+            for _ in solutions:
+                row = tuple(fmt(v, True) for name, v in names)
+                if row not in seen:
+                    seen.add(row)
+                    rows.append(row)
+                if not names:
+                    break
+        except PrologError as e:
+            self.rollback()
+            self.report(e.term)
+            return
+        finally:
+            solutions.close()
+            self.undo(0)
+        if not rows:
+            self.rollback()
+        del self.journal[:]
+        if names:
+            self.out(''.join(''.join('?' + name + ' = ' + v + '\n' for (name, var), v in zip(names, row)) + '\n' for row in rows))
+            self.out(str(len(rows)) + ' solution(s) in 0.0000 seconds\n')
+        self.out('\nYes\n' if rows else '\nNo\n')
+
+    def report(self, ball):
+        self.out('++Error[Flora-2]> ' + self.describe(ball) + '\n')
+
+    def terms(self, term):
+        '''Returns one clause per attribute of a frame with several attributes.'''
+        term = deref(term)
+        if type(term) is Struct and term.name == ':-' and len(term.args) == 2:
+            return [Struct(':-', (head, term.args[1])) for head in conjuncts(term.args[0])]
+        return conjuncts(term)
+
+    def rollback(self):
+        '''Undoes the transactional updates of the command answered.'''
+        while self.journal:
+            clauses, clause, index = self.journal.pop()
+            if index is None:
+                clauses.remove(clause)
+            else:
+                clauses.insert(index, clause)
+
+    def insert(self, facts, transaction):
+        for fact in self.terms(facts):
+            key, clause = self.clause(fact)
+            clauses = self.db.setdefault(key, [])
+            if any(body is TRUE and compare(head, clause[0]) == 0 for head, body in clauses):
+                continue  # a fact is stored once
+            self.add(fact)
+            if transaction:
+                self.journal.append((clauses, clauses[-1], None))
+        return True
+
+    def delete(self, facts, transaction):
+        for fact in self.terms(facts):
+            key, clause = self.clause(fact)
+            clauses = self.db.get(key, [])
+            for index, (head, body) in enumerate(clauses):
+                if body is TRUE and self.unify(fact, copy(head, {})):
+                    clause = clauses.pop(index)
+                    if transaction:
+                        self.journal.append((clauses, clause, index))
+                    break
+            else:
+                return False
+        return True
+
+    def bi_insert(self, facts):
+        'insert/1'
+        return self.insert(facts, False)
+
+    def bi_t_insert(self, facts):
+        't_insert/1'
+        return self.insert(facts, True)
+
+    def bi_delete(self, facts):
+        'delete/1'
+        return self.delete(facts, False)
+
+    def bi_t_delete(self, facts):
+        't_delete/1'
+        return self.delete(facts, True)
+
+    def bi_expert(self, flag):
+        'expert/1'
+        return True
+
+
+class DES(Engine):
+    '''Toplevel of DES, answering Datalog queries and commands of its textual API.
+
+    Queries are answered with the Prolog solver, duplicate tuples
+    removed. Answers to /tapi commands end with the |: prompt, all other
+    answers with the DES> prompt. Relations declared with type/1 can be
+    queried with select * from name, whose answer schema carries the
+    column types and whose strings are quoted, as with SQL in DES.'''
+    delay = 0.0  # seconds every query answered without /tapi takes, see --delay
+    sql_re = re.compile(r'select\s+\*\s+from\s+(\w+)\s*;?$', re.I)
+    sql_types = {'string': 'string(varchar)', 'varchar': 'string(varchar)', 'int': 'number(integer)',
+                 'integer': 'number(integer)', 'float': 'number(float)', 'real': 'number(float)'}
+
+    def __init__(self):
+        Engine.__init__(self)
+        self.display = True  # /output
+        self.csv = None  # file of /csv
+        self.types = {}  # relation name -> [( column, type )], see type/1
+
+    def toplevel(self):
+        tapi = False
+        while True:
+            try:
+                if self.tty:
+                    self.out('|:' if tapi else 'DES> ')
+                line = self.readline()
+                if not line:
+                    return
+                line = line.strip()
+                tapi = line.startswith('/tapi ')
+                if tapi:
+                    line = line[6:].strip()
+                if line:
+                    self.command(line, tapi)
+            except KeyboardInterrupt:
+                self.undo(0)
+
+    def command(self, line, tapi):
+        nl = '\n'
+        try:
+            if line.startswith('/'):
+                cmd, arg = (line.split(None, 1) + [''])[:2]
+                arg = arg.strip()
+                if cmd in ('/restore_ddb', '/consult', '/reconsult'):
+                    if cmd != '/reconsult':
+                        self.db.clear()
+                    self.consult(arg)
+                elif cmd == '/assert':
+                    self.add(Input(None).term_of(arg + ('' if arg.endswith('.') else '.') + ' ')[0])
+                elif cmd == '/output':
+                    self.display = arg != 'off'
+                elif cmd == '/csv':
+                    if self.csv is not None:
+                        self.csv.close()
+                    self.csv = None if arg == 'off' else open(arg, 'w')
+                elif cmd != '/test_tapi':
+                    raise error('existence_error', Atom('command'), Atom(cmd))
+                if tapi:
+                    self.out('$success' + nl)
+                return
+            sql = self.sql_re.match(line)
+            if sql:
+                goal, lvars, schema = self.select(sql.group(1))
+            else:
+                goal, names = Input(None).term_of(line + ('' if line.endswith('.') else '.') + ' ')
+                lvars = list(names.items())
+                schema = [name for name, v in lvars]
+            strings = [bool(sql) and ':string' in column for column in schema]
+            top = None
+            if type(goal) is Struct and goal.name == 'top' and len(goal.args) == 2:
+                top, goal = deref(goal.args[0]), goal.args[1]
+            rows = []
+            seen = set()
+            for _ in self.call(goal):
+                row = tuple(self.value(v, string) for (name, v), string in zip(lvars, strings))
+                if row not in seen:
+                    seen.add(row)
+                    rows.append(row)
+                    if len(rows) == top:
+                        break
+            if tapi:
+                self.out('answer(' + ','.join(schema) + ')' + nl)
+                self.out(''.join('$' + nl + ''.join(v + nl for v in row) for row in rows) + '$eot' + nl)
+                return
+            time.sleep(self.delay)
+            for row in rows:
+                if self.csv is not None:
+                    self.csv.write(','.join(row) + '\n')
+            if self.display:
+                self.out('{' + nl + ''.join('  answer(' + ','.join(row) + ')' + nl for row in rows) + '}' + nl)
+                self.out('Info: ' + str(len(rows)) + ' tuples computed.' + nl)
+        except PrologError as e:
+            message = self.describe(e.term)
+            self.undo(0)
+            if tapi:
+                self.out('$error' + nl + '0' + nl + message + nl)
+            else:
+                self.out('Error: ' + message + nl)
+
+    def select(self, name):
+        '''Returns the goal, ( column, Var ) pairs and schema of select * from name.'''
+        if name not in self.types:
+            raise error('existence_error', Atom('relation'), Atom(name))
+        columns = self.types[name]
+        lvars = [(name + '.' + column, Var()) for column, kind in columns]
+        schema = [name + '.' + column + ':' + kind for column, kind in columns]
+        return Struct(name, [v for column, v in lvars]), lvars, schema
+
+    def value(self, t, string):
+        '''Returns the text of a value in an answer, quoted as an SQL string if string is true.'''
+        t = deref(t)
+        if not string or t is Atom('null'):
+            return fmt(t, True)
+        return "'" + text(t).replace("'", "''") + "'"
+
+    def bi_type1(self, t):
+        'type/1'
+        t = deref(t)
+        columns = []
+        for column in t.args:
+            name, kind = [text(deref(a)) for a in deref(column).args]
+            columns.append((name, self.sql_types.get(kind, kind)))
+        self.types[t.name] = columns
+        return True
+
+
+dialects = {'xsb': XSB, 'swipl': SWI, 'eclipse': ECLiPSe, 'flora2': Flora2, 'des': DES}
+
+
+def command(dialect, *options):
+    '''Returns the ( path, args ) pyxf backend constructors take to start the stand-in
+    Usage: command( dialect, *options ) (example: xsb( *command( 'xsb' ) ))
+    options - command line options of the stand-in (example: '--nointerrupt')
+
+    The path runs the stand-in script, so options a backend puts in
+    front of args (swipl( state=... )) reach the stand-in.'''
+    return sys.executable + ' -u ' + os.path.abspath(__file__).replace('.pyc', '.py'), ' '.join((dialect,) + options)
+
+
+def main(args):
+    '''Runs the stand-in for a dialect on stdin and stdout until end of file or halt.'''
+    state = None
+    if '-x' in args:  # saved state written by qsave_program/1
+        i = args.index('-x')
+        state, args = args[i + 1], args[:i] + args[i + 2:]
+    if not args or args[0] not in dialects:
+        sys.exit('Usage: python fake.py [-x state] ' + '|'.join(sorted(dialects)) + ' [--nointerrupt] [--delay seconds]')
+    sys.setrecursionlimit(100000)
+    engine = dialects[args[0]]()
+    if state is not None:
+        engine.consult(state)
+    if '--nointerrupt' in args:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if '--delay' in args:
+        engine.delay = float(args[args.index('--delay') + 1])
+    try:
+        engine.toplevel()
+    except Halt as h:
+        sys.stdout.flush()
+        return h.code
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
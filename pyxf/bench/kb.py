@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+__doc__ = ''' Synthetic knowledge bases for the pyxf benchmarks
+ by the pyxf contributors, 2026
+
+ This library is free software; you can redistribute it and/or
+ modify it under the terms of the GNU Lesser General Public
+ License as published by the Free Software Foundation; either
+ version 2.1 of the License, or (at your option) any later version.'''
+
+import os
+import random
+import string
+import tempfile
+
+extensions = {'xsb': '.P', 'swipl': '.pl', 'eclipse': '.ecl', 'flora2': '.flr', 'des': '.dl', 'datalog': '.dl'}
+
+
+class KnowledgeBase:
+    '''Knowledge base of generated facts and rules, written in the dialect of every backend
+
+    Contents:
+      rel( Key, Value ) - facts binary relation, solutions facts per key
+      wide( Key, Value1, ..., ValueN ) - the same keys with width values each
+      rule1( Key, Value ) :- rel( Key, Value ), ruleI( Key, Value ) :- ruleI-1( Key, Value )
+    In Flora2 rel and the rules are attributes (Key[ rel->Value ]) and wide
+    stays a predicate. Keys are k0, k1, ... and values are random lowercase
+    symbols, the same for the same arguments on every run.'''
+    def __init__(self, facts=1000, solutions=10, width=8, length=8, rules=3, seed=0):
+        '''Constructor method
+        Usage: KnowledgeBase( facts, solutions, width, length, rules, seed )
+        facts - number of rel facts, and of wide facts (default: 1000)
+        solutions - facts per key, the answer size of a query for one key (default: 10)
+        width - values per wide fact (default: 8)
+        length - characters per value (default: 8)
+        rules - length of the chain of rules over rel (default: 3)
+        seed - seed of the generated values (default: 0)'''
+        self.facts = facts
+        self.solutions = max(min(solutions, facts), 1)
+        self.width = max(width, 1)
+        self.length = max(length, 1)
+        self.rules = rules
+        self.seed = seed
+        self.keys = max(facts // self.solutions, 1)
+
+    def params(self):
+        '''Returns the constructor arguments as a dictionary.'''
+        return dict(facts=self.facts, solutions=self.solutions, width=self.width, length=self.length, rules=self.rules, seed=self.seed)
+
+    def _values(self, salt):
+        '''Private generator of reproducible random symbols.'''
+        rnd = random.Random(self.seed * 1000003 + salt)
+        letters = string.ascii_lowercase
+        symbols = letters + string.digits
+        while True:
+            yield rnd.choice(letters) + ''.join(rnd.choice(symbols) for i in range(self.length - 1))
+
+    def rows(self):
+        '''Yields the arguments of the rel facts as ( key, value ) tuples.'''
+        values = self._values(1)
+        for i in range(self.facts):
+            yield 'k' + str(i % self.keys), next(values)
+
+    def wide(self):
+        '''Yields the arguments of the wide facts as ( key, value1, ..., valueN ) tuples.'''
+        values = self._values(2)
+        for i in range(self.facts):
+            yield ('k' + str(i % self.keys),) + tuple(next(values) for j in range(self.width))
+
+    def inserts(self, count):
+        '''Yields count ( key, value ) tuples for loadfacts( tuples, 'ins' ).'''
+        values = self._values(3)
+        for i in range(count):
+            yield 'n' + str(i), next(values)
+
+    def clauses(self, backend):
+        '''Yields the facts and rules in the dialect of a backend ('xsb', 'swipl', 'eclipse', 'flora2', 'des' or 'datalog').'''
+        flora = backend == 'flora2'
+        for key, value in self.rows():
+            yield key + '[rel->' + value + '].' if flora else 'rel(' + key + ',' + value + ').'
+        for row in self.wide():
+            yield 'wide(' + ','.join(row) + ').'
+        for i in range(1, self.rules + 1):
+            body = 'rule' + str(i - 1) if i > 1 else 'rel'
+            if flora:
+                yield '?k[rule' + str(i) + '->?v] :- ?k[' + body + '->?v].'
+            else:
+                yield 'rule' + str(i) + '(K,V) :- ' + body + '(K,V).'
+
+    def write(self, backend, path=None):
+        '''Writes the knowledge base into a file
+        Usage: instance.write( backend, path )
+        backend - dialect to write ('xsb', 'swipl', 'eclipse', 'flora2', 'des' or 'datalog')
+        path - file to write (default: None, a new temporary file)
+
+        Returns: path of the file, with the extension the backend loads'''
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='pyxf-bench-', suffix=extensions[backend])
+            os.close(fd)
+        with open(path, 'w') as f:
+            for clause in self.clauses(backend):
+                f.write(clause + '\n')
+        return path
+
+    def queries(self, backend):
+        '''Returns the benchmark queries in the dialect of a backend
+        Usage: instance.queries( backend )
+
+        Returns: dictionary with the queries
+          yesno - a rel fact that holds
+          solutions - rel values of one key (solutions answers)
+          wide - wide values of one key (solutions answers of width columns)
+          large - the whole rel relation (facts answers)
+          rule - values of one key through the whole chain of rules'''
+        key, value = next(self.rows())
+        rule = 'rule' + str(self.rules) if self.rules else 'rel'
+        if backend == 'flora2':
+            return dict(yesno=key + '[rel->' + value + ']',
+                        solutions=key + '[rel->?v]',
+                        wide='wide(' + key + ',' + ','.join('?v' + str(i) for i in range(self.width)) + ')',
+                        large='?k[rel->?v]',
+                        rule=key + '[' + rule + '->?v]')
+        return dict(yesno='rel(' + key + ',' + value + ')',
+                    solutions='rel(' + key + ',V)',
+                    wide='wide(' + key + ',' + ','.join('V' + str(i) for i in range(self.width)) + ')',
+                    large='rel(K,V)',
+                    rule=rule + '(' + key + ',V)')
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+__doc__ = ''' Benchmark scenarios for the pyxf backends
+ by the pyxf contributors, 2026
+
+ Usage: python -m pyxf.bench [options] (see python -m pyxf.bench --help)
+
+ Every scenario is timed against a real engine or, by default, against
+ the stand-in of pyxf.bench.fake, which answers instantly so the numbers
+ show the cost of pyxf itself: spawning, writing goals, reading and
+ parsing answers. Results are written as JSON and can be compared with
+ the results of an earlier run to spot regressions.
+
+ This library is free software; you can redistribute it and/or
+ modify it under the terms of the GNU Lesser General Public
+ License as published by the Free Software Foundation; either
+ version 2.1 of the License, or (at your option) any later version.'''
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from collections import OrderedDict
+
+from pyxf import pyxf
+from pyxf.bench import fake
+from pyxf.datalog import datalog
+from pyxf.bench.kb import KnowledgeBase
+
+backends = ('xsb', 'swipl', 'eclipse', 'flora2', 'des', 'datalog')
+ptyonly = ('flora2', 'des')  # backends refusing the pipe transport
+scenarios = ('startup', 'load', 'yesno', 'solutions', 'wide', 'large', 'rule', 'batch', 'insert')
+
+
+class Benchmark:
+    '''Runs the benchmark scenarios against one backend'''
+    def __init__(self, backend='xsb', path=None, args=None, transport='pty', kb=None, repeat=20, batch=100):
+        '''Constructor method
+        Usage: Benchmark( backend, path, args, transport, kb, repeat, batch )
+        backend - backend name ('xsb', 'swipl', 'eclipse', 'flora2', 'des' or
+          'datalog', the in-process engine which ignores path, args and transport)
+        path - engine executable (default: None, the stand-in of pyxf.bench.fake)
+        args - engine command line arguments (default: None, the backend default)
+        transport - 'pty' or 'pipe' (default: 'pty')
+        kb - KnowledgeBase to load (default: KnowledgeBase())
+        repeat - timed calls per query scenario (default: 20)
+        batch - queries per query_batch() call of the batch scenario (default: 100)'''
+        self.backend = backend
+        self.path = path
+        self.args = args
+        self.transport = transport
+        self.kb = kb or KnowledgeBase()
+        self.repeat = repeat
+        self.batch = batch
+        self.queries = self.kb.queries(backend)
+        self.module = None
+        self._engine = None
+
+    def spawn(self):
+        '''Starts a new engine of the benchmarked backend
+        Usage: instance.spawn()'''
+        if self.backend == 'datalog':
+            return datalog()
+        cls = getattr(pyxf, self.backend)
+        if self.path is None:
+            path, args = fake.command(self.backend)
+        else:
+            path, args = self.path, self.args
+        if args is None:
+            return cls(path, transport=self.transport)
+        return cls(path, args, transport=self.transport)
+
+    def engine(self):
+        '''Returns the engine with the knowledge base loaded that the query scenarios share.'''
+        if self._engine is None:
+            self._engine = self.spawn()
+            self._engine.load(self._module())
+        return self._engine
+
+    def _module(self):
+        '''Private method writing the knowledge base once.'''
+        if self.module is None:
+            self.module = self.kb.write(self.backend)
+        return self.module
+
+    def close(self):
+        '''Terminates the shared engine and removes the knowledge base file
+        Usage: instance.close()
+
+        The object file XSB writes next to a consulted source is removed
+        as well.'''
+        if self._engine is not None:
+            self._engine.close()
+            self._engine = None
+        if self.module is not None:
+            os.remove(self.module)
+            compiled = os.path.splitext(self.module)[0] + '.xwam'
+            if os.path.exists(compiled):
+                os.remove(compiled)
+            self.module = None
+
+    def run(self, names=scenarios):
+        '''Runs scenarios
+        Usage: instance.run( names )
+        names - scenario names (default: all of scenarios)
+
+        Returns: list of result dictionaries, see measure()'''
+        results = []
+        try:
+            for name in names:
+                results.append(getattr(self, 'scenario_' + name)())
+        finally:
+            self.close()
+        return results
+
+    def measure(self, name, call, samples, before=None, rows=None):
+        '''Times call() samples times
+        Usage: instance.measure( name, call, samples, before, rows )
+        name - scenario name
+        call - callable to time
+        samples - number of timed calls
+        before - callable run untimed before every call returning the engine
+          passed to call (default: None, call takes no arguments and uses
+          the shared engine)
+        rows - callable counting the answers in the result of call (default: None)
+
+        Returns: dictionary with the scenario, backend and engine, the
+        number of calls, answers per call, seconds per call (min, mean, p50,
+        p95, max) and, for calls observed by pyxf, bytes read per call and
+        the median seconds per phase (see pyxf.CallStats)'''
+        metrics = pyxf.Metrics()
+        times = []
+        count = None
+        for i in range(samples):
+            arg = before() if before is not None else None
+            engine = self._engine if before is None else arg
+            if engine is not None:
+                engine.observer = metrics
+            start = time.time()
+            result = call(arg) if before is not None else call()
+            times.append(time.time() - start)
+            if engine is not None:
+                engine.observer = None
+            if rows is not None:
+                count = rows(result)
+        times.sort()
+        result = OrderedDict([('scenario', name), ('backend', self.backend), ('engine', self.path or 'fake'), ('transport', self.transport),
+                              ('calls', samples), ('rows', count),
+                              ('seconds', OrderedDict([('min', times[0]), ('mean', sum(times) / len(times)), ('p50', self._rank(times, 50)),
+                                                       ('p95', self._rank(times, 95)), ('max', times[-1])]))])
+        for kinds in metrics.snapshot().values():
+            stats = list(kinds.values())
+            result['bytes'] = sum(s['bytes'] for s in stats) // samples
+            result['phases'] = OrderedDict((phase, max(s[phase]['p50'] for s in stats)) for phase in ('build', 'write', 'read', 'parse'))
+        return result
+
+    def _rank(self, times, q):
+        '''Private method returning the q-th percentile of sorted times.'''
+        return times[min(int(len(times) * q / 100.0), len(times) - 1)]
+
+    def _query(self, name):
+        '''Private method timing query() of one of the knowledge base queries.'''
+        query = self.queries[name]
+        engine = self.engine()
+        return self.measure(name, lambda: engine.query(query), self.repeat, rows=self._rows)
+
+    def _rows(self, result):
+        '''Private method counting the answers of a query() result.'''
+        if isinstance(result, list):
+            return len(result)
+        return 1 if result is True else 0
+
+    def scenario_startup(self):
+        '''Spawning an engine up to its first prompt, and closing it.'''
+        def call():
+            self.spawn().close()
+        return self.measure('startup', call, max(self.repeat // 4, 3))
+
+    def scenario_load(self):
+        '''Loading the knowledge base into a fresh engine.'''
+        engines = []
+        module = self._module()
+
+        def before():
+            engines.append(self.spawn())
+            return engines[-1]
+        try:
+            return self.measure('load', lambda engine: engine.load(module), max(self.repeat // 4, 3), before)
+        finally:
+            for engine in engines:
+                engine.close()
+
+    def scenario_yesno(self):
+        '''A query without variables that succeeds.'''
+        return self._query('yesno')
+
+    def scenario_solutions(self):
+        '''A query with kb.solutions answers of one value each.'''
+        return self._query('solutions')
+
+    def scenario_wide(self):
+        '''A query with kb.solutions answers of kb.width values each.'''
+        return self._query('wide')
+
+    def scenario_large(self):
+        '''A query returning the whole relation of kb.facts answers.'''
+        return self._query('large')
+
+    def scenario_rule(self):
+        '''A query through the chain of kb.rules rules.'''
+        return self._query('rule')
+
+    def scenario_batch(self):
+        '''query_batch() of self.batch queries with kb.solutions answers each.'''
+        queries = [self.queries['solutions']] * self.batch
+        engine = self.engine()
+        return self.measure('batch', lambda: engine.query_batch(queries), self.repeat, rows=lambda result: sum(self._rows(r) for r in result))
+
+    def scenario_insert(self):
+        '''loadfacts() of kb.facts new facts into the shared engine.'''
+        engine = self.engine()
+        return self.measure('insert', lambda: engine.loadfacts(self.kb.inserts(self.kb.facts), 'ins'), max(self.repeat // 4, 3), rows=lambda count: count)
+
+
+def save(results, path, config=None):
+    '''Writes benchmark results as JSON
+    Usage: save( results, path, config )
+    results - list of result dictionaries returned by Benchmark.run()
+    path - file to write, '-' for standard output
+    config - dictionary describing the run (default: None)'''
+    document = OrderedDict([('pyxf', pyxf.__version__), ('python', platform.python_version()), ('platform', platform.platform()),
+                            ('time', time.strftime('%Y-%m-%dT%H:%M:%S')), ('config', config or {}), ('results', results)])
+    text = json.dumps(document, indent=1)
+    if path == '-':
+        sys.stdout.write(text + '\n')
+        return
+    with open(path, 'w') as f:
+        f.write(text + '\n')
+
+
+def compare(baseline, results, statistic='p50'):
+    '''Compares results with the results of an earlier run
+    Usage: compare( baseline, results, statistic )
+    baseline - result document written by save() (dictionary) or path of it
+    results - list of result dictionaries returned by Benchmark.run()
+    statistic - entry of 'seconds' to compare (default: 'p50')
+
+    Returns: list of ( scenario, backend, transport, old seconds, new seconds,
+    new / old ) tuples for the scenarios present in both'''
+    if not isinstance(baseline, dict):
+        with open(baseline) as f:
+            baseline = json.load(f)
+    old = dict(((r['scenario'], r['backend'], r['engine'], r['transport']), r) for r in baseline['results'])
+    rows = []
+    for r in results:
+        b = old.get((r['scenario'], r['backend'], r['engine'], r['transport']))
+        if b is not None:
+            before, after = b['seconds'][statistic], r['seconds'][statistic]
+            rows.append((r['scenario'], r['backend'], r['transport'], before, after, after / before if before else None))
+    return rows
+
+
+def report(results, comparison=None, out=sys.stderr):
+    '''Writes a human readable table of results (and of compare() rows).'''
+    out.write('%-10s %-8s %-5s %7s %9s %11s %11s %11s\n' % ('scenario', 'backend', 'trans', 'calls', 'rows', 'p50 ms', 'p95 ms', 'mean ms'))
+    for r in results:
+        s = r['seconds']
+        out.write('%-10s %-8s %-5s %7d %9s %11.3f %11.3f %11.3f\n' % (r['scenario'], r['backend'], r['transport'], r['calls'], r['rows'] if r['rows'] is not None else '-',
+                                                                    s['p50'] * 1000, s['p95'] * 1000, s['mean'] * 1000))
+    for scenario, backend, transport, before, after, ratio in comparison or ():
+        out.write('%-10s %-8s %-5s %11.3f -> %11.3f ms  x%s\n' % (scenario, backend, transport, before * 1000, after * 1000, '%.2f' % ratio if ratio else '-'))
+
+
+def main(argv=None):
+    '''Command line entry point, see python -m pyxf.bench --help.'''
+    parser = argparse.ArgumentParser(prog='python -m pyxf.bench', description='Benchmarks the pyxf backends against real engines or a local stand-in.')
+    parser.add_argument('--backend', action='append', choices=backends, help='backend to benchmark, may be repeated (default: all)')
+    parser.add_argument('--path', help='engine executable (default: the stand-in engine of pyxf.bench.fake)')
+    parser.add_argument('--args', help='engine command line arguments (default: the backend default)')
+    parser.add_argument('--transport', action='append', choices=('pty', 'pipe'), help='transport, may be repeated (default: pty)')
+    parser.add_argument('--scenario', action='append', choices=scenarios, help='scenario to run, may be repeated (default: all)')
+    parser.add_argument('--facts', type=int, default=1000, help='facts in the knowledge base (default: 1000)')
+    parser.add_argument('--solutions', type=int, default=10, help='answers of a query for one key (default: 10)')
+    parser.add_argument('--width', type=int, default=8, help='values of a wide answer (default: 8)')
+    parser.add_argument('--length', type=int, default=8, help='characters per value (default: 8)')
+    parser.add_argument('--rules', type=int, default=3, help='length of the chain of rules (default: 3)')
+    parser.add_argument('--repeat', type=int, default=20, help='timed calls per query scenario (default: 20)')
+    parser.add_argument('--batch', type=int, default=100, help='queries per query_batch() call (default: 100)')
+    parser.add_argument('--output', default='-', help='JSON file for the results (default: -, standard output)')
+    parser.add_argument('--compare', help='JSON file of an earlier run to compare with')
+    options = parser.parse_args(argv)
+    kb = KnowledgeBase(options.facts, options.solutions, options.width, options.length, options.rules)
+    results = []
+    for backend in options.backend or backends:
+        for transport in options.transport or ['pty']:
+            if transport == 'pipe' and backend in ptyonly:
+                continue
+            bench = Benchmark(backend, options.path, options.args, transport, kb, options.repeat, options.batch)
+            results.extend(bench.run(options.scenario or scenarios))
+    config = OrderedDict([('kb', kb.params()), ('repeat', options.repeat), ('batch', options.batch), ('path', options.path), ('args', options.args)])
+    save(results, options.output, config)
+    report(results, compare(options.compare, results) if options.compare else None)
@@ -0,0 +1,800 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+__doc__ = ''' In-process Datalog engine with the interface of the pyxf des backend
+ by the pyxf contributors, 2026
+
+ For knowledge bases of a few thousand facts and rules, starting an
+ interpreter and talking to it through a terminal costs far more than
+ answering the queries. The datalog class evaluates plain Datalog (facts,
+ rules, stratified negation and comparisons) inside the Python process:
+ the program is evaluated bottom-up with semi-naive iteration into a
+ model whose relations keep hash indexes on the argument positions that
+ are looked up, and queries are answered from the model.
+
+ This library is free software; you can redistribute it and/or
+ modify it under the terms of the GNU Lesser General Public
+ License as published by the Free Software Foundation; either
+ version 2.1 of the License, or (at your option) any later version.'''
+
+import heapq
+import os
+import re
+import sys
+import time
+
+from pyxf.pyxf import ResultSet
+
+if sys.version_info >= (3, 7):
+    from pyxf.aio import _adatalog
+else:  # Python 2 or before 3.7, without the coroutine API of pyxf.aio
+    class _adatalog: pass
+
+special_re = re.compile('[\'"%./]')  # characters that matter to _clauses outside quotes
+token_re = re.compile('\\s*(?:(\'(?:[^\'\\\\]|\\\\.|\'\')*\')|("(?:[^"\\\\]|\\\\.)*")|([A-Z_][a-zA-Z0-9_]*)|(-?[0-9]+(?:\\.[0-9]+)?(?:[eE][-+]?[0-9]+)?)|([a-z][a-zA-Z0-9_]*)|(:-|\\\\\\+|\\\\=|=<|>=|[<>=(),]))')
+number_re = re.compile('-?[0-9]+(?:(\\.[0-9]+)?([eE][-+]?[0-9]+)?)$')  # constants decoded as numbers
+comparisons = {
+    '=': lambda a, b: a == b,
+    '\\=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '>': lambda a, b: a > b,
+    '=<': lambda a, b: a <= b,
+    '>=': lambda a, b: a >= b,
+}
+
+
+class DatalogCompileError(Exception):
+    '''Exception raised if loaded module or facts have syntax or stratification errors.'''
+    pass
+
+
+class DatalogQueryError(Exception):
+    '''Exception raised if a query has errors.'''
+    pass
+
+
+class DatalogQueryTimeout(Exception):
+    '''Exception raised if a query or load exceeds its deadline.'''
+    pass
+
+
+class _Syntax(Exception):
+    '''Private exception for malformed clauses, reported as DatalogCompileError or DatalogQueryError.'''
+    pass
+
+
+class _Relation:
+    '''Private set of tuples with hash indexes on argument positions, built on first lookup.'''
+    __slots__ = ('tuples', 'indexes')
+
+    def __init__(self, tuples=()):
+        self.tuples = set(tuples)
+        self.indexes = {}  # positions -> { values at positions: list of tuples }
+
+    def add(self, row):
+        '''Adds a tuple, returns False if it was already there.'''
+        if row in self.tuples:
+            return False
+        self.tuples.add(row)
+        for positions, index in self.indexes.items():
+            index.setdefault(tuple(row[p] for p in positions), []).append(row)
+        return True
+
+    def update(self, rows):
+        '''Adds a set of tuples not in the relation yet.'''
+        self.tuples |= rows
+        for positions, index in self.indexes.items():
+            for row in rows:
+                index.setdefault(tuple(row[p] for p in positions), []).append(row)
+
+    def lookup(self, positions, key):
+        '''Returns the tuples having key at positions.'''
+        if not positions:
+            return self.tuples
+        index = self.indexes.get(positions)
+        if index is None:
+            index = self.indexes[positions] = {}
+            for row in self.tuples:
+                index.setdefault(tuple(row[p] for p in positions), []).append(row)
+        return index.get(key, ())
+
+
+class _Rule:
+    '''Private compiled rule: head arguments and body literals over numbered variables.
+    Arguments are ints (variable slots) or strings (constants). Literals
+    are ( 'pos', key, args ), ( 'neg', key, args ) or ( 'cmp', op, args ).'''
+    __slots__ = ('key', 'head', 'body', 'size', 'plans')
+
+    def __init__(self, key, head, body, size):
+        self.key = key
+        self.head = head
+        self.body = body
+        self.size = size
+        self.plans = {}  # literal read from the delta relation -> steps
+
+
+class _Parser:
+    '''Private recursive descent parser for Datalog clauses and queries.'''
+    def __init__(self, text):
+        self.tokens = []
+        pos = 0
+        text = text.strip()
+        if text.endswith('.'):
+            text = text[:-1]
+        while pos < len(text):
+            match = token_re.match(text, pos)
+            if match is None:
+                raise _Syntax('unexpected "' + text[pos:pos + 20].strip() + '"')
+            self.tokens.append((match.lastindex, match.group(match.lastindex)))
+            pos = match.end()
+            while pos < len(text) and text[pos].isspace():
+                pos += 1
+        self.pos = 0
+        self.slots = {}  # variable name -> slot
+        self.names = []  # named variables in order of appearance
+
+    def peek(self):
+        return self.tokens[self.pos][1] if self.pos < len(self.tokens) else None
+
+    def take(self, expected=None):
+        if self.pos >= len(self.tokens):
+            raise _Syntax('unexpected end of clause')
+        kind, text = self.tokens[self.pos]
+        if expected is not None and text != expected:
+            raise _Syntax('expected "' + expected + '" but found "' + text + '"')
+        self.pos += 1
+        return kind, text
+
+    def clause(self):
+        '''Returns ( head literal, body literals ).'''
+        head = self.literal()
+        if head[0] != 'pos':
+            raise _Syntax('the head of a clause must be an atom')
+        body = []
+        if self.peek() == ':-':
+            self.take()
+            body = self.body()
+        self.end()
+        return head, body
+
+    def query(self):
+        '''Returns the body literals of a query.'''
+        body = self.body()
+        self.end()
+        return body
+
+    def end(self):
+        if self.pos < len(self.tokens):
+            raise _Syntax('operator expected before "' + self.peek() + '"')
+
+    def body(self):
+        body = [self.literal()]
+        while self.peek() == ',':
+            self.take()
+            body.append(self.literal())
+        return body
+
+    def literal(self):
+        kind, text = self.take()
+        if text == '\\+' or (text == 'not' and self.peek() == '('):
+            if text == 'not':
+                self.take('(')
+            literal = self.literal()
+            if text == 'not':
+                self.take(')')
+            if literal[0] != 'pos':
+                raise _Syntax('only atoms can be negated')
+            return ('neg',) + literal[1:]
+        if kind == 5 and self.peek() == '(':
+            self.take()
+            args = [self.term(*self.take())]
+            while self.peek() == ',':
+                self.take()
+                args.append(self.term(*self.take()))
+            self.take(')')
+            if self.peek() in comparisons:
+                raise _Syntax('operator expected after ' + text + '(...)')
+            return 'pos', (text, len(args)), tuple(args)
+        if kind == 5 and self.peek() not in comparisons:
+            return 'pos', (text, 0), ()
+        left = self.term(kind, text)
+        op = self.peek()
+        if op not in comparisons:
+            raise _Syntax('comparison expected after "' + text + '"')
+        self.take()
+        return 'cmp', op, (left, self.term(*self.take()))
+
+    def term(self, kind, text):
+        if kind == 3:
+            if text == '_':
+                slot = len(self.slots)
+                self.slots[object()] = slot
+                return slot
+            slot = self.slots.get(text)
+            if slot is None:
+                slot = self.slots[text] = len(self.slots)
+                if text[0] != '_':
+                    self.names.append(text)
+            return slot
+        if kind == 1:
+            return re.sub('\\\\(.)', '\\1', text[1:-1].replace("''", "'"))
+        if kind == 2:
+            return text[1:-1]
+        if kind in (4, 5):
+            return text
+        raise _Syntax('unexpected "' + text + '"')
+
+
+def _decode(text):
+    '''Private function returning a constant as int or float if it is a number, see datalog.query().'''
+    match = number_re.match(text)
+    if match is None:
+        return text
+    if match.group(1) or match.group(2):
+        return float(text)
+    return int(text)
+
+
+def _order(row):
+    '''Private function returning the sort key of an answer tuple, with numbers in
+    numeric order before the other constants, as in the standard order of terms.'''
+    key = []
+    for value in row:
+        number = _decode(value)
+        key.append((1, 0, value) if number is value else (0, number, value))
+    return tuple(key)
+
+
+def _clauses(text):
+    '''Private generator splitting program text into clauses, skipping comments.'''
+    start = pos = 0
+    quote = None
+    parts = []
+    while pos < len(text):
+        if not quote:
+            match = special_re.search(text, pos)
+            if match is None:
+                break
+            pos = match.start()
+        c = text[pos]
+        if quote:
+            if c == '\\':
+                pos += 1
+            elif c == quote:
+                quote = None
+        elif c == "'" or c == '"':
+            quote = c
+        elif c == '%' or text.startswith('/*', pos):
+            parts.append(text[start:pos])
+            pos = text.find('\n' if c == '%' else '*/', pos)
+            if pos < 0:
+                pos = len(text)
+            elif c != '%':
+                pos += 1
+            start = pos + 1
+        elif c == '.' and (pos + 1 == len(text) or text[pos + 1].isspace()):
+            parts.append(text[start:pos])
+            clause = ''.join(parts).strip()
+            if clause:
+                yield clause
+            parts = []
+            start = pos + 1
+        pos += 1
+    parts.append(text[start:])
+    if ''.join(parts).strip():
+        raise _Syntax('clause "' + ''.join(parts).strip()[:40] + '" does not end with a full stop')
+
+
+def _number(value):
+    '''Private function returning value as a number if it is one, else the value itself.'''
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+class datalog(_adatalog):
+    '''In-process Datalog engine with the interface of the des backend
+
+    Usage: instance = datalog()
+           instance.load( 'test/logic/test_des.pl' )
+           instance.query( 'likes( Person, Food )' )
+
+    Supported are facts, rules, negation with not( atom ) or \\+ atom when
+    the program is stratified, and the comparisons =, \\=, <, >, =< and >=
+    (numerically if both sides are numbers). Answers have set semantics
+    and are sorted as in DES, numbers first in numeric order. Variables
+    that are not bound by a positive atom (as in dislikes( X, Y ) :-
+    not( likes( X, Y ) )) range over all constants of the program.'''
+    name = 'Datalog'
+    modules = ()  # modules loaded with load()
+
+    def __init__(self):
+        '''Constructor method
+        Usage: datalog()'''
+        self._facts = {}  # ( name, arity ) -> _Relation of loaded facts
+        self._rules = {}  # ( name, arity ) -> list of _Rule
+        self._constants = set()  # constants of the rules
+        self._model = None  # ( name, arity ) -> _Relation, None until evaluated
+        self._queries = {}  # query text -> compiled query
+        self._deadline = None
+
+    def load(self, module, timeout=None):
+        '''Adds the facts and rules of a module
+        Usage: instance.load( path, timeout )
+        module - path to module file (.dl or .pl is added if missing)
+        timeout - deadline in seconds for reading the module (default: None, no deadline)
+
+        Raises: DatalogCompileError, DatalogQueryTimeout'''
+        for path in (module, module + '.dl', module + '.pl'):
+            if os.path.isfile(path):
+                break
+        else:
+            raise DatalogCompileError('Error while loading module "' + module + '". The file does not exist.')
+        with open(path) as f:
+            text = f.read()
+        self._within(timeout, 'Loading module "' + module + '"', self._program, text, 'module "' + module + '"')
+        if module not in self.modules:
+            self.modules = self.modules + (module,)
+
+    def _program(self, text, what):
+        '''Private method adding the clauses of a program text.'''
+        try:
+            clauses = [_Parser(clause).clause() for clause in _clauses(text) if not clause.startswith(':-')]
+        except _Syntax as e:
+            raise DatalogCompileError('Error while loading ' + what + ': ' + str(e))
+        for clause in clauses:
+            self._clause(*clause)
+        self._invalidate()
+
+    def _clause(self, head, body):
+        '''Private method adding a parsed clause as fact or rule.'''
+        kind, key, args = head
+        size = max([a for a in args if isinstance(a, int)] + [a for l in body for a in l[2] if isinstance(a, int)] + [-1]) + 1
+        if not body and size == 0:
+            relation = self._facts.get(key)
+            if relation is None:
+                relation = self._facts[key] = _Relation()
+            relation.add(args)
+            return
+        self._rules.setdefault(key, []).append(_Rule(key, args, body, size))
+        for literal in [head] + body:
+            self._constants.update(a for a in literal[2] if not isinstance(a, int))
+
+    def _invalidate(self):
+        '''Private method dropping the model after the program changed.'''
+        self._model = None
+
+    def loadfacts(self, facts, predicate=None, progress=None):
+        '''Adds many facts at once
+        Usage: instance.loadfacts( facts, predicate, progress )
+        facts - iterable of fact strings (example: 'likes( john, curry )') or,
+          if predicate is given, of tuples of Python values (example: ('john', 'curry'))
+        predicate - predicate name for tuple facts (default: None)
+        progress - callable receiving the number of facts added so far,
+          called every 10000 facts and once more at the end (default: None)
+
+        Blank fact strings (empty lines of a fact file) are skipped and not
+        counted. A tuple fact that is not a tuple or list is a single value.
+
+        Returns: number of facts loaded
+
+        Raises: DatalogCompileError'''
+        count = 0
+        for fact in facts:
+            if predicate is None:
+                fact = fact.strip()
+                if fact[-1:] == '.':
+                    fact = fact[:-1].rstrip()
+                if not fact:
+                    continue
+                try:
+                    head, body = _Parser(fact).clause()
+                except _Syntax as e:
+                    raise DatalogCompileError('Error while loading fact "' + fact + '": ' + str(e))
+                self._clause(head, body)
+            else:
+                if not isinstance(fact, (list, tuple)):
+                    fact = (fact,)
+                args = tuple(v if isinstance(v, str) else str(v) for v in fact)
+                key = (predicate, len(args))
+                relation = self._facts.get(key)
+                if relation is None:
+                    relation = self._facts[key] = _Relation()
+                relation.add(args)
+            count += 1
+            if progress is not None and count % 10000 == 0:
+                progress(count)
+        self._invalidate()
+        if progress is not None:
+            progress(count)
+        return count
+
+    def _terminate(self, query):
+        '''Private method that strips a query and makes sure it ends with a full stop.'''
+        query = query.strip()
+        if query[-1] != '.':
+            query += '.'
+        return query
+
+    def _within(self, timeout, what, call, *args):
+        '''Private method running call( *args ) with a deadline.
+
+        Raises: DatalogQueryTimeout'''
+        if timeout is None:
+            return call(*args)
+        self._deadline = (time.time() + timeout, timeout, what)
+        try:
+            return call(*args)
+        finally:
+            self._deadline = None
+
+    def _check(self):
+        '''Private method raising DatalogQueryTimeout if the deadline has passed.'''
+        if self._deadline is not None and time.time() > self._deadline[0]:
+            deadline, timeout, what = self._deadline
+            raise DatalogQueryTimeout(what + ' exceeded its deadline of ' + str(timeout) + ' seconds.')
+
+    def query(self, query, timeout=None, decode=None, resultset=False, limit=None, offset=0):
+        '''Queries the model of the program
+        Usage: instance.query( query, timeout, decode, resultset, limit, offset )
+        query - usual DES query (example: 'likes( X, Y )')
+        timeout - deadline in seconds (default: None, no deadline)
+        decode - True or a list of variable names whose values are
+          returned as int or float if they are numbers, like the decode of
+          the other backends; constants are flat, so there are no lists or
+          terms (default: None, values are strings)
+        resultset - return a ResultSet instead of a list of dictionaries
+          (default: False)
+        limit - maximum number of answers (default: None, all)
+        offset - number of answers to skip first (default: 0)
+
+        Returns:
+          True - if yes/no query and answer is yes
+          False - if yes/no query and answer is no
+          List of dictionaries - if normal query. Dictionary keys are returned
+          variable names. Example:
+          >>> instance.query( 'likes( Person, Food )' )
+          [{'Person': 'john', 'Food': 'curry'}, {'Person': 'sandy', 'Food': 'mushrooms'}]
+
+        Raises: DatalogQueryError, DatalogCompileError, DatalogQueryTimeout'''
+        query = self._terminate(query)
+        if (limit is not None and limit < 0) or offset < 0:
+            raise ValueError('limit and offset must not be negative')
+        return self._within(timeout, 'Query "' + query + '"', self._query, query, decode, resultset, limit, offset)
+
+    def _query(self, query, decode=None, resultset=False, limit=None, offset=0):
+        '''Private method running query() without a deadline.
+        Answers are sorted; a page only needs the smallest offset + limit of them.'''
+        lvars, rows = self._answers(query)
+        if not lvars:
+            return bool(rows)
+        if limit is None:
+            rows = sorted(rows, key=_order)[offset:]
+        else:
+            rows = heapq.nsmallest(offset + limit, rows, key=_order)[offset:]
+        if decode:
+            columns = [i for i, v in enumerate(lvars) if decode is True or v == decode or (not isinstance(decode, str) and v in decode)]
+            rows = [tuple(_decode(v) if i in columns else v for i, v in enumerate(row)) for row in rows]
+        if resultset:
+            return ResultSet(lvars, rows)
+        if not rows:
+            return False
+        return [dict(zip(lvars, row)) for row in rows]
+
+    def query_one(self, query, timeout=None, decode=None):
+        '''Returns the first answer of a query
+        Usage: instance.query_one( query, timeout, decode )
+
+        Returns: dictionary of the first answer ({} if a yes/no query
+        succeeds) or None if there is none
+
+        Raises: see query()'''
+        result = self.query(query, timeout, decode, limit=1)
+        if result is True:
+            return {}
+        if not result:
+            return None
+        return result[0]
+
+    def _answers(self, query):
+        '''Private method returning the variables and the set of answer tuples of a query.'''
+        compiled = self._queries.get(query)
+        if compiled is None:
+            try:
+                parser = _Parser(query)
+                body = parser.query()
+            except _Syntax as e:
+                raise self._error(query, 'Syntax error: ' + str(e))
+            slots = [parser.slots[n] for n in parser.names]
+            compiled = (parser.names, slots, len(parser.slots), self._plan(body, len(parser.slots), None), body)
+            if len(self._queries) >= 1024:
+                self._queries.clear()
+            self._queries[query] = compiled
+        lvars, slots, size, steps, body = compiled
+        model = self._evaluate()
+        for literal in body:
+            if literal[0] != 'cmp' and literal[1] not in model:
+                raise self._error(query, 'Unknown predicate ' + literal[1][0] + '/' + str(literal[1][1]))
+        rows = set()
+        relations = lambda index, key: model.get(key)
+        for env in self._solve(steps, 0, [None] * size, relations):
+            rows.add(tuple(env[s] for s in slots))
+            if not slots:
+                break
+            if len(rows) % 10000 == 0:
+                self._check()
+        return lvars, rows
+
+    def _error(self, query, error):
+        '''Private method constructing DatalogQueryError.'''
+        return DatalogQueryError('Error while executing query "' + query + '". Error from ' + self.name + ':\n' + error)
+
+    def iquery(self, query):
+        '''Queries the model of the program, yielding solutions
+        Usage: for solution in instance.iquery( query ): ...
+        query - usual DES query (example: 'likes( X, Y )')
+
+        Yields: one dictionary per answer, keys are variable names. A
+        yes/no query yields a single empty dictionary if the answer is yes.
+
+        Raises: DatalogQueryError'''
+        lvars, rows = self._answers(self._terminate(query))
+        for row in sorted(rows, key=_order):
+            yield dict(zip(lvars, row))
+
+    def query_batch(self, queries):
+        '''Runs many queries
+        Usage: instance.query_batch( queries )
+        queries - list of queries (example: ['likes( john, X )', 'likes( X, curry )'])
+
+        Returns: list with one entry per query, in order. An entry is what
+        query() would have returned for that query or, if the query
+        raised an error, the exception instance.'''
+        results = []
+        for query in queries:
+            try:
+                results.append(self.query(query))
+            except (DatalogQueryError, DatalogCompileError) as e:
+                results.append(e)
+        return results
+
+    def close(self):
+        '''Drops all facts and rules
+        Usage: instance.close()'''
+        self.__init__()
+        self.modules = ()
+
+    def _evaluate(self):
+        '''Private method computing the model of the program, stratum by stratum.
+
+        Raises: DatalogCompileError if negation is not stratified'''
+        if self._model is not None:
+            return self._model
+        model = dict(self._facts)
+        domain = None
+        for component in self._components():
+            rules = [r for key in component for r in self._rules[key]]
+            for r in rules:
+                for kind, key, args in r.body:
+                    if kind == 'neg' and key in component:
+                        raise DatalogCompileError('Program is not stratifiable: ' + key[0] + '/' + str(key[1]) + ' depends negatively on itself.')
+            for key in component:
+                model[key] = _Relation(self._facts[key].tuples if key in self._facts else ())
+            if domain is None and any(self._unsafe(r) for r in rules):
+                domain = self._domain(model)
+            recursive = [(r, i) for r in rules for i, literal in enumerate(r.body) if literal[0] == 'pos' and literal[1] in component]
+            delta = self._round(model, [(r, None) for r in rules], None, domain)
+            while recursive and any(delta[key].tuples for key in delta):
+                delta = self._round(model, recursive, delta, domain)
+        self._model = model
+        return model
+
+    def _round(self, model, derivations, delta, domain):
+        '''Private method running one semi-naive round and merging its new tuples into model.
+        derivations - list of ( rule, index of the body literal read from delta or None )
+
+        Returns: dictionary of new tuples per predicate'''
+        new = {}
+        for rule, index in derivations:
+            self._check()
+            steps = rule.plans.get(index)
+            if steps is None:
+                steps = rule.plans[index] = self._plan(rule.body, rule.size, index)
+            target = model[rule.key].tuples
+            found = new.get(rule.key)
+            if found is None:
+                found = new[rule.key] = set()
+            if delta is None:
+                relations = lambda i, key: model.get(key)
+            else:
+                relations = lambda i, key: delta.get(key) if i == index else model.get(key)
+            head = rule.head
+            if all(isinstance(a, int) for a in head):
+                for env in self._solve(steps, 0, [None] * rule.size, relations, domain):
+                    row = tuple([env[a] for a in head])
+                    if row not in target:
+                        found.add(row)
+            else:
+                for env in self._solve(steps, 0, [None] * rule.size, relations, domain):
+                    row = tuple([env[a] if isinstance(a, int) else a for a in head])
+                    if row not in target:
+                        found.add(row)
+        delta = {}
+        for key, rows in new.items():
+            model[key].update(rows)
+            delta[key] = _Relation(rows)
+        return delta
+
+    def _components(self):
+        '''Private method returning the strongly connected components of the
+        predicate dependency graph, dependencies first (Tarjan).'''
+        index, low, stack, onstack, result = {}, {}, [], set(), []
+        for start in self._rules:
+            if start in index:
+                continue
+            work = [(start, iter(self._edges(start)))]
+            index[start] = low[start] = len(index)
+            stack.append(start)
+            onstack.add(start)
+            while work:
+                node, edges = work[-1]
+                for succ in edges:
+                    if succ not in index:
+                        index[succ] = low[succ] = len(index)
+                        stack.append(succ)
+                        onstack.add(succ)
+                        work.append((succ, iter(self._edges(succ))))
+                        break
+                    elif succ in onstack:
+                        low[node] = min(low[node], index[succ])
+                else:
+                    work.pop()
+                    if work:
+                        low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            key = stack.pop()
+                            onstack.discard(key)
+                            component.append(key)
+                            if key == node:
+                                break
+                        result.append(component)
+        return result
+
+    def _edges(self, key):
+        '''Private method returning the defined predicates the rules of a predicate depend on.'''
+        return [literal[1] for r in self._rules[key] for literal in r.body if literal[0] != 'cmp' and literal[1] in self._rules]
+
+    def _unsafe(self, rule):
+        '''Private method checking whether a rule has variables not bound by a positive atom.'''
+        bound = set(a for kind, key, args in rule.body if kind == 'pos' for a in args if isinstance(a, int))
+        for kind, op, args in rule.body:
+            if kind == 'cmp' and op == '=':
+                bound.update(a for a in args if isinstance(a, int))
+        used = set(a for a in rule.head if isinstance(a, int))
+        used.update(a for kind, key, args in rule.body if kind != 'pos' for a in args if isinstance(a, int))
+        return bool(used - bound)
+
+    def _domain(self, model):
+        '''Private method returning all constants of the facts and rules, sorted.'''
+        constants = set(self._constants)
+        for relation in self._facts.values():
+            for row in relation.tuples:
+                constants.update(row)
+        return sorted(constants)
+
+    def _plan(self, body, size, delta):
+        '''Private method ordering the body literals of a rule or query into evaluation steps.
+        delta - index of the literal read from the delta relation (default: None)
+
+        Filters (negations and comparisons) run as soon as their variables
+        are bound, and among the atoms the one with most bound arguments
+        comes next, so lookups use the hash indexes. Variables no atom binds
+        get a step enumerating the constants of the program.'''
+        bound = set()
+        steps = []
+        pending = list(enumerate(body))
+        if delta is not None:  # the delta relation is smallest, start with it
+            pending.sort(key=lambda item: item[0] != delta)
+        while pending:
+            for n, (i, literal) in enumerate(pending):
+                kind, key, args = literal
+                free = [a for a in args if isinstance(a, int) and a not in bound]
+                if kind == 'neg' and not free:
+                    break
+                if kind == 'cmp' and (not free or (key == '=' and len(free) == 1)):
+                    break
+            else:
+                atoms = [item for item in pending if item[1][0] == 'pos']
+                if not atoms:  # only filters with unbound variables are left
+                    slot = [a for i, l in pending for a in l[2] if isinstance(a, int) and a not in bound][0]
+                    steps.append(('dom', slot))
+                    bound.add(slot)
+                    continue
+                best = max(atoms, key=lambda item: sum(1 for a in item[1][2] if not isinstance(a, int) or a in bound)) if delta is None or steps else atoms[0]
+                n = pending.index(best)
+            i, (kind, key, args) = pending.pop(n)
+            if kind == 'pos':
+                positions = tuple(p for p, a in enumerate(args) if not isinstance(a, int) or a in bound)
+                parts = tuple(args[p] for p in positions)
+                assigns, checks, seen = [], [], {}
+                for p, a in enumerate(args):
+                    if isinstance(a, int) and a not in bound:
+                        if a in seen:
+                            checks.append((p, seen[a]))
+                        else:
+                            seen[a] = p
+                            assigns.append((p, a))
+                bound.update(seen)
+                steps.append(('pos', i, key, positions, parts, tuple(assigns), tuple(checks)))
+            elif kind == 'neg':
+                steps.append(('neg', i, key, args))
+            else:
+                free = [a for a in args if isinstance(a, int) and a not in bound]
+                steps.append(('cmp', key, args, free[0] if free else None))
+                bound.update(free)
+        slots = set(a for l in body for a in l[2] if isinstance(a, int))
+        for slot in sorted(slots - bound):
+            steps.append(('dom', slot))
+        return steps
+
+    def _solve(self, steps, n, env, relations, domain=None):
+        '''Private generator running evaluation steps from step n, yielding env for every solution.
+        The same env list is yielded and changed afterwards, so callers copy what they need.'''
+        if n == len(steps):
+            yield env
+            return
+        step = steps[n]
+        kind = step[0]
+        if kind == 'pos':
+            kind, i, key, positions, parts, assigns, checks = step
+            key_values = tuple(env[a] if isinstance(a, int) else a for a in parts)
+            relation = relations(i, key)
+            if relation is None:
+                return
+            last = n + 1 == len(steps)
+            for row in relation.lookup(positions, key_values):
+                if checks and any(row[p] != row[q] for p, q in checks):
+                    continue
+                for p, a in assigns:
+                    env[a] = row[p]
+                if last:
+                    yield env
+                    continue
+                for e in self._solve(steps, n + 1, env, relations, domain):
+                    yield e
+            for p, a in assigns:
+                env[a] = None
+        elif kind == 'neg':
+            kind, i, key, args = step
+            relation = relations(i, key)
+            row = tuple(env[a] if isinstance(a, int) else a for a in args)
+            if relation is None or row not in relation.tuples:
+                for e in self._solve(steps, n + 1, env, relations, domain):
+                    yield e
+        elif kind == 'cmp':
+            kind, op, (left, right), free = step
+            if free is not None:  # X = value binds X
+                other = right if left == free else left
+                env[free] = env[other] if isinstance(other, int) else other
+                for e in self._solve(steps, n + 1, env, relations, domain):
+                    yield e
+                env[free] = None
+                return
+            a = env[left] if isinstance(left, int) else left
+            b = env[right] if isinstance(right, int) else right
+            if op not in ('=', '\\='):
+                a, b = _number(a), _number(b)
+                if type(a) != type(b):
+                    a, b = str(a), str(b)
+            if comparisons[op](a, b):
+                for e in self._solve(steps, n + 1, env, relations, domain):
+                    yield e
+        else:  # dom
+            slot = step[1]
+            for value in domain if domain is not None else self._domain(None):
+                env[slot] = value
+                for e in self._solve(steps, n + 1, env, relations, domain):
+                    yield e
+            env[slot] = None
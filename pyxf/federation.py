@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+__doc__ = ''' Federated queries over several pyxf engines
+ by the pyxf contributors, 2026
+
+ A Federation sends the parts of a query to different engines (xsb,
+ swipl, eclipse, flora2, des, datalog or an EnginePool of any of them)
+ at the same time and joins or unions their answers in Python on the
+ variables the parts share. Since the parts run concurrently, a
+ federated query takes about as long as its slowest part.
+
+ This library is free software; you can redistribute it and/or
+ modify it under the terms of the GNU Lesser General Public
+ License as published by the Free Software Foundation; either
+ version 2.1 of the License, or (at your option) any later version.'''
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pyxf.pool import EnginePool
+
+
+class FederationError(Exception):
+    '''Exception raised if a federated query names an unknown engine or its variables clash.'''
+    pass
+
+
+def variable(name):
+    '''Returns the dialect independent name of a variable
+    Usage: variable( name ) (example: variable( '?Person' ) == variable( 'Person' ) == 'person')
+
+    The ? of Flora-2 variables is dropped and the name is lowercased.'''
+    return name.lstrip('?').lower()
+
+
+class Federation:
+    '''Named engines queried together, see query()'''
+    def __init__(self, engines):
+        '''Constructor method
+        Usage: Federation( engines )
+        engines - dictionary from a name to an engine, which is a backend
+          instance or an EnginePool (example: { 'rules': xsb(), 'ontology': flora2() })
+
+        A backend instance runs one part at a time, parts sent to an
+        EnginePool run on idle engines of the pool.'''
+        self.engines = dict(engines)
+        self._locks = dict((name, threading.Lock()) for name in self.engines)
+
+    def query(self, parts, how='join', timeout=None, decode=None):
+        '''Runs the parts of a query concurrently and combines their answers
+        Usage: instance.query( parts, how, timeout, decode )
+        parts - list of ( engine name, query ) pairs or dictionary from an
+          engine name to its query, every query in the dialect of its engine
+          (example: [('rules', 'ancestor( X, Person )'), ('ontology', '?person[ age->?age ]')])
+        how - 'join' for the solutions that agree on all shared variables,
+          'union' for the solutions of every part without duplicates
+          (default: 'join')
+        timeout - deadline in seconds of every part (default: None, no deadline)
+        decode - passed to the query() of every part, True to compare and
+          return values as Python values, see pyxf.decode() (default: None)
+
+        Variables are matched across dialects by their names without the ?
+        of Flora-2 and regardless of case (see variable()), and the
+        solutions use these lowercased names (in the example x, person and
+        age, so X comes back as x). A join of parts without shared
+        variables is their cross product.
+
+        Returns: list of solution dictionaries like the query() of the
+          backends, False if there is none and True if no part has
+          variables and the combined answer is not empty
+
+        Raises: FederationError, or the first exception raised by a part'''
+        if how not in ('join', 'union'):
+            raise ValueError('how must be "join" or "union", not ' + repr(how))
+        if isinstance(parts, dict):
+            parts = list(parts.items())
+        if not parts:
+            return False
+        for name, query in parts:
+            if name not in self.engines:
+                raise FederationError('Unknown engine "' + str(name) + '" in federated query.')
+        kwargs = {}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        if decode is not None:
+            kwargs['decode'] = decode
+        if len(parts) == 1:
+            answers = [self._part(parts[0][0], parts[0][1], kwargs)]
+        else:
+            with ThreadPoolExecutor(max_workers=len(parts)) as executor:
+                futures = [executor.submit(self._part, name, query, kwargs) for name, query in parts]
+                answers = [f.result() for f in futures]
+        if how == 'union':
+            rows = self._union(answers)
+        else:
+            rows = self._join(answers)
+        if not rows:
+            return False
+        if not any(rows):  # no variables at all
+            return True
+        return rows
+
+    def _part(self, name, query, kwargs):
+        '''Private method running one part and returning its solutions with normalized variable names.'''
+        engine = self.engines[name]
+        if isinstance(engine, EnginePool):
+            result = engine.query(query, **kwargs)
+        else:
+            with self._locks[name]:
+                result = engine.query(query, **kwargs)
+        if result is True:
+            return [{}]
+        if result is False:
+            return []
+        rows = []
+        for solution in result:
+            row = {}
+            for var, value in solution.items():
+                key = variable(var)
+                if key in row:
+                    raise FederationError('Variables of query "' + query + '" clash after normalization as "' + key + '".')
+                row[key] = value
+            rows.append(row)
+        return rows
+
+    def _union(self, answers):
+        '''Private method concatenating the solutions of all parts, dropping duplicates.'''
+        rows, seen = [], set()
+        for answer in answers:
+            for row in answer:
+                key = repr(sorted(row.items()))
+                if key not in seen:
+                    seen.add(key)
+                    rows.append(row)
+        return rows
+
+    def _join(self, answers):
+        '''Private method joining the solutions of all parts on their shared variables.
+
+        The smallest answer comes first, and the next one is always one
+        sharing variables with the parts joined so far if there is such,
+        so cross products are built only when nothing is shared.'''
+        answers = sorted(answers, key=len)
+        rows = answers.pop(0)
+        names = self._names(rows)
+        while answers and rows:
+            index = 0
+            for i, answer in enumerate(answers):
+                if names & self._names(answer):
+                    index = i
+                    break
+            answer = answers.pop(index)
+            other = self._names(answer)
+            rows = self._hashjoin(rows, answer, sorted(names & other))
+            names |= other
+        return rows
+
+    def _names(self, rows):
+        '''Private method returning the variables of the solutions of one part.'''
+        return set(rows[0]) if rows else set()
+
+    def _hashjoin(self, left, right, shared):
+        '''Private method joining two lists of solutions on the shared variables.'''
+        if len(right) < len(left):
+            left, right = right, left
+        table = {}
+        for row in left:
+            table.setdefault(self._key(row, shared), []).append(row)
+        rows = []
+        for row in right:
+            for match in table.get(self._key(row, shared), ()):
+                joined = dict(match)
+                joined.update(row)
+                rows.append(joined)
+        return rows
+
+    def _key(self, row, shared):
+        '''Private method returning the hashable join key of a solution.'''
+        key = tuple(row[name] for name in shared)
+        try:
+            hash(key)
+        except TypeError:  # decoded lists
+            key = repr(key)
+        return key
+
+    def close(self):
+        '''Closes all engines
+        Usage: instance.close()'''
+        for engine in self.engines.values():
+            try:
+                engine.close()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
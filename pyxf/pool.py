@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+__doc__ = ''' Pool of pre-warmed pyxf engines for running queries in parallel
+ by the pyxf contributors, 2026
+
+ Every pyxf backend instance wraps exactly one interpreter process, which
+ evaluates one goal at a time on one CPU core. EnginePool starts several
+ interpreters of the same backend, loads the same modules into each of
+ them and hands them out on check-out/check-in, so independent queries
+ are evaluated by different processes at the same time.
+
+ This library is free software; you can redistribute it and/or
+ modify it under the terms of the GNU Lesser General Public
+ License as published by the Free Software Foundation; either
+ version 2.1 of the License, or (at your option) any later version.'''
+
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pexpect as px
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+
+class EnginePoolError(Exception):
+    '''Exception raised if the pool is closed or no engine could be checked out.'''
+    pass
+
+
+class EnginePoolBroadcastError(EnginePoolError):
+    '''Exception raised if a broadcast call failed on some of the engines only.
+    results - result or exception of every engine, in the order they were called'''
+    def __init__(self, message, results):
+        EnginePoolError.__init__(self, message)
+        self.results = results
+
+
+class EnginePool:
+    '''Pool of identically initialised engines of one pyxf backend'''
+    def __init__(self, backend, size=None, modules=(), *args, **kwargs):
+        '''Constructor method
+        Usage: EnginePool( backend, size, modules, *args, **kwargs )
+        backend - backend class (example: xsb, swipl, eclipse, flora2, des)
+        size - number of interpreters to start (default: number of CPU cores)
+        modules - list of modules every interpreter loads at startup
+        args, kwargs - passed to the backend constructor (path, args, ...)
+
+        All interpreters are started and warmed up concurrently.
+
+        Raises: whatever the backend constructor or load() raises'''
+        self.backend = backend
+        self.size = size or multiprocessing.cpu_count()
+        self.modules = list(modules)
+        self.args = args
+        self.kwargs = kwargs
+        self.engines = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._broadcasting = threading.Lock()
+        self._closed = False
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            futures = [executor.submit(self._spawn) for i in range(self.size)]
+        try:
+            for f in futures:
+                self.engines.append(f.result())
+        except Exception:
+            for f in futures:
+                if f.exception() is None:
+                    self._close(f.result())
+            raise
+        for e in self.engines:
+            self._idle.put(e)
+
+    def _spawn(self):
+        '''Private method that starts one interpreter and loads the pool modules into it.'''
+        engine = self.backend(*self.args, **self.kwargs)
+        try:
+            for m in self.modules:
+                engine.load(m)
+        except Exception:
+            self._close(engine)
+            raise
+        return engine
+
+    def _close(self, engine):
+        '''Private method that terminates the interpreter of an engine.'''
+        try:
+            engine.close()
+        except Exception:
+            pass
+
+    def checkout(self, timeout=None):
+        '''Takes an idle engine out of the pool
+        Usage: instance.checkout( timeout )
+        timeout - seconds to wait for an idle engine (default: None, wait forever)
+
+        Returns: backend instance which has to be returned with checkin()
+
+        A slot whose engine could not be replaced on check-in gets its
+        engine started here.
+
+        Raises: EnginePoolError, or whatever starting a replacement engine raises'''
+        if self._closed:
+            raise EnginePoolError('Engine pool is closed.')
+        try:
+            engine = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise EnginePoolError('No idle engine available after %s seconds.' % timeout)
+        if engine is None:  # empty slot, see checkin()
+            try:
+                engine = self._spawn()
+            except Exception:
+                self._idle.put(None)
+                raise
+            with self._lock:
+                self.engines.append(engine)
+        return engine
+
+    def checkin(self, engine, broken=False):
+        '''Returns an engine taken with checkout() back to the pool
+        Usage: instance.checkin( engine, broken )
+        engine - backend instance returned by checkout()
+        broken - if True the interpreter is replaced by a freshly started one
+
+        If the replacement fails to start, its slot stays in the pool
+        empty and the next checkout() starts it again, so the pool never
+        shrinks.'''
+        if broken or self._closed:
+            with self._lock:
+                if engine in self.engines:
+                    self.engines.remove(engine)
+            self._close(engine)
+            if self._closed:
+                return
+            try:
+                engine = self._spawn()
+            except Exception:
+                self._idle.put(None)
+                return
+            with self._lock:
+                self.engines.append(engine)
+        self._idle.put(engine)
+
+    @contextmanager
+    def engine(self, timeout=None):
+        '''Context manager around checkout()/checkin()
+        Usage: with instance.engine() as e:
+                   e.query( 'likes( X, Y )' )
+
+        An engine whose interpreter died or stopped responding (pexpect
+        EOF or TIMEOUT) is replaced by a fresh one on check-in.'''
+        e = self.checkout(timeout)
+        broken = False
+        try:
+            yield e
+        except px.ExceptionPexpect:
+            broken = True
+            raise
+        finally:
+            self.checkin(e, broken)
+
+    def query(self, query, **kwargs):
+        '''Runs one query on an idle engine
+        Usage: instance.query( query, **kwargs )
+        query - query in the dialect of the pool backend
+        kwargs - passed to the backend query() (timeout, decode, ...)
+
+        Returns: whatever the backend query() returns'''
+        with self.engine() as e:
+            return e.query(query, **kwargs)
+
+    def broadcast(self, method, *args, **kwargs):
+        '''Calls a method on every engine, to keep their states identical
+        Usage: instance.broadcast( method, *args, **kwargs ) (example: instance.broadcast( 'loadfacts', facts ))
+        method - name of a backend method (example: 'query', 'loadfacts')
+
+        Waits until all engines are idle and calls the method on each of
+        them in turn. Engines started later to replace broken ones do not
+        see the call, use load() for modules.
+
+        Every engine is called, even after a call failed. A failed call
+        may have changed its engine halfway (a module compiled in part,
+        some of the facts added), and the other engines now differ from
+        it, so if any call fails all engines are replaced by fresh ones
+        with the modules of the pool loaded (see checkin()).
+
+        Returns: list of the results of every engine
+
+        Raises: the exception of the first engine if the call failed on all
+          of them, EnginePoolBroadcastError if it failed on some of them'''
+        with self._broadcasting:
+            engines = []
+            results = []
+            try:
+                for i in range(self.size):
+                    engines.append(self.checkout())
+                for e in engines:
+                    try:
+                        results.append(getattr(e, method)(*args, **kwargs))
+                    except Exception as x:
+                        results.append(x)
+            finally:
+                failed = [r for r in results if isinstance(r, Exception)]
+                for e in engines:
+                    self.checkin(e, bool(failed))
+            if len(failed) == len(results):
+                raise failed[0]
+            if failed:
+                raise EnginePoolBroadcastError('Call of %s() failed on %d of %d engines, all engines were replaced: %s' % (method, len(failed), len(results), '; '.join(repr(x) for x in failed)), results)
+            return results
+
+    def load(self, module, timeout=None):
+        '''Loads a module into every engine, and into engines started later
+        Usage: instance.load( path, timeout )
+
+        The module is added to the modules of the pool only if every
+        engine loaded it. Otherwise all engines are replaced by fresh ones
+        without it (see broadcast()).
+
+        Raises: whatever the backend load() raises, EnginePoolBroadcastError'''
+        self.broadcast('load', module, timeout)
+        self.modules.append(module)
+
+    def map(self, queries, **kwargs):
+        '''Spreads a list of queries across all engines in the pool
+        Usage: instance.map( queries, **kwargs )
+        queries - iterable of queries in the dialect of the pool backend
+        kwargs - passed to the backend query() of every query (timeout, decode, ...)
+
+        Returns: list of query() results in the same order as queries
+
+        Raises: the first exception raised by any of the queries'''
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(functools.partial(self.query, **kwargs), queries))
+
+    def close(self):
+        '''Terminates all interpreters in the pool
+        Usage: instance.close()'''
+        self._closed = True
+        with self._lock:
+            engines, self.engines = self.engines, []
+        for e in engines:
+            self._close(e)
+
+    def __len__(self):
+        '''Returns the number of running engines, less than size while replacements failed to start.'''
+        return len(self.engines)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
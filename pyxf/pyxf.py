@@ -21,16 +21,2091 @@ __doc__ = ''' Python interface to XSB Prolog, SWI Prolog, ECLiPSe Prolog and Flo
 __version__ = '1.0.6'
 
 import pexpect as px
+from pexpect.spawnbase import SpawnBase
+import codecs
+import copy
+import csv
+import glob
+import hashlib
+import itertools
+import math
+import mmap
+import os
+import random
 import re
+import select
+import shlex
+import shutil
+import signal
+import string
+import sys
+import subprocess
+import tempfile
+import threading
+import time
 import warnings
 from collections import OrderedDict
 
+if sys.version_info >= (3, 7):
+    from pyxf.aio import _abackend, _aprepared, _aprolog, _aflora2, _ades, aspawn
+else:  # Python 2 or before 3.7, without the coroutine API of pyxf.aio
+    class _abackend: pass
+    class _aprepared: pass
+    class _aprolog: pass
+    class _aflora2: pass
+    class _ades: pass
+
 xsbprompt = '[|][ ][?][-][ ]'
 xsberror = '[+][+]Error.*'
 
 var_re = re.compile('[^a-zA-Z0-9_]([A-Z][a-zA-Z0-9_]*)')
 res_re = re.compile("res[\(]'([A-Z][a-zA-Z0-9_]*)',[ ]?(.*)[\)]")
 
+# random sentinel framing result records of the Prolog backends
+_sentinel = ''.join(random.choice(string.ascii_lowercase) for i in range(12))
+# variables a printing goal binds for itself (catch, counter and stream), renamed per goal of a batch
+local_re = re.compile('(?<![a-zA-Z0-9_])(_?[ECST]' + _sentinel[:6] + ')(?![a-zA-Z0-9])')
+
+# queries changing engine state; they are never cached and invalidate the result cache
+update_re = re.compile('^[/\\[]|(?<![a-zA-Z0-9_])(assert[az]?|retract(all)?|abolish[a-z_]*|(bt|t_)?(insert|delete|erase)(all)?|(re)?consult|ensure_loaded|load_[a-z_]*|use_module|record[az]?|(nb_|b_)?setval|incval|decval|conset|flag|set_prolog_flag)(?![a-zA-Z0-9_])')
+# lines of an export file that ExportReader has to split character by character
+field_re = re.compile('[\'"(\\[{]')
+# quoted atoms and strings, whose whitespace is significant
+quoted_re = re.compile('(\'(?:[^\'\\\\]|\\\\.)*\'|"(?:[^"\\\\]|\\\\.)*")')
+space_re = re.compile('\\s*([,)\\]}])\\s*|([(\\[{])\\s*|\\s+')
+# tokens of decode(): float, integer, quoted atom, string (Flora2 typed literals
+# included), plain or symbolic atom, variable and punctuation
+term_re = re.compile('\\s*(?:(-?[0-9]+(?:\\.[0-9]+(?:[eE][-+]?[0-9]+)?|[eE][-+]?[0-9]+))|(-?[0-9]+)|\'((?:[^\'\\\\]|\'\'|\\\\(?:x[0-9a-fA-F]+\\\\|[0-7]+\\\\|.))*)\'|"((?:[^"\\\\]|""|\\\\(?:x[0-9a-fA-F]+\\\\|[0-7]+\\\\|.))*)"(?:\\^\\^\\\\?[a-zA-Z_]+)?|([A-Z_][a-zA-Z0-9_]*|[?][a-zA-Z0-9_]*)|([a-z][a-zA-Z0-9_]*|\\[\\]|\\{\\}|[-#$&*+./:<=>@^~\\\\]+|!|;)|([(\\[{,|)\\]}]))')
+escape_re = re.compile('\\\\(x[0-9a-fA-F]+\\\\?|[0-7]+\\\\?|\n|.)|\'\'|""')
+escapes = {'n': '\n', 't': '\t', 'r': '\r', 'a': '\a', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0', 'e': '\x1b', 's': ' ', '\n': ''}
+
+
+class pipespawn(SpawnBase):
+    '''pexpect compatible child process talking over plain pipes instead of a pseudo terminal'''
+    def __init__(self, command, timeout=30, maxread=2000, cwd=None, env=None):
+        '''Constructor method
+        Usage: pipespawn( command, timeout )
+        command - command line of the child process
+        timeout - default timeout of expect() and reads in seconds
+
+        Standard error is merged into standard output. Nothing is echoed
+        and line endings are passed through untouched.
+
+        Raises: pexpect.ExceptionPexpect if the command cannot be started'''
+        SpawnBase.__init__(self, timeout=timeout, maxread=maxread)
+        self.delaybeforesend = None  # no terminal line discipline to wait for
+        try:
+            self.proc = subprocess.Popen(shlex.split(command), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0, cwd=cwd, env=env)
+        except OSError as e:
+            raise px.ExceptionPexpect('Could not start "' + command + '": ' + str(e))
+        self.pid = self.proc.pid
+        self.child_fd = self.proc.stdout.fileno()
+        self.closed = False
+        self.terminated = False
+
+    def read_nonblocking(self, size=1, timeout=-1):
+        '''Reads at most size bytes, waiting at most timeout seconds for the first one.
+
+        Raises: pexpect.TIMEOUT, pexpect.EOF'''
+        if timeout == -1:
+            timeout = self.timeout
+        if not select.select([self.child_fd], [], [], timeout)[0]:
+            raise px.TIMEOUT('Timeout exceeded.')
+        return SpawnBase.read_nonblocking(self, size)
+
+    def send(self, s):
+        '''Writes s to the standard input of the child.'''
+        s = self._encoder.encode(self._coerce_send_string(s), final=False)
+        self._log(s, 'send')
+        view = memoryview(s)
+        while view:
+            view = view[os.write(self.proc.stdin.fileno(), view):]
+        return len(s)
+
+    def sendline(self, s=''):
+        '''Writes s followed by a line separator to the standard input of the child.'''
+        return self.send(self._coerce_send_string(s) + self.linesep)
+
+    def sendintr(self):
+        '''Sends SIGINT to the child.'''
+        self.kill(signal.SIGINT)
+
+    def sendeof(self):
+        '''Closes the standard input of the child.'''
+        self.proc.stdin.close()
+
+    def kill(self, sig):
+        '''Sends a signal to the child.'''
+        if self.isalive():
+            os.kill(self.pid, sig)
+
+    def isalive(self):
+        return self.proc.poll() is None
+
+    def close(self, force=True):
+        '''Closes the pipes and waits for the child, killing it if it does not exit (force).'''
+        if self.closed:
+            return
+        self.proc.stdin.close()
+        deadline = time.time() + self.delayafterclose
+        while self.proc.poll() is None and time.time() < deadline:
+            time.sleep(0.01)
+        if self.proc.poll() is None:
+            if not force:
+                raise px.ExceptionPexpect('Could not terminate the child.')
+            self.proc.kill()
+            self.proc.wait()
+        self.proc.stdout.close()
+        self.exitstatus = self.proc.returncode
+        self.closed = self.terminated = True
+
+
+# spawn callables by transport name, see _backend._spawn()
+transports = {'pty': px.spawn, 'pipe': pipespawn}
+
+
+class CallStats:
+    '''Measurements of one engine call, passed to the observer of the engine (see _backend.observer)
+
+    Attributes:
+      backend - engine name (example: 'XSB')
+      kind - 'query', 'query_batch' or 'load'
+      text - query, module or number of queries of the call
+      build - seconds spent turning queries into goals
+      write - seconds spent writing to the engine
+      read - seconds spent waiting for and reading engine output
+      parse - remaining seconds, spent parsing output into results
+      total - wall clock seconds of the whole call
+      bytes - bytes of engine output read
+      solutions - number of solutions returned
+      errors - number of failed queries (a batch may have several)
+      error - exception raised by the call or None'''
+    __slots__ = ('backend', 'kind', 'text', 'build', 'write', 'read', 'parse', 'total', 'bytes', 'solutions', 'errors', 'error')
+    phases = ('build', 'write', 'read', 'parse', 'total')
+
+    def __init__(self, backend, kind, text):
+        self.backend = backend
+        self.kind = kind
+        self.text = text
+        self.build = self.write = self.read = self.parse = self.total = 0.0
+        self.bytes = self.solutions = self.errors = 0
+        self.error = None
+
+    def count(self, result):
+        '''Adds the solutions and errors of a query() result or query_batch() entry.'''
+        if isinstance(result, Exception):
+            self.errors += 1
+        elif isinstance(result, (list, ResultSet)):
+            self.solutions += len(result)
+        elif result is True:
+            self.solutions += 1
+
+
+class Metrics:
+    '''Observer aggregating CallStats into counters and latency histograms
+    Usage: instance.observer = Metrics() (one Metrics may observe many engines)
+
+    Histograms have logarithmic buckets 5% apart, so memory stays small
+    and percentiles are accurate to about 5% however many calls are
+    observed.'''
+    base = 1.05
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        '''Forgets everything observed so far
+        Usage: instance.reset()'''
+        with self._lock:
+            self._kinds = {}  # ( backend, kind ) -> [ counters, { phase: { bucket: count } } ]
+
+    def __call__(self, stats):
+        '''Adds one CallStats instance.'''
+        with self._lock:
+            entry = self._kinds.get((stats.backend, stats.kind))
+            if entry is None:
+                entry = self._kinds[(stats.backend, stats.kind)] = [dict.fromkeys(('calls', 'solutions', 'errors', 'bytes'), 0), dict((p, {}) for p in CallStats.phases)]
+            counters, histograms = entry
+            counters['calls'] += 1
+            counters['solutions'] += stats.solutions
+            counters['errors'] += stats.errors
+            counters['bytes'] += stats.bytes
+            for phase in CallStats.phases:
+                bucket = self._bucket(getattr(stats, phase))
+                histogram = histograms[phase]
+                histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    def _bucket(self, seconds):
+        '''Private method returning the histogram bucket of a duration.'''
+        if seconds <= 1e-7:
+            return None
+        return int(math.floor(math.log(seconds, self.base)))
+
+    def _percentile(self, histogram, calls, q):
+        '''Private method returning the upper bound of the bucket holding the q-th percentile.'''
+        rank = q / 100.0 * calls
+        seen = histogram.get(None, 0)
+        if seen >= rank:
+            return 0.0
+        for bucket in sorted(b for b in histogram if b is not None):
+            seen += histogram[bucket]
+            if seen >= rank:
+                return self.base ** (bucket + 1)
+        return 0.0
+
+    def snapshot(self, percentiles=(50, 95, 99)):
+        '''Returns the aggregated measurements
+        Usage: instance.snapshot( percentiles )
+        percentiles - percentiles to compute (default: (50, 95, 99))
+
+        Returns: dictionary with one entry per backend name and call kind,
+        for example:
+          {'XSB': {'query': {'calls': 10, 'solutions': 20, 'errors': 0, 'bytes': 1280,
+                             'read': {'p50': 0.0012, 'p95': 0.0031, 'p99': 0.0034}, ...}}}'''
+        with self._lock:
+            result = {}
+            for (backend, kind), (counters, histograms) in self._kinds.items():
+                entry = dict(counters)
+                for phase, histogram in histograms.items():
+                    entry[phase] = dict(('p' + str(q), self._percentile(histogram, counters['calls'], q)) for q in percentiles)
+                result.setdefault(backend, {})[kind] = entry
+            return result
+
+
+class ProfileReport:
+    '''Measurements of one query taken inside the engine, see _prolog.profile()
+
+    Attributes:
+      backend - engine name (example: 'SWI')
+      query - the query
+      statistics - dictionary from the name of an engine statistic to its
+        change during the query, cputime in seconds on all Prolog engines,
+        inferences and table_space_used in bytes on SWI, tablespace in
+        bytes on XSB
+      predicates - dictionary from predicate indicator to a dictionary with
+        calls and seconds (time spent in the predicate itself), filled from
+        the sampling profiler of SWI-Prolog and empty on other engines'''
+    __slots__ = ('backend', 'query', 'statistics', 'predicates')
+
+    def __init__(self, backend, query, statistics, predicates):
+        self.backend = backend
+        self.query = query
+        self.statistics = statistics
+        self.predicates = predicates
+
+    def __repr__(self):
+        return 'ProfileReport(' + repr(self.query) + ', ' + repr(self.statistics) + ', ' + str(len(self.predicates)) + ' predicates)'
+
+
+class Profiler:
+    '''Profiler aggregating ProfileReports over many queries
+    Usage: instance.profiler = Profiler() (one Profiler may profile many engines)
+
+    Totals are kept per engine statistic, per query text and per predicate,
+    so the queries and predicates that dominate a mix of queries can be
+    listed with top().'''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        '''Forgets everything profiled so far
+        Usage: instance.reset()'''
+        with self._lock:
+            self.reports = 0
+            self._statistics = {}  # statistic -> total
+            self._queries = {}  # ( backend, query ) -> { 'calls': n, statistic: total }
+            self._predicates = {}  # predicate indicator -> { 'calls': n, 'seconds': total }
+
+    def __call__(self, report):
+        '''Adds one ProfileReport instance.'''
+        with self._lock:
+            self.reports += 1
+            entry = self._queries.get((report.backend, report.query))
+            if entry is None:
+                entry = self._queries[(report.backend, report.query)] = {'calls': 0}
+            entry['calls'] += 1
+            for name, value in report.statistics.items():
+                self._statistics[name] = self._statistics.get(name, 0) + value
+                entry[name] = entry.get(name, 0) + value
+            for name, values in report.predicates.items():
+                totals = self._predicates.get(name)
+                if totals is None:
+                    totals = self._predicates[name] = {'calls': 0, 'seconds': 0.0}
+                totals['calls'] += values['calls']
+                totals['seconds'] += values['seconds']
+
+    def top(self, n=10, by='seconds'):
+        '''Returns the predicates or queries that took most
+        Usage: instance.top( n, by )
+        n - number of entries (default: 10)
+        by - 'seconds' or 'calls' for predicates, or the name of an engine
+          statistic (example: 'cputime') for queries (default: 'seconds')
+
+        Returns: list of ( predicate indicator, totals ) or
+          ( ( backend, query ), totals ) tuples, largest first'''
+        with self._lock:
+            entries = self._predicates if by in ('seconds', 'calls') else self._queries
+            ranked = sorted(entries.items(), key=lambda e: e[1].get(by, 0), reverse=True)
+            return [(key, dict(totals)) for key, totals in ranked[:n]]
+
+    def snapshot(self):
+        '''Returns the aggregated measurements
+        Usage: instance.snapshot()
+
+        Returns: dictionary with reports (number of reports), statistics
+          (totals per engine statistic), queries and predicates (totals per
+          query and per predicate)'''
+        with self._lock:
+            return {'reports': self.reports,
+                    'statistics': dict(self._statistics),
+                    'queries': dict((k, dict(v)) for k, v in self._queries.items()),
+                    'predicates': dict((k, dict(v)) for k, v in self._predicates.items())}
+
+
+class Term:
+    '''Compound term returned by decode(), for example f( x, g( y ) )
+
+    Attributes:
+      name - functor name (example: 'f')
+      args - tuple of decoded arguments (example: ('x', Term( 'g', ('y',) )))'''
+    __slots__ = ('name', 'args')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = tuple(args)
+
+    @property
+    def arity(self):
+        return len(self.args)
+
+    def __getitem__(self, index):
+        return self.args[index]
+
+    def __eq__(self, other):
+        return isinstance(other, Term) and self.name == other.name and self.args == other.args
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.name, self.args))
+
+    def __repr__(self):
+        name = self.name if re.match('[a-z][a-zA-Z0-9_]*$', self.name) else repr(self.name)
+        return name + '(' + ', '.join(repr(a) for a in self.args) + ')'
+
+
+def _unescape(match):
+    '''Private function replacing one escape sequence of a quoted atom or string.'''
+    text = match.group()
+    if text == "''" or text == '""':
+        return text[0]
+    char = match.group(1)
+    if char[0] == 'x' and len(char) > 1:
+        return chr(int(char[1:].rstrip('\\'), 16))
+    if char[0] in '01234567' and (len(char) > 1 or char != '0'):
+        return chr(int(char.rstrip('\\'), 8))
+    return escapes.get(char, char)
+
+
+def decode(text):
+    '''Turns the text of a value written by an engine into Python values
+    Usage: decode( text ) (example: decode( "f(1,'A b',[x,2.5])" ))
+
+    Integers and floats become int and float, atoms, quoted atoms and
+    strings become str (with Prolog and Flora2 escapes resolved and the
+    type of Flora2 typed literals dropped), proper lists become list and
+    compound terms Term instances. Variables are returned by name. A
+    partial list becomes a chain of '[|]' terms. Operators are not
+    understood, which is why the Prolog backends write decoded values
+    with write_canonical/1.
+
+    The text is read in a single pass without recursion.
+
+    Returns: the decoded value, or text unchanged if it is not a term
+    decode() understands (example: decode( 'a + b' ) == 'a + b')'''
+    stack = []  # open terms: [ kind, functor name, items ], kind is one of ( [ | {
+    pos, end = 0, len(text)
+    match = term_re.match
+    while True:
+        token = match(text, pos)  # a value
+        if token is None:
+            return text
+        pos = token.end()
+        kind = token.lastindex
+        if kind == 1:
+            value = float(token.group(1))
+        elif kind == 2:
+            value = int(token.group(2))
+        elif kind == 3 or kind == 6:
+            value = token.group(kind)
+            if kind == 3 and ('\\' in value or "''" in value):
+                value = escape_re.sub(_unescape, value)
+            if pos < end and text[pos] == '(':
+                stack.append(['(', value, []])
+                pos += 1
+                continue
+            if value == '[]' and kind == 6:
+                value = []
+        elif kind == 4:
+            value = token.group(4)
+            if '\\' in value or '""' in value:
+                value = escape_re.sub(_unescape, value)
+        elif kind == 5:
+            value = token.group(5)
+        elif token.group(7) in '[{(':
+            stack.append([token.group(7), None, []])
+            continue
+        else:
+            return text
+        while True:  # punctuation after a value
+            if not stack:
+                if text[pos:].strip():
+                    return text
+                return value
+            token = match(text, pos)
+            if token is None or token.lastindex != 7:
+                return text
+            pos = token.end()
+            char = token.group(7)
+            frame = stack[-1]
+            if char == ',' and frame[0] != '|':
+                frame[2].append(value)
+                break
+            if char == '|' and frame[0] == '[':
+                frame[2].append(value)
+                frame[0] = '|'
+                break
+            if char == ')' and frame[0] == '(':
+                frame[2].append(value)
+                value = Term(frame[1], frame[2]) if frame[1] is not None else frame[2][0]
+                if frame[1] is None and len(frame[2]) > 1:
+                    return text
+            elif char == ']' and frame[0] == '[':
+                frame[2].append(value)
+                value = frame[2]
+            elif char == ']' and frame[0] == '|':
+                if isinstance(value, list):
+                    value = frame[2] + value
+                else:
+                    for item in reversed(frame[2]):
+                        value = Term('[|]', (item, value))
+            elif char == '}' and frame[0] == '{':
+                items = frame[2] + [value]
+                value = items.pop()
+                while items:
+                    value = Term(',', (items.pop(), value))
+                value = Term('{}', (value,))
+            else:
+                return text
+            stack.pop()
+
+
+class ResultSet:
+    '''Column oriented result of query( ..., resultset=True )
+
+    Variable names are kept once and the values in one list per variable,
+    which takes a fraction of the memory of one dictionary per solution
+    and converts to NumPy arrays or a pandas DataFrame column by column.
+
+    Usage:
+      len( rs ) - number of solutions
+      for row in rs: ... - solutions as tuples of values in order of names
+      rs[ i ] - solution i as a tuple, rs[ i:j ] - ResultSet of some solutions
+      rs[ 'X' ] - list of the values of variable X
+      rs.dicts() - solutions as the dictionaries query() returns by default
+
+    An empty ResultSet is false, like the False query() returns when a
+    query has no solutions.'''
+    __slots__ = ('names', 'columns')
+
+    def __init__(self, names, rows=(), columns=None):
+        '''Constructor method
+        Usage: ResultSet( names, rows, columns )
+        names - variable names
+        rows - sequences of values in order of names (default: none)
+        columns - lists of values, one per name, used instead of rows
+
+        Rows are added to the columns one at a time as they are taken from
+        rows, so a generator parsing engine output is never held as a
+        whole next to the columns.'''
+        self.names = tuple(names)
+        if columns is None:
+            columns = [[] for name in self.names]
+            appends = [column.append for column in columns]
+            for row in rows:
+                for append, value in zip(appends, row):
+                    append(value)
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __iter__(self):
+        return zip(*self.columns)
+
+    def __getitem__(self, index):
+        if isinstance(index, str):
+            return self.columns[self.names.index(index)]
+        if isinstance(index, slice):
+            return ResultSet(self.names, columns=[column[index] for column in self.columns])
+        return tuple(column[index] for column in self.columns)
+
+    def __eq__(self, other):
+        if isinstance(other, ResultSet):
+            return self.names == other.names and self.columns == other.columns
+        if isinstance(other, list):
+            return self.dicts() == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'ResultSet(' + repr(list(self.names)) + ', ' + str(len(self)) + ' rows)'
+
+    def copy(self):
+        '''Returns a ResultSet with copies of the column lists.'''
+        return ResultSet(self.names, columns=[list(column) for column in self.columns])
+
+    def dicts(self):
+        '''Returns the solutions as a list of dictionaries, keys are variable names.'''
+        names = self.names
+        return [dict(zip(names, row)) for row in zip(*self.columns)]
+
+    def to_numpy(self, name=None, dtype=None):
+        '''Converts values to a NumPy array
+        Usage: instance.to_numpy( name, dtype )
+        name - variable whose values are converted (default: None, all of them)
+        dtype - NumPy data type (default: None, guessed by NumPy)
+
+        Returns: one dimensional array of the values of name, or a two
+        dimensional array with one column per variable
+
+        Raises: ImportError if NumPy is not installed'''
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('ResultSet.to_numpy() needs NumPy (pip install numpy)')
+        if name is not None:
+            return numpy.array(self[name], dtype=dtype)
+        if not self.columns:
+            return numpy.empty((len(self), 0), dtype=dtype)
+        return numpy.array(self.columns, dtype=dtype).T
+
+    def to_pandas(self):
+        '''Converts the result to a pandas DataFrame with one column per variable
+        Usage: instance.to_pandas()
+
+        Raises: ImportError if pandas is not installed'''
+        try:
+            import pandas
+        except ImportError:
+            raise ImportError('ResultSet.to_pandas() needs pandas (pip install pandas)')
+        return pandas.DataFrame(OrderedDict(zip(self.names, self.columns)), columns=list(self.names))
+
+
+class ExportReader:
+    '''Reader of a file written by export(), mapped into memory
+
+    The file has a header line with the variable names and one line per
+    solution with the values as written by write_canonical/1, separated
+    by commas (format 'csv') or tabs (format 'tsv'). Quoted atoms and
+    compound terms may contain the separator, fields are only split
+    outside of quotes and brackets. Lines are read from the mapped file
+    as they are iterated, so the file is never read into memory at once.
+
+    Usage:
+      reader.names - variable names
+      for row in reader: ... - solutions as tuples of values in order of names
+      reader.dicts() - solutions as dictionaries
+      reader.resultset() - all solutions as a ResultSet'''
+    separators = {'csv': ',', 'tsv': '\t'}
+
+    def __init__(self, path, format='csv', typed=True):
+        '''Constructor method
+        Usage: ExportReader( path, format, typed )
+        path - file written by export()
+        format - 'csv' or 'tsv' (default: 'csv')
+        typed - turn values into Python values with decode() instead of
+          returning the text of every value (default: True)
+
+        Raises: ValueError for an unknown format'''
+        if format not in self.separators:
+            raise ValueError('Unknown export format "' + str(format) + '", use "csv" or "tsv".')
+        self.path = path
+        self.format = format
+        self.typed = typed
+        self._separator = self.separators[format]
+        self._file = open(path, 'rb')
+        if os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:  # empty files cannot be mapped
+            self._map = b''
+        end = self._map.find(b'\n')
+        if end < 0:
+            end = len(self._map)
+        header = self._map[:end].decode('utf-8')
+        self.names = header.split(self._separator) if header else []
+        self._start = end + 1
+
+    def __iter__(self):
+        mm, size, pos = self._map, len(self._map), self._start
+        width = len(self.names)
+        while pos < size:
+            end = mm.find(b'\n', pos)
+            if end < 0:
+                end = size
+            line = mm[pos:end].decode('utf-8')
+            pos = end + 1
+            if not width:
+                yield ()
+                continue
+            fields = self._fields(line)
+            if self.typed:
+                fields = [decode(f) for f in fields]
+            yield tuple(fields)
+
+    def _fields(self, line):
+        '''Private method splitting a line at the separators outside of quotes and brackets.'''
+        if not field_re.search(line):
+            return line.split(self._separator)
+        fields, start, depth, quote = [], 0, 0, None
+        i = 0
+        while i < len(line):
+            c = line[i]
+            if quote:
+                if c == '\\':
+                    i += 1
+                elif c == quote:
+                    quote = None
+            elif c == "'" or c == '"':
+                quote = c
+            elif c in '([{':
+                depth += 1
+            elif c in ')]}':
+                depth -= 1
+            elif c == self._separator and not depth:
+                fields.append(line[start:i])
+                start = i + 1
+            i += 1
+        fields.append(line[start:])
+        return fields
+
+    def dicts(self):
+        '''Yields the solutions as dictionaries like query() returns.'''
+        names = self.names
+        for row in self:
+            yield dict(zip(names, row))
+
+    def resultset(self):
+        '''Returns all solutions as a ResultSet.'''
+        return ResultSet(self.names, self)
+
+    def close(self):
+        '''Unmaps and closes the file.'''
+        if not isinstance(self._map, bytes):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def normalize(text):
+    '''Returns the normalized form of a query or fact.
+    Whitespace is collapsed and dropped around brackets and commas,
+    except inside quoted atoms and strings.'''
+    parts = quoted_re.split(text.strip())
+    for i in range(0, len(parts), 2):
+        parts[i] = space_re.sub(lambda m: m.group(1) or m.group(2) or ' ', parts[i])
+    return ''.join(parts)
+
+
+class QueryCache:
+    '''LRU cache of query results with optional expiry, see _backend.cache'''
+    def __init__(self, maxsize=1024, ttl=None, maxrows=None):
+        '''Constructor method
+        Usage: QueryCache( maxsize, ttl, maxrows )
+        maxsize - maximum number of cached queries (default: 1024)
+        ttl - seconds a result stays valid (default: None, until invalidated)
+        maxrows - maximum number of solutions held by all cached results
+          together (default: None, no limit)
+
+        Counters: hits, misses, evictions (entries dropped to respect
+        maxsize or maxrows), expirations (entries older than ttl) and
+        invalidations (clear() calls caused by state changes).'''
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxrows = maxrows
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+        self._entries = OrderedDict()  # key -> ( time, rows, result )
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    def key(self, query):
+        '''Returns the normalized form of a query used as cache key.'''
+        return normalize(query)
+
+    def get(self, key):
+        '''Looks up a cached result
+        Usage: instance.get( key )
+
+        Returns: ( True, result ) on a hit, ( False, None ) on a miss'''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.time() - entry[0] > self.ttl:
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries[key] = self._entries.pop(key)  # most recently used last
+            self.hits += 1
+            return True, entry[2]
+
+    def put(self, key, result):
+        '''Stores a result, evicting the least recently used ones if needed
+        Usage: instance.put( key, result )'''
+        rows = len(result) if isinstance(result, (list, ResultSet)) else 1
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if self.maxrows is not None and rows > self.maxrows:
+                return
+            self._entries[key] = (time.time(), rows, result)
+            self._rows += rows
+            while len(self._entries) > self.maxsize or (self.maxrows is not None and self._rows > self.maxrows):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        '''Private method removing one entry.'''
+        self._rows -= self._entries.pop(key)[1]
+
+    def clear(self):
+        '''Removes all cached results
+        Usage: instance.clear()'''
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+            self.invalidations += 1
+
+    def stats(self):
+        '''Returns the counters and current size as a dictionary
+        Usage: instance.stats()'''
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'expirations': self.expirations, 'invalidations': self.invalidations,
+                    'size': len(self._entries), 'rows': self._rows}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class PreparedQuery(_aprepared):
+    '''Query template compiled by the prepare() method of a backend'''
+    def __init__(self, engine, template, helper=True):
+        '''Constructor method, use engine.prepare( template, helper ) instead
+        Usage: PreparedQuery( engine, template, helper )
+
+        The template is split at its parameters (placeholders outside of
+        quoted atoms) and its variables and goal layout are worked out
+        once, so a call only quotes the parameters and joins strings.'''
+        self.engine = engine
+        self.template = engine._terminate(template)
+        self.parts = ['']
+        plain = []
+        for i, part in enumerate(quoted_re.split(self.template[:-1])):
+            if i % 2:
+                self.parts[-1] += part
+            else:
+                plain.append(part)
+                pieces = re.split(engine.placeholder, part)
+                self.parts[-1] += pieces[0]
+                self.parts.extend(pieces[1:])
+        self.arity = len(self.parts) - 1
+        self.lvars = engine._variables(' ' + ' '.join(plain))
+        self.prefix, self.suffix, self.args = engine._prepare(self, helper)
+
+    def text(self, values):
+        '''Returns the template with the given term strings in place of its parameters, without the full stop.'''
+        parts = self.parts
+        return parts[0] + ''.join(v + p for v, p in zip(values, parts[1:]))
+
+    def bind(self, *args):
+        '''Binds Python values to the parameters
+        Usage: instance.bind( *args )
+        args - one value per parameter; numbers are written as numbers,
+          lists and tuples as lists, anything else as a quoted atom
+
+        Returns: ( query, variables, goal ) tuple as sent by the engine
+
+        Raises: TypeError if the number of values does not match'''
+        if len(args) != self.arity:
+            raise TypeError('Prepared query "' + self.template + '" takes ' + str(self.arity) + ' parameters, ' + str(len(args)) + ' given')
+        values = [self.engine._term(v) for v in args]
+        text = self.text(values)
+        if self.args:
+            return text + '.', self.lvars, self.prefix + ','.join(values) + self.suffix
+        return text + '.', self.lvars, self.prefix + text + self.suffix
+
+    def query(self, *args):
+        '''Runs the query with the given parameter values
+        Usage: instance.query( *args ) (example: prepared.query( 'john' ))
+
+        Returns: see the query() method of the backend'''
+        item = self.bind(*args)
+        return self.engine._within('query', item[0], None, self.engine._cached, item[0], lambda query: self.engine._run(item))
+
+    def query_batch(self, rows):
+        '''Runs the query once per row of parameter values with query_batch()
+        Usage: instance.query_batch( rows ) (example: prepared.query_batch( [('john',), ('sandy',)] ))
+
+        Returns: see the query_batch() method of the backend'''
+        engine = self.engine
+        if engine.observer is not None and engine._probe is None:
+            return engine._observed('query_batch', str(len(rows)) + ' rows of ' + self.template, self.query_batch, rows)
+        return engine._batch_items([self.bind(*row) for row in rows])
+
+
+
+class ModuleCache:
+    '''Directory of compiled modules shared by engines and processes, see _prolog.compiled'''
+    def __init__(self, directory=None):
+        '''Constructor method
+        Usage: ModuleCache( directory )
+        directory - where compiled modules are kept (default: pyxf-modules
+          in the temporary directory of the system)
+
+        A compiled module is named after the absolute path and the SHA-1
+        of the content of its source, so it is rebuilt whenever the source
+        changes. The hash is only computed again if the modification time
+        or size of the source changed since the last load.'''
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'pyxf-modules')
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        self._hashes = {}  # ( path, mtime, size ) -> content hash
+
+    def _prefix(self, source):
+        '''Private method returning the part of the name of a compiled module depending on the source path.'''
+        source = os.path.abspath(source)
+        return os.path.join(self.directory, hashlib.sha1(source.encode('utf-8')).hexdigest()[:16])
+
+    def path(self, source, ext):
+        '''Returns the path of the compiled module for a source file
+        Usage: instance.path( source, ext )
+        source - path to the source file
+        ext - extension of the compiled module (example: '.qlf')'''
+        stat = os.stat(source)
+        key = (os.path.abspath(source), stat.st_mtime, stat.st_size)
+        digest = self._hashes.get(key)
+        if digest is None:
+            sha = hashlib.sha1()
+            with open(source, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b''):
+                    sha.update(chunk)
+            digest = self._hashes[key] = sha.hexdigest()
+        return self._prefix(source) + '-' + digest + ext
+
+    def store(self, compiled, path):
+        '''Moves a freshly compiled module into the cache
+        Usage: instance.store( compiled, path )
+        compiled - compiled module as written by the engine
+        path - cache path returned by path()
+
+        Older compiled versions of the same source are removed.'''
+        prefix = path[:path.rindex('-')]
+        for old in glob.glob(prefix + '-*' + os.path.splitext(path)[1]):
+            if old != path:
+                try:
+                    os.remove(old)
+                except OSError:  # removed by another process meanwhile
+                    pass
+        fd, temp = tempfile.mkstemp(dir=self.directory)
+        os.close(fd)
+        shutil.move(compiled, temp)
+        os.rename(temp, path)  # atomic, other processes never see a partial file
+
+    def clear(self):
+        '''Removes all compiled modules (for example after an engine upgrade)
+        Usage: instance.clear()'''
+        for path in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, path))
+        self._hashes.clear()
+
+
+class _backend(_abackend):
+    '''Private base class with the output handling shared by all backends.'''
+    name = ''  # engine name used in error messages
+    prompt = ''  # regex matching the interpreter prompt
+    error = ''  # regex matching an error message
+    QueryError = Exception
+    QueryTimeout = Exception
+    chunksize = 65536  # bytes read from the engine at once
+    window = 256  # characters searched for the prompt
+    batchsize = 2048  # characters written at once by query_batch() (ptys limit lines to 4095)
+    _record = None  # sentinel of the records answers are framed in, see _lines()
+    cache = None  # QueryCache for query results (example: instance.cache = QueryCache( 1024, ttl=60 ))
+    placeholder = '[?]'  # regex matching a parameter of a prepare() template
+    observer = None  # callable receiving a CallStats per query, query_batch and load call (example: Metrics())
+    recovery = 5  # seconds an interrupted engine gets to return to its prompt
+    startup = 5  # seconds a new engine gets to write its first prompt
+    interrupted = None  # regex matching the question asked after an interrupt
+    abort = 'a'  # answer to self.interrupted that aborts the running goal
+    modules = ()  # modules loaded with load(), loaded again by a restarted engine
+    _deadline = None
+    _probe = None  # CallStats of the observed call in progress
+
+    def _terminate(self, query):
+        '''Private method that strips a query and makes sure it ends with a full stop.'''
+        query = query.strip()
+        if query[-1] != '.':
+            query += '.'
+        return query
+
+    def _spawn(self, command, transport):
+        '''Private method starting the engine process as self.engine and waiting for its first prompt.
+        transport - name in transports ('pty' or 'pipe') or a callable
+          taking the command and a timeout keyword and returning a pexpect
+          spawn compatible object
+
+        Raises: pexpect.TIMEOUT if _start() takes more than self.startup seconds'''
+        self._command = command
+        self._transport = transport
+        if not callable(transport):
+            transport = transports[transport]
+        self.engine = transport(command, timeout=self.startup)
+        deadline, self._deadline = self._deadline, time.time() + self.startup
+        try:
+            self._start()
+        finally:
+            self._deadline = deadline
+
+    def _start(self):
+        '''Private method waiting for the first prompt of the engine.'''
+        self._expect(self.prompt)
+
+    def _load(self, module):
+        '''Private method running load() without a deadline.'''
+        self._sendline("['" + module + "'].")
+        self._loaded(module)
+
+    def _remember(self, module):
+        '''Private method adding a loaded module to self.modules.'''
+        if module not in self.modules:
+            self.modules = self.modules + (module,)
+
+    def _within(self, kind, text, timeout, call, *args):
+        '''Private method running call( *args ) with a deadline
+        Usage: instance._within( kind, text, timeout, call, *args )
+        kind - 'query' or 'load'
+        text - the query or module, for the error message and observer
+        timeout - seconds call may take (None for no deadline)
+
+        When the deadline passes, the running goal is interrupted and the
+        engine driven back to its prompt. If it does not get there within
+        self.recovery seconds, it is replaced by a fresh process with
+        self.modules loaded again.
+
+        Without a deadline reads wait for the engine as long as it takes.
+
+        Raises: self.QueryTimeout'''
+        if self.observer is not None and self._probe is None:
+            return self._observed(kind, text, self._within, kind, text, timeout, call, *args)
+        if timeout is None:
+            return call(*args)
+        self._deadline = time.time() + timeout
+        try:
+            return call(*args)
+        except px.TIMEOUT:
+            self._deadline = None
+            raise self._expired(kind, text, timeout, self._recover())
+        finally:
+            self._deadline = None
+
+    def _expired(self, kind, text, timeout, action):
+        '''Private method constructing self.QueryTimeout for a call that exceeded its deadline.
+        action - what _recover() did to the engine'''
+        what = ('Query "' if kind == 'query' else 'Loading module "') + text + '"'
+        return self.QueryTimeout(what + ' exceeded its deadline of ' + str(timeout) + ' seconds. The engine was ' + action + '.')
+
+    def _observed(self, kind, text, call, *args):
+        '''Private method running call( *args ) while measuring it for self.observer.'''
+        probe = self._begin(kind, text)
+        start = time.time()
+        result = None
+        try:
+            result = call(*args)
+            return result
+        except Exception as e:
+            probe.error = e
+            raise
+        finally:
+            self._probe = None
+            self._report(probe, start, result)
+
+    def _begin(self, kind, text):
+        '''Private method starting the CallStats of an observed call.'''
+        self._probe = CallStats(self.name, kind, text)
+        return self._probe
+
+    def _report(self, probe, start, result):
+        '''Private method completing probe with the outcome of the call and handing it to self.observer.'''
+        probe.total = time.time() - start
+        probe.parse = max(probe.total - probe.build - probe.write - probe.read, 0.0)
+        if probe.error is not None:
+            probe.errors += 1
+        elif probe.kind == 'query_batch':
+            for entry in result:
+                probe.count(entry)
+        elif probe.kind == 'query':
+            probe.count(result)
+        try:
+            self.observer(probe)
+        except Exception as e:
+            warnings.warn('Observer ' + repr(self.observer) + ' failed: ' + repr(e))
+
+    def _sendline(self, line):
+        '''Private method writing a line to the engine, timed if the call is observed.'''
+        probe = self._probe
+        if probe is None:
+            return self.engine.sendline(line)
+        start = time.time()
+        self.engine.sendline(line)
+        probe.write += time.time() - start
+
+    def _send(self, data):
+        '''Private method writing data to the engine, timed if the call is observed.'''
+        probe = self._probe
+        if probe is None:
+            return self.engine.send(data)
+        start = time.time()
+        self.engine.send(data)
+        probe.write += time.time() - start
+
+    def _recv(self, timeout):
+        '''Private method reading a chunk of engine output, timed if the call is observed.'''
+        probe = self._probe
+        if probe is None:
+            return self.engine.read_nonblocking(self.chunksize, timeout)
+        start = time.time()
+        data = self.engine.read_nonblocking(self.chunksize, timeout)
+        probe.read += time.time() - start
+        probe.bytes += len(data)
+        return data
+
+    def _expect(self, patterns, timeout=-1):
+        '''Private method waiting for one of patterns, timed if the call is observed.
+        timeout - seconds to wait (default: -1, until the deadline, see _wait())
+
+        Returns: index of the pattern found'''
+        if timeout == -1:
+            timeout = self._wait()
+        probe = self._probe
+        if probe is None:
+            return self.engine.expect(patterns, timeout)
+        start = time.time()
+        index = self.engine.expect(patterns, timeout)
+        probe.read += time.time() - start
+        probe.bytes += len(self.engine.before) + len(self.engine.after)
+        return index
+
+    def _wait(self):
+        '''Private method returning how long the next read may wait for output, None without a deadline.'''
+        if self._deadline is None:
+            return None
+        return max(self._deadline - time.time(), 0)
+
+    def _recover(self):
+        '''Private method bringing the engine back to its prompt after a timeout.
+
+        Returns: description of what was done, for the error message'''
+        self._deadline = time.time() + self.recovery
+        try:
+            self.engine.sendintr()
+            if self.interrupted is not None:
+                if self._expect([self.interrupted, self.prompt]) == 0:
+                    self._send(self.abort)
+            self._sync()
+            return 'interrupted'
+        except (px.TIMEOUT, px.EOF, OSError):
+            self._deadline = None
+            self._respawn()
+            return 'restarted'
+        finally:
+            self._deadline = None
+
+    def _sync(self):
+        '''Private method reading output until the engine waits at its prompt with nothing left to say.'''
+        self._expect(self.prompt)
+        while True:
+            try:
+                self.engine.expect(self.prompt, timeout=0.2)
+            except px.TIMEOUT:
+                break
+        self._unread(b'')
+
+    def _respawn(self):
+        '''Private method replacing the engine by a fresh process in the same state.'''
+        modules, self.modules = self.modules, ()
+        try:
+            self.close()
+        except Exception:
+            pass
+        self._spawn(self._command, self._transport)
+        self._restore(modules)
+
+    def _restore(self, modules):
+        '''Private method loading modules into a restarted engine.'''
+        for module in modules:
+            self._load(module)
+
+    def _variables(self, text):
+        '''Private method returning the distinct variables of a query in order of appearance.'''
+        lvars = var_re.findall(text)
+        return list( OrderedDict.fromkeys( lvars ) )
+
+    def _query(self, query, decode=None, resultset=False, page=None):
+        '''Private method running query() without the cache.'''
+        if decode is None and not resultset and page is None:
+            return self._run(self._items([query])[0])
+        columns = self._columns(self._variables(query), decode)
+        return self._decoded(self._run(self._items([query], columns, page)[0], columns, resultset, page), columns)
+
+    def _items(self, queries, columns=(), page=None):
+        '''Private method turning queries into _item() tuples, timed if the call is observed.
+        columns - variables whose values are decoded (see _columns())
+        page - ( offset, limit ) of the solutions to return, None for all'''
+        probe = self._probe
+        if probe is None:
+            return [self._item(q, columns, page) for q in queries]
+        start = time.time()
+        items = [self._item(q, columns, page) for q in queries]
+        probe.build += time.time() - start
+        return items
+
+    def _options(self, decode, resultset, limit=None, offset=0):
+        '''Private method turning the decode, resultset, limit and offset arguments of query() into extra _query() arguments.
+
+        Returns: () for the defaults, else ( decode, resultset, page ) where
+        decode is None, True or a tuple of variable names and page is None
+        or ( offset, limit )
+
+        Raises: ValueError if limit or offset is negative'''
+        if (limit is not None and limit < 0) or offset < 0:
+            raise ValueError('limit and offset must not be negative')
+        if not decode and not resultset and limit is None and not offset:
+            return ()
+        if not decode:
+            decode = None
+        elif decode is not True:
+            decode = (decode,) if isinstance(decode, str) else tuple(decode)
+        page = (offset, limit) if limit is not None or offset else None
+        return decode, bool(resultset), page
+
+    def query_one(self, query, timeout=None, decode=None):
+        '''Returns the first solution of a query, computing no other solutions
+        Usage: instance.query_one( query, timeout, decode )
+        query, timeout, decode - see query()
+
+        Returns: dictionary of the first solution ({} if a yes/no query
+        succeeds) or None if there is none
+
+        Raises: see query()'''
+        result = self.query(query, timeout, decode, limit=1)
+        if result is True:
+            return {}
+        if not result:
+            return None
+        return result[0]
+
+    def _columns(self, lvars, decode):
+        '''Private method returning the variables of a query whose values are decoded.
+        decode - True for all of them, else a variable name or a collection of names'''
+        if not decode:
+            return []
+        if decode is True:
+            return list(lvars)
+        if isinstance(decode, str):
+            decode = (decode,)
+        return [v for v in lvars if v in decode]
+
+    def _decoded(self, result, columns):
+        '''Private method decoding the given columns of a query() result in place.'''
+        if columns and isinstance(result, ResultSet):
+            for name in columns:
+                i = result.names.index(name)
+                result.columns[i] = [decode(value) for value in result.columns[i]]
+        elif columns and isinstance(result, list):
+            for solution in result:
+                self._decode(solution, columns)
+        return result
+
+    def _decode(self, solution, columns):
+        '''Private method decoding the given columns of one solution in place.'''
+        for name in columns:
+            solution[name] = decode(solution[name])
+        return solution
+
+    def prepare(self, template, helper=True):
+        '''Compiles a query template for repeated use
+        Usage: instance.prepare( template, helper )
+        template - query with a ? in place of every parameter
+          (example: 'likes( ?, Food )', in Flora2 '?[ likes->?food ]')
+        helper - register the query as a helper predicate in the engine, so
+          a call only sends the parameters (Prolog backends, default: True)
+
+        Returns: PreparedQuery instance
+
+        Raises: XSBQueryError, SWIQueryError or ECLiPSeQueryError if the
+        helper predicate cannot be registered'''
+        return PreparedQuery(self, template, helper)
+
+    def _prepare(self, prepared, helper):
+        '''Private method returning the ( prefix, suffix, args ) goal layout of a prepared query.
+        The goal sent for a call is prefix + text + suffix, where text is
+        the bound query without the full stop or, if args is True, just
+        the bound parameters separated by commas.'''
+        return '', '.', False
+
+    def _cached(self, query, run, *args):
+        '''Private method answering a query from self.cache or with run( query, *args ).
+        Queries matching update_re are always run and invalidate the cache.
+        Extra args (see _options()) are part of the cache key.
+        Results are copied, so callers may change them freely.'''
+        if self.cache is None:
+            return run(query, *args)
+        if self._updates(query):
+            try:
+                return run(query, *args)
+            finally:
+                self._invalidate()
+        key = self.cache.key(query)
+        if args:
+            key = (key,) + args
+        hit, result = self.cache.get(key)
+        if not hit:
+            result = run(query, *args)
+            self.cache.put(key, result)
+        return self._copy(result, bool(args) and args[0] is not None)
+
+    def _copy(self, result, deep=False):
+        '''Private method copying a cached result.
+        deep - also copy the values, which decoded results may share'''
+        if deep and isinstance(result, (list, ResultSet)):
+            return copy.deepcopy(result)
+        if isinstance(result, ResultSet):
+            return result.copy()
+        if isinstance(result, list):
+            return [dict(solution) for solution in result]
+        return result
+
+    def _lookup(self, queries):
+        '''Private method answering what it can of a list of queries from self.cache.
+
+        Returns: ( results, missing ) - results has None for every query
+        whose index is listed in missing'''
+        results = [None] * len(queries)
+        missing = []
+        for i, query in enumerate(queries):
+            hit = False
+            if not self._updates(query):
+                hit, result = self.cache.get(self.cache.key(query))
+            if hit:
+                results[i] = self._copy(result)
+            else:
+                missing.append(i)
+        return results, missing
+
+    def _store(self, queries, results, missing, answers):
+        '''Private method filling in the answers to missing queries and caching them.'''
+        update = False
+        for i, answer in zip(missing, answers):
+            results[i] = answer
+            if self._updates(queries[i]):
+                update = True
+            elif not isinstance(answer, Exception):
+                self.cache.put(self.cache.key(queries[i]), answer)
+                results[i] = self._copy(answer)
+        if update:
+            self._invalidate()
+        return results
+
+    def _invalidate(self):
+        '''Private method emptying self.cache after the engine state changed.'''
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _invalidating(self, query, solutions):
+        '''Private generator passing on the solutions of iquery(), emptying self.cache
+        once they are read or abandoned if query matches update_re.'''
+        try:
+            for solution in solutions:
+                yield solution
+        finally:
+            if self._updates(query):
+                self._invalidate()
+
+    def _updates(self, query):
+        '''Private method telling whether query changes the engine state, see update_re.'''
+        return update_re.search(query) is not None
+
+    def _unread(self, data):
+        '''Private method that replaces the pexpect read buffer with data.'''
+        self.engine.buffer = data
+        if hasattr(self.engine, '_before'):  # pexpect >= 4.7 keeps an untrimmed copy
+            self.engine._before = self.engine.buffer_type()
+            self.engine._before.write(data)
+
+    def _lines(self, end, record=None):
+        '''Private generator yielding engine output line by line as it arrives.
+        Usage: for line in instance._lines( end, record ): ...
+        end - regex marking the end of output (usually the prompt)
+        record - sentinel of _prolog records, if given end is only looked
+          for at the start of lines outside of records (default: None)
+
+        end is looked for at the start of every line and in the last
+        self.window characters of the current, not yet terminated line, so
+        memory and search time stay flat regardless of the amount of
+        output. With record, a record is open from its s field to its e or
+        d field, and values inside it that look like the prompt are not
+        mistaken for it. Anything following end, or not yet consumed when
+        the generator is closed, is left in the pexpect buffer.'''
+        end = re.compile(end)
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        pending = decoder.decode(self.engine.buffer)
+        pos = 0
+        inside = partial = False  # within a record at the start and at the end of the current line, see record
+        checked = 0  # characters of the current line looked at for records
+        self._unread(b'')
+        try:
+            while True:
+                match = None if inside else end.match(pending, pos)
+                if match:  # answer of a pipelined goal follows the prompt
+                    self.engine.before = ''
+                    self.engine.after = match.group()
+                    pos = match.end()
+                    return
+                nl = pending.find('\n', pos)
+                if nl >= 0:
+                    line = pending[pos:nl]
+                    pos = nl + 1
+                    if record is not None:
+                        inside = partial = self._inside(line, record, inside)
+                        checked = 0
+                    yield line.rstrip('\r')
+                    continue
+                pending = pending[pos:]
+                pos = 0
+                tail = pending[-self.window:]
+                if record is None:
+                    match = end.search(tail)
+                else:
+                    partial = self._inside(pending[max(checked - len(record), 0):], record, partial)
+                    checked = len(pending)
+                    match = None if partial else end.match(pending)
+                    tail = pending
+                if match:
+                    self.engine.before = pending[:len(pending) - len(tail) + match.start()]
+                    self.engine.after = match.group()
+                    pending = tail[match.end():]
+                    return
+                pending += decoder.decode(self._recv(self._wait()))
+        finally:
+            self._unread(pending[pos:].encode('utf-8'))
+
+    def _inside(self, text, record, inside):
+        '''Private method telling whether a record is open after text, given whether one was open before it.'''
+        start = text.rfind(record)
+        if start < 0:
+            return inside
+        return text[start + len(record):start + len(record) + 1] not in ('e', 'd')
+
+    def _drain(self, lines):
+        '''Private method that consumes what is left of a _lines() generator.'''
+        for line in lines:
+            pass
+
+    def _error(self, query, error):
+        '''Private method constructing self.QueryError from the collected error output.'''
+        return self.QueryError('Error while executing query "' + query + '". Error from ' + self.name + ':\n' + '\n'.join(error))
+
+    def _raise(self, query, error):
+        '''Private method raising self.QueryError with the collected error output.'''
+        raise self._error(query, error)
+
+    def _term(self, value):
+        '''Private method writing a Python value as a term of the engine language.
+        Numbers are written as they are, floats always with a fraction and
+        an exponent without sign (1.0e20), lists and tuples as lists and
+        everything else as a quoted atom.
+
+        Raises: ValueError for infinite and NaN floats'''
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if isinstance(value, float):
+            if math.isnan(value) or math.isinf(value):
+                raise ValueError('Cannot write ' + repr(value) + ' as a term, it has no Prolog syntax.')
+            mantissa, e, exponent = repr(value).partition('e')
+            if '.' not in mantissa:
+                mantissa += '.0'
+            return mantissa + (e + exponent.lstrip('+') if e else '')
+        if isinstance(value, int):
+            return repr(value)
+        if isinstance(value, (list, tuple)):
+            return '[' + ','.join(self._term(i) for i in value) + ']'
+        return self._quote(str(value))
+
+    def _quote(self, text):
+        '''Private method writing text as a quoted atom.'''
+        text = text.replace('\\', '\\\\').replace("'", "''").replace('\n', '\\n')
+        return "'" + text + "'"
+
+    def _facts(self, facts, predicate=None, progress=None, every=10000):
+        '''Private generator turning the facts given to loadfacts() into fact strings.
+        Calls progress( count ) after every `every` facts. Blank fact
+        strings (empty lines of a fact file) are skipped and not counted.'''
+        count = 0
+        for fact in facts:
+            if predicate is None:
+                fact = fact.strip()
+                if fact[-1:] == '.':
+                    fact = fact[:-1].rstrip()
+                if not fact:
+                    continue
+                yield fact
+            else:
+                if not isinstance(fact, (list, tuple)):
+                    fact = (fact,)
+                yield predicate + '(' + ','.join(self._term(i) for i in fact) + ')'
+            count += 1
+            if progress is not None and count % every == 0:
+                progress(count)
+
+    def _dump(self, facts, suffix):
+        '''Private method writing fact strings to a temporary file, one clause per line.
+
+        Returns: ( path, count )'''
+        fd, path = tempfile.mkstemp(prefix='pyxf', suffix=suffix)
+        count = 0
+        with os.fdopen(fd, 'w') as f:
+            for fact in facts:
+                f.write(fact + '.\n')
+                count += 1
+        return path, count
+
+    def query_batch(self, queries):
+        '''Runs many queries with one round trip per batch of goals
+        Usage: instance.query_batch( queries )
+        queries - list of queries (example: ['likes( john, X )', 'likes( X, curry )'])
+
+        Queries are grouped into batches of at most self.batchsize
+        characters of engine input which are written at once, and the
+        answers of a batch are read back one goal after another.
+
+        Returns: list with one entry per query, in order. An entry is what
+        query() would have returned for that query or, if the query
+        raised an error, the exception instance (for example an
+        XSBQueryError). An error in one query does not affect the others.
+        If self.cache is set, only queries missing from it are sent.'''
+        if self.observer is not None and self._probe is None:
+            return self._observed('query_batch', str(len(queries)) + ' queries', self.query_batch, queries)
+        return self._batch_items(self._items([self._terminate(q) for q in queries]))
+
+    def _batch_items(self, items):
+        '''Private method running a list of _item() tuples for query_batch(), using self.cache if set.'''
+        if self.cache is not None:
+            queries = [item[0] for item in items]
+            results, missing = self._lookup(queries)
+            answers = self._run_items([items[i] for i in missing])
+            return self._store(queries, results, missing, answers)
+        return self._run_items(items)
+
+    def _run_items(self, items):
+        '''Private method running a list of _item() tuples batch by batch.'''
+        results = []
+        for group in self._groups(items):
+            results.extend(self._batch(group))
+        return results
+
+    def _groups(self, items):
+        '''Private generator splitting _item() tuples into groups of at most self.batchsize characters.'''
+        group, size = [], 0
+        for item in items:
+            if group and size + len(item[2]) > self.batchsize:
+                yield group
+                group, size = [], 0
+            group.append(item)
+            size += len(item[2]) + 1
+        if group:
+            yield group
+
+    def _batch(self, items):
+        '''Private method writing a group of _item() tuples and reading their answers.'''
+        self._write(items)
+        return self._read(items)
+
+    def close(self):
+        '''Terminates the engine
+        Usage: instance.close()'''
+        self.engine.close(force=True)
+
+class _prolog(_aprolog, _backend):
+    '''Private base class for the Prolog backends (xsb, swipl and eclipse).
+
+    Queries are wrapped by _printer() into a goal that writes every
+    solution as one framed record. A record is a sequence of fields, each
+    introduced by the sentinel followed by a one letter tag:
+      s - begin of solution, followed by one v field per variable
+      v - value of the next variable as written by write/1
+      e - end of solution
+      x - error, followed by the exception term
+      d - done, all solutions have been written (always the last record)
+    The sentinel is random and is sent split in two atoms, so neither
+    values nor the echoed query can contain it, and records are parsed in
+    a single pass without any regular expressions.'''
+    _record = _sentinel
+    _helpers = None  # prepare() template -> ( name, clause ) of its helper predicate
+    profiler = None  # callable receiving a ProfileReport per query run by the engine (example: Profiler()), see profile()
+    statistics = (('cputime', 'statistics(cputime,', ')'),)  # ( name, goal before and after the variable ) per statistic profiled
+    prompttext = '?- '  # prompt written by the toplevel of _start() on pipes
+    errortext = 'ERROR: '  # written by the toplevel of _start() before uncaught exceptions
+    flush = 'flush_output'
+    compiled = None  # ModuleCache used by load() (example: instance.compiled = ModuleCache( '/var/cache/pyxf' ))
+    extensions = ('.pl',)  # source file extensions tried by load()
+    objext = ''  # extension of compiled modules
+
+    def _start(self):
+        '''Private method waiting for the first prompt of the engine.
+
+        Without a terminal Prolog toplevels do not write prompts, so on
+        a pipe transport a minimal toplevel loop is started instead. It
+        writes self.prompttext before reading every goal, which takes the
+        place of the prompt for the rest of the session.'''
+        if self.engine.isatty():
+            self._expect(self.prompt)
+            return
+        error = "write('" + self.errortext + "'),write(E),nl"
+        self._sendline(self._mark('r') + ",nl,repeat,write('" + self.prompttext + "')," + self.flush + ',catch(read(G),E,(' + error + ',G=true)),(G==end_of_file->halt;catch(G,E,(' + error + '))->true;true),fail.')
+        self._expect(_sentinel + 'r')
+        self._expect(self.prompt)
+
+    def _load(self, module):
+        '''Private method running load() without a deadline.'''
+        if self.compiled is not None:
+            return self._load_compiled(module)
+        _backend._load(self, module)
+
+    def _sync(self):
+        '''Private method reading output up to a marker goal and the prompt following it.'''
+        self._sendline(self._mark('q') + ',nl.')
+        self._expect(_sentinel + 'q')
+        self._expect(self.prompt)
+
+    def _restore(self, modules):
+        '''Private method loading modules and prepare() helpers into a restarted engine.'''
+        _backend._restore(self, modules)
+        for name, clause in (self._helpers or {}).values():
+            self._run((clause, [], self._printer([], clause + '.')[:-1]))
+
+    def _load_compiled(self, module):
+        '''Private method loading a module from self.compiled, compiling it first if needed.
+
+        The engine compiles a copy of the source in a temporary directory
+        of its own, so engines compiling the same source at the same time
+        never write or move the same file. Files the source includes by a
+        relative path are therefore not found while compiling.'''
+        source = self._source(module)
+        if source is None:  # let the engine report the missing file
+            self._sendline("['" + module + "'].")
+            return self._loaded(module)
+        path = self.compiled.path(source, self.objext)
+        if os.path.exists(path):
+            self._sendline("['" + self._object(path) + "'].")
+            return self._loaded(module)
+        directory = tempfile.mkdtemp(prefix='pyxf')
+        try:
+            staged = os.path.join(directory, os.path.basename(source))
+            shutil.copyfile(source, staged)
+            compiled = os.path.splitext(staged)[0] + self.objext
+            self._sendline(self._compile(staged, compiled))
+            self._loaded(module)
+            self.compiled.store(compiled, path)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _source(self, module):
+        '''Private method finding the source file of a module, trying self.extensions.'''
+        for ext in ('',) + self.extensions:
+            if os.path.isfile(module + ext):
+                return module + ext
+        return None
+
+    def _object(self, path):
+        '''Private method returning the name a compiled module is loaded by.'''
+        return path
+
+    def _compile(self, source, compiled):
+        '''Private method returning the command that compiles a source file into compiled and loads it.'''
+        return "['" + source + "']."
+
+    def query(self, query, timeout=None, decode=None, resultset=False, limit=None, offset=0):
+        '''Queries current engine state
+        Usage: instance.query( query, timeout, decode, resultset, limit, offset )
+        query - usual Prolog query (example: 'likes( X, Y )')
+        timeout - deadline in seconds (default: None, no deadline)
+        decode - True to turn all values into Python values with decode(), or
+          the names of the variables to decode (default: None, values are
+          the strings written by write/1). Decoded values are written with
+          write_canonical/1 instead.
+        resultset - return a ResultSet instead of a list of dictionaries
+          (default: False)
+        limit - maximum number of solutions (default: None, all)
+        offset - number of solutions to skip first (default: 0)
+          The engine stops looking for solutions once the limit is reached:
+          SWI-Prolog uses limit/2 and offset/2, XSB and ECLiPSe count the
+          solutions in a global counter.
+
+        Returns:
+          True - if yes/no query and answer is yes
+          False - if yes/no query and answer is no
+          List of dictionaries - if normal query. Dictionary keys are returned
+          variable names. Example:
+          >>> instance.query( 'likes( Person, Food )' )
+          [{'Person': 'john', 'Food': 'curry'}, {'Person': 'sandy', 'Food': 'mushrooms'}]
+          >>> instance.query( 'X = f( 1, [a, 2.5] )', decode=True )
+          [{'X': f(1, ['a', 2.5])}]
+          ResultSet - if normal query and resultset is True, empty if there
+          are no solutions. Example:
+          >>> instance.query( 'likes( Person, Food )', resultset=True ).to_pandas()
+
+        Raises: XSBQueryError, SWIQueryError or ECLiPSeQueryError (and the
+        matching QueryTimeout)'''
+        return self._within('query', query, timeout, self._cached, self._terminate(query), self._query, *self._options(decode, resultset, limit, offset))
+
+    def _run(self, item, columns=(), resultset=False, page=None):
+        '''Private method sending one _item() tuple and returning its query() result.'''
+        self._sendline(item[2] + '.')
+        return self._reply(item, columns, resultset, page)
+
+    def _reply(self, item, columns=(), resultset=False, page=None):
+        '''Private method reading the query() result of an _item() tuple already sent.'''
+        query, lvars, goal = item
+        if resultset and lvars:
+            return ResultSet(lvars, self._parsed(query))
+        return self._result(lvars, [dict(zip(lvars, fields)) for fields in self._parsed(query)])
+
+    def _result(self, lvars, results):
+        '''Private method converting a list of solutions to the value returned by query().'''
+        if lvars == []:  # yes/no query (no variables)
+            return results != []
+        if results == []:
+            return False
+        return results
+
+    def iquery(self, query, decode=None):
+        '''Queries current engine state, yielding solutions as they arrive
+        Usage: for solution in instance.iquery( query, decode ): ...
+        query - usual Prolog query (example: 'likes( X, Y )')
+        decode - variables whose values are decoded (see query())
+
+        Yields: one dictionary per solution, keys are variable names. A
+        yes/no query yields a single empty dictionary if the answer is yes.
+        Solutions are parsed one at a time while the engine is still
+        printing, so memory use does not grow with the number of solutions.
+        Abandoning the generator early still reads the remaining output so
+        the engine is ready for the next query.
+
+        Raises: XSBQueryError, SWIQueryError or ECLiPSeQueryError'''
+        query = self._terminate(query)
+        lvars = var_re.findall(query)
+        lvars = list( OrderedDict.fromkeys( lvars ) )
+        columns = self._columns(lvars, decode)
+        for solution in self._invalidating(query, self._solutions(lvars, query, self._printer(lvars, query, columns))):
+            yield self._decode(solution, columns)
+
+    def _solutions(self, lvars, query, goal=None):
+        '''Private generator sending a result printing query and parsing its output.
+        goal - line to send instead of _printer( lvars, query )'''
+        for fields in self._rows(lvars, query, goal):
+            yield dict(zip(lvars, fields))
+
+    def _rows(self, lvars, query, goal=None):
+        '''Private generator like _solutions(), yielding lists of values in order of lvars.'''
+        self._sendline(goal or self._printer(lvars, query))
+        for fields in self._parsed(query):
+            yield fields
+
+    def _parsed(self, query):
+        '''Private generator yielding the values of every solution of a printing goal already sent.
+        A goal that ends without its done record was rejected by the
+        toplevel (a syntax error not every engine reports as an error).'''
+        records = self._records()
+        error = []
+        done = False
+        try:
+            for tag, fields in records:
+                if tag == 's':
+                    yield fields
+                elif tag == 'x' or tag == '!':
+                    error.append(fields)
+                elif tag == 'd':
+                    done = True
+        finally:
+            for tag, fields in records:
+                if tag == 'x' or tag == '!':
+                    error.append(fields)
+                elif tag == 'd':
+                    done = True
+        if not done and not error:
+            error.append('Query was aborted.')
+        if error:
+            self._raise(query, error)
+
+    def loadfacts(self, facts, predicate=None, progress=None):
+        '''Adds many facts to the engine at once
+        Usage: instance.loadfacts( facts, predicate, progress )
+        facts - iterable of fact strings (example: 'likes( john, curry )') or,
+          if predicate is given, of tuples of Python values (example: ('john', 'curry'))
+        predicate - predicate name for tuple facts (default: None)
+        progress - callable receiving the number of facts written so far,
+          called every 10000 facts and once more after loading (default: None)
+
+        The facts are streamed into a temporary file which the engine reads
+        and asserts (assertz/1) in a single goal, so existing clauses are
+        kept and the facts never travel through the terminal.
+
+        Returns: number of facts loaded
+
+        Raises: XSBQueryError, SWIQueryError or ECLiPSeQueryError'''
+        path, count = self._dump(self._facts(facts, predicate, progress), '.P')
+        try:
+            self.query(self._consult(path))
+        finally:
+            os.remove(path)
+        if progress is not None:
+            progress(count)
+        return count
+
+    def export(self, query, path, format='csv', timeout=None, typed=True):
+        '''Writes all solutions of a query into a file
+        Usage: instance.export( query, path, format, timeout, typed )
+        query - usual Prolog query (example: 'likes( X, Y )')
+        path - file to write, the engine has to run on the same machine
+        format - 'csv' or 'tsv', see ExportReader (default: 'csv')
+        timeout - deadline in seconds (default: None, no deadline)
+        typed - passed to ExportReader (default: True)
+
+        The engine opens the file and writes one line per solution with
+        write_canonical/1, so the solutions never pass through the
+        terminal and pyxf only reads them back on demand.
+
+        Returns: ExportReader over the file
+
+        Raises: ValueError, XSBQueryError, SWIQueryError or ECLiPSeQueryError'''
+        if format not in ExportReader.separators:
+            raise ValueError('Unknown export format "' + str(format) + '", use "csv" or "tsv".')
+        separator = ExportReader.separators[format]
+        lvars = self._variables(query)
+        with open(path, 'w') as f:
+            f.write(separator.join(lvars) + '\n')
+        goal = self._exporter(lvars, self._terminate(query)[:-1], path, separator)
+        self._within('query', query, timeout, self._run, (query, [], self._printer([], goal + '.')[:-1]))
+        return ExportReader(path, format, typed)
+
+    def _exporter(self, lvars, query, path, separator):
+        '''Private method constructing a goal appending the solutions of query to a file.'''
+        stream = 'S' + _sentinel[:6]
+        error = 'E' + _sentinel[:6]
+        sep = ",write(" + stream + ",'" + ('\\t' if separator == '\t' else separator) + "'),"
+        row = sep.join('write_canonical(' + stream + ',' + v + ')' for v in lvars)
+        row = (row + ',' if row else '') + 'nl(' + stream + ')'
+        return 'open(' + self._term(path) + ',append,' + stream + '),catch(((' + query + '),' + row + ',fail;true),' + error + ',(close(' + stream + '),throw(' + error + '))),close(' + stream + ')'
+
+    def profile(self, query, timeout=None, decode=None, resultset=False, limit=None, offset=0):
+        '''Queries current engine state, measuring the query inside the engine
+        Usage: instance.profile( query, timeout, decode, resultset, limit, offset )
+        Arguments are those of query().
+
+        The goal is run between two readings of self.statistics and, on
+        SWI-Prolog, under its sampling profiler. Query and measurements are
+        sent in one line and cost no extra round trip. The result is never
+        taken from the cache. If self.profiler is set, the report is also
+        passed to it, and so are the reports of every query() that is not
+        answered from the cache.
+
+        Returns: ( result, ProfileReport ), result as query() returns it
+
+        Raises: XSBQueryError, SWIQueryError or ECLiPSeQueryError, or the QueryTimeout of the backend'''
+        query = self._terminate(query)
+        return self._within('query', query, timeout, self._profile, query, *self._options(decode, resultset, limit, offset))
+
+    def _query(self, query, decode=None, resultset=False, page=None):
+        '''Private method running query() without the cache, profiled if self.profiler is set.'''
+        if self.profiler is not None:
+            return self._profile(query, decode, resultset, page)[0]
+        return _backend._query(self, query, decode, resultset, page)
+
+    def _profile(self, query, decode=None, resultset=False, page=None):
+        '''Private method running profile() without a deadline.
+
+        The first goal reads the statistics into B<i> variables before
+        running the printing goal of the query, and the second goal prints
+        the differences to the A<i> readings taken after it. Both goals are
+        parts of one conjunction, so the second one sees the bindings of
+        the first. The conjunction is sent inside a double negation, which
+        undoes the B<i> bindings the toplevel would otherwise write before
+        waiting for the user.'''
+        columns = self._columns(self._variables(query), decode)
+        query, lvars, goal = self._item(query, columns, page)
+        tag = _sentinel[:6]
+        before, after, deltas = [], [], []
+        for i, (name, prefix, suffix) in enumerate(self.statistics):
+            b, a, d = 'B' + str(i) + tag, 'A' + str(i) + tag, 'D' + str(i) + tag
+            before.append(prefix + b + suffix)
+            after.append(prefix + a + suffix + ',' + d + ' is ' + a + '-' + b)
+            deltas.append(d)
+        start, stop = self._profiling()
+        goal = ','.join(g for g in before + [start, goal, stop] if g)
+        items = [(query, lvars, goal), (query, deltas, self._printer(deltas, ','.join(after) + '.')[:-1])]
+        items.extend(self._profiled())
+        self._sendline('\\+ \\+ (' + self._conjunction(items) + ').')
+        results = self._read(items)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        result, measured = results[0], results[1]
+        statistics = {}
+        if measured:
+            for (name, prefix, suffix), d in zip(self.statistics, deltas):
+                statistics[name] = self._number(measured[0][d])
+        report = ProfileReport(self.name, query, statistics, self._predicates(results[2:]))
+        if resultset and lvars:
+            result = ResultSet(lvars, ([s[v] for v in lvars] for s in (result or [])))
+        if self.profiler is not None:
+            self.profiler(report)
+        return self._decoded(result, columns), report
+
+    def _number(self, text):
+        '''Private method converting a number printed by the engine.'''
+        try:
+            return int(text)
+        except ValueError:
+            return float(text)
+
+    def _profiling(self):
+        '''Private method returning the goals starting and stopping the per predicate profiler, empty if there is none.'''
+        return '', ''
+
+    def _profiled(self):
+        '''Private method returning the _item() tuples printing the per predicate profile.'''
+        return []
+
+    def _predicates(self, results):
+        '''Private method turning the results of the _profiled() items into the predicates of a ProfileReport.'''
+        return {}
+
+    def _consult(self, path):
+        '''Private method returning a goal asserting all clauses of a file.'''
+        stream, term = '_S' + _sentinel[:6], '_T' + _sentinel[:6]
+        return 'open(' + self._term(path) + ',read,' + stream + '),once((repeat,read(' + stream + ',' + term + '),(' + term + '==end_of_file;assertz(' + term + '),fail))),close(' + stream + ')'
+
+    def _item(self, query, columns=(), page=None):
+        '''Private method returning the ( query, variables, goal ) tuple used by query_batch().
+        columns - variables written with write_canonical/1 for decoding
+        page - ( offset, limit ) of the solutions to print, None for all'''
+        lvars = var_re.findall(query)
+        lvars = list( OrderedDict.fromkeys( lvars ) )
+        return query, lvars, self._printer(lvars, query, columns, page)[:-1]
+
+    def _prepare(self, prepared, helper):
+        '''Private method returning the goal layout of a prepared query (see _backend._prepare()).
+        With helper the printing goal becomes the body of a dynamic helper
+        predicate taking the parameters as arguments, asserted once per
+        template and engine.'''
+        if not helper:
+            before, after = self._printer(prepared.lvars, '\0.')[:-1].split('\0')
+            return before, after, False
+        if self._helpers is None:
+            self._helpers = {}
+        name = self._helpers.get(prepared.template, (None,))[0]
+        if name is None:
+            name = "'pyxf" + _sentinel[:6] + '_' + str(len(self._helpers)) + "'"
+            params = ['P' + _sentinel[:6] + '_' + str(i) for i in range(prepared.arity)]
+            head = name + '(' + ','.join(params) + ')' if params else name
+            body = self._printer(prepared.lvars, prepared.text(params) + '.')[:-1]
+            clause = 'assertz((' + head + ' :- ' + body + '))'
+            self._run((clause, [], self._printer([], clause + '.')[:-1]))
+            self._helpers[prepared.template] = (name, clause)
+        if prepared.arity == 0:
+            return name, '', True
+        return name + '(', ')', True
+
+    def _write(self, items):
+        '''Private method sending a group of queries as one conjunction of _printer() goals.
+
+        Every goal is wrapped in its own catch/3 and always succeeds, so
+        the done records separate the answers of the goals. The variables
+        of catch/3, the page counter and streams get the index of their
+        goal as suffix, as variables are shared by the whole conjunction
+        and stay bound once a goal has bound them.'''
+        self._sendline(self._conjunction(items) + '.')
+
+    def _conjunction(self, items):
+        '''Private method joining the goals of a group of queries, see _write().'''
+        return ','.join(local_re.sub(lambda m: m.group(1) + str(i), goal) for i, (query, lvars, goal) in enumerate(items))
+
+    def _ends(self, items):
+        '''Private method returning the prompts that end the answers of a group of queries.'''
+        return [self.prompt]
+
+    def _read(self, items):
+        '''Private method reading the answers of a group of queries sent by _write().
+
+        If the line is rejected as a whole (a syntax error in one of the
+        queries), the queries are sent again one by one to find the
+        faulty one.'''
+        solutions = [[] for i in items]
+        errors = [[] for i in items]
+        done = 0
+        for tag, fields in self._records(len(items)):
+            if tag == 's':
+                solutions[done].append(dict(zip(items[done][1], fields)))
+            elif tag == 'd':
+                done += 1
+            else:
+                errors[min(done, len(items) - 1)].append(fields)
+        if done < len(items):  # the line was aborted
+            if done == 0 and len(items) > 1:
+                results = []
+                for item in items:
+                    results.extend(self._batch([item]))
+                return results
+            errors[done] = errors[done] or ['Query was aborted.']
+            rest = self._batch(items[done + 1:]) if done + 1 < len(items) else []
+            return self._batch_results(items[:done + 1], solutions, errors) + rest
+        return self._batch_results(items, solutions, errors)
+
+    def _batch_results(self, items, solutions, errors):
+        '''Private method building the query_batch() entries of a group of queries.'''
+        results = []
+        for (query, lvars, goal), s, e in zip(items, solutions, errors):
+            results.append(self._error(query, e) if e else self._result(lvars, s))
+        return results
+
+    def _records(self, count=1):
+        '''Private generator parsing framed records written by _printer() goals.
+        count - number of goals whose records are read
+
+        Yields (tag, fields) tuples: ('s', list of values) per solution,
+        ('x', exception text) on error and ('d', None) when a goal is done.
+        Error messages the toplevel prints outside of records (syntax
+        errors for instance) are yielded as ('!', line). Stops after count
+        done records or at the prompt and leaves the engine at its prompt.'''
+        lines = self._lines(self.prompt, _sentinel)
+        end, record = _sentinel + 'e', None
+        done = False
+        try:
+            for line in lines:
+                if record is None:
+                    start = line.find(_sentinel)
+                    if start < 0:
+                        if re.search(self.error, line):
+                            yield '!', line
+                        continue
+                    record = line[start:]
+                else:  # value spanning several lines
+                    record += '\n' + line
+                if record.endswith(end):
+                    fields = record.split(_sentinel)
+                    record = None
+                    yield 's', [f[1:] for f in fields[2:-1]]
+                elif record.endswith(_sentinel + 'd'):
+                    fields = record.split(_sentinel)
+                    record = None
+                    for field in fields[1:-1]:  # x after s and v fields if a solution raised while printed
+                        if field[:1] == 'x':
+                            yield 'x', field[1:]
+                    count -= 1
+                    done = count == 0
+                    yield 'd', None
+                    if done:
+                        break
+        finally:
+            if done:
+                lines.close()
+                self._expect(self.prompt)
+
+    def _mark(self, tag):
+        '''Private method for constructing a goal writing the sentinel and tag.'''
+        return 'write(' + _sentinel[:6] + '),write(' + _sentinel[6:] + tag + ')'
+
+    def _printer(self, lvars, query, columns=(), page=None):
+        '''Private method for constructing a result printing query.
+        Usage: instance._printer( lvars, query, columns, page )
+        lvars - list of logical variables to print
+        query - query containing the variables to be printed
+        columns - variables to print with write_canonical/1 (default: none)
+        page - ( offset, limit ) of the solutions to print (default: None,
+          all of them), see _page()
+
+        Returns: string of the form
+          '\\+ \\+ catch((((query),<s>,<v>,write(VarName1),...,<e>,nl,fail;true),<d>,nl),E,(<x>,write(E),<d>,nl)).'
+        where <t> writes the sentinel followed by tag t (see _prolog). A
+        yes/no query writes a single empty solution record if it succeeds.
+        The double negation undoes all bindings, including that of E by
+        catch/3: a toplevel writes the bindings a goal leaves and waits for
+        the user before it writes its prompt again.
+        '''
+        query = query[:-1]
+        mark = self._mark
+        error = 'E' + _sentinel[:6]  # must not contain the whole sentinel (echo)
+        if lvars:
+            elems = [mark('v') + (',write_canonical(' if i in columns else ',write(') + i + ')' for i in lvars]
+            row = mark('s') + ',' + ','.join(elems) + ',' + mark('e') + ',nl'
+            if page is None:
+                found = '((' + query + '),' + row + ',fail;true)'
+            else:
+                found = self._page('(' + query + ')', row, page)
+        else:
+            found = '((' + query + ')->' + mark('s') + ',' + mark('e') + ',nl;true)'
+        printer = '\\+ \\+ catch((' + found + ',' + mark('d') + ',nl),' + error + ',(' + mark('x') + ',write(' + error + '),' + mark('d') + ',nl)).'
+        return printer
+
+    def _page(self, goal, row, page):
+        '''Private method for constructing a goal running row for some solutions of goal.
+        Usage: instance._page( goal, row, page )
+        page - ( offset, limit ), limit may be None for all solutions
+
+        Solutions are numbered in a global counter (see _counter()). Once
+        the last solution of the page has been printed, the negated goal
+        succeeds and the remaining solutions are never computed. The
+        negation also undoes the bindings of the solution and the counter,
+        which the toplevel would write before waiting for the user.'''
+        offset, limit = page
+        if limit == 0:
+            return 'true'
+        count = 'C' + _sentinel[:6]
+        reset, step = self._counter('pyxf' + _sentinel[:6], count)
+        goal = goal + ',' + step + ',' + count + '>' + str(offset) + ',' + row
+        if limit is None:
+            return '(' + reset + ',(' + goal + ',fail;true))'
+        return '(' + reset + ',(\\+ (' + goal + ',' + count + '>=' + str(offset + limit) + ')->true;true))'
+
+    def _counter(self, name, var):
+        '''Private method returning the goals resetting a global counter and incrementing it into var.'''
+        return 'conset(' + name + ',0)', 'conget(' + name + ',' + var + '_),' + var + ' is ' + var + '_+1,conset(' + name + ',' + var + ')'
+
 
 class XSBExecutableNotFound(Exception):
     '''Exception raised if XSB executable is not found on the specified path.'''
@@ -47,98 +2122,180 @@ class XSBQueryError(Exception):
     pass
 
 
-class xsb:
+class XSBQueryTimeout(Exception):
+    '''Exception raised if a query or load exceeds its deadline.'''
+    pass
+
+
+class xsb(_prolog):
     '''Python interface to XSB Prolog (http://xsb.sf.net)'''
-    def __init__(self, path='xsb', args='--nobanner --quietload'):
+    name = 'XSB'
+    prompt = xsbprompt
+    error = xsberror
+    QueryError = XSBQueryError
+    QueryTimeout = XSBQueryTimeout
+    extensions = ('.P', '.pl')
+    objext = '.xwam'
+    prompttext = '| ?- '
+    errortext = '++Error[XSB]: '
+    statistics = (('cputime', 'cputime(', ')'), ('tablespace', 'statistics(tablespace,[_,', '])'))
+
+    def __init__(self, path='xsb', args='--nobanner --quietload', transport='pty'):
         '''Constructor method
-        Usage: xsb( path, args )
+        Usage: xsb( path, args, transport )
         path - path to XSB executable (default: 'xsb')
         args - command line arguments (default: '--nobanner --quietload')
+        transport - 'pty' (pseudo terminal) or 'pipe' (plain pipes, no
+          echo or terminal line discipline), see transports (default: 'pty')
 
         self.engine becomes pexpect spawn instance of XSB Prolog shell
 
         Raises: XSBExecutableNotFound'''
+        self._declarations = []  # goals of table() and dynamic(), run again by _restore()
+        self._tabled = []  # predicate indicators declared by table()
         try:
-            self.engine = px.spawn(path + ' ' + args, timeout=5)
-            self.engine.expect(xsbprompt)
+            self._spawn(path + ' ' + args, transport)
         except px.ExceptionPexpect:
             raise XSBExecutableNotFound('XSB executable not found on the specified path. Try using xsb( "/path/to/XSB/bin/xsb" )')
 
-    def load(self, module):
+    def load(self, module, timeout=None):
         '''Loads module into self.engine
-        Usage: instance.load( path )
+        Usage: instance.load( path, timeout )
         module - path to module file
+        timeout - deadline in seconds (default: None, no deadline)
+
+        If self.compiled is set, the module is compiled once per version of
+        its source and loaded from the compiled file afterwards.
+
+        Raises: XSBCompileError, XSBQueryTimeout'''
+        self._within('load', module, timeout, self._load, module)
 
-        Raises: XSBCompileError'''
-        self.engine.sendline("['" + module + "'].")
-        index = self.engine.expect([xsbprompt, xsberror])
+    def _loaded(self, module):
+        '''Private method reading the answer of a load command already sent.'''
+        self._invalidate()
+        index = self._expect([xsbprompt, xsberror])
         if index == 1:
-            raise XSBCompileError('Error while compiling module "' + module + '". Error from XSB:\n' + str( self.engine.after ))
+            message = str( self.engine.after )
+            self._sync()  # the prompt following the error
+            raise XSBCompileError('Error while compiling module "' + module + '". Error from XSB:\n' + message)
+        self._remember(module)
+
+    def _object(self, path):
+        '''Private method returning the name a compiled module is loaded by.
+        XSB loads the object file of a module without a source file.'''
+        return os.path.splitext(path)[0]
+
+    def _restore(self, modules):
+        '''Private method declaring tables and dynamic predicates again and loading modules into a restarted engine.'''
+        for goal in self._declarations:
+            self._query(goal)
+        _prolog._restore(self, modules)
+
+    def table(self, predicates, incremental=False):
+        '''Declares predicates as tabled
+        Usage: instance.table( predicates, incremental )
+        predicates - predicate indicator or list of them (example: 'path/2')
+        incremental - whether the tables are updated when the dynamic
+          predicates they depend on change instead of being recomputed
+          (default: False). These have to be declared with
+          dynamic( ..., incremental=True ).
+
+        Tabling is declared at runtime, so it applies to predicates whose
+        clauses are asserted afterwards (with loadfacts() or assertz/1),
+        not to predicates compiled from a loaded module, which declare
+        their tables with a :- table directive.
 
-    def query(self, query):
-        '''Queries current engine state
-        Usage: instance.query( query )
-        query - usual XSB Prolog query (example: 'likes( X, Y )')
+        Raises: XSBQueryError'''
+        indicators = self._indicators(predicates)
+        self._declare('table', indicators, incremental)
+        self._tabled.extend(i for i in indicators if i not in self._tabled)
 
-        Returns:
-          True - if yes/no query and answer is yes
-          False - if yes/no query and answer is no
-          List of dictionaries - if normal query. Dictionary keys are returned
-          variable names. Example:
-          >>> instance.query( 'likes( Person, Food )' )
-          [{'Person': 'john', 'Food': 'curry'}, {'Person': 'sandy', 'Food': 'mushrooms'}]
+    def dynamic(self, predicates, incremental=False):
+        '''Declares predicates as dynamic
+        Usage: instance.dynamic( predicates, incremental )
+        predicates - predicate indicator or list of them (example: 'edge/2')
+        incremental - whether facts added or removed are propagated to the
+          incremental tables depending on them (default: False)
+
+        Facts of incremental predicates asserted or retracted through
+        loadfacts() or query() only invalidate the answers that depend on
+        them, which are recomputed by the next call (or by refresh()).
 
         Raises: XSBQueryError'''
-        query = query.strip()
-        if query[-1] != '.':
-            query += '.'
-        lvars = var_re.findall(query)
-        lvars = list(set(lvars))
-        if lvars == []:  # yes/no query (no variables)
-            self.engine.sendline(query)
-            index = self.engine.expect([xsbprompt, xsberror])
-            if index == 1:
-                raise XSBQueryError('Error while executing query "' + query + '". Error from XSB:\n' + str( self.engine.after ))
-            else:
-                if 'yes' in str( self.engine.before ):
-                    return True
-                else:
-                    return False
-        else:  # normal query
-            printer = self._printer(lvars, query)
-            self.engine.sendline(printer)
-            index = self.engine.expect([xsberror, xsbprompt])
-            if index == 0:
-                raise XSBQueryError('Error while executing query "' + query + '". Error from XSB:\n' + str( self.engine.after ))
-            else:
-                state = str( self.engine.before )
-                state = state.replace( '\\r', '\r' ).replace( '\\n', '\n' )
-                res = res_re.findall( state.split(',nl,fail.\n')[-1])
-                results = []
-                counter = 0
-                temp = []
-                for i in res:
-                    counter += 1
-                    temp.append(i)
-                    if counter % len(lvars) == 0:
-                        results.append(dict(temp))
-                        temp = []
-                if results == []:
-                    return False
-                return results
+        self._declare('dynamic', self._indicators(predicates), incremental)
+
+    def _indicators(self, predicates):
+        '''Private method returning a list of predicate indicators from one indicator or an iterable of them.'''
+        if isinstance(predicates, str):
+            return [predicates]
+        return list(predicates)
+
+    def _declare(self, directive, indicators, incremental):
+        '''Private method running a declaration for every indicator and remembering it for _restore().'''
+        suffix = ' as incremental' if incremental else ''
+        goal = ','.join(directive + '((' + i + suffix + '))' for i in indicators) + '.'
+        self._invalidate()
+        self._query(goal)
+        self._declarations.append(goal)
+
+    def abolish_tables(self, predicates=None):
+        '''Removes tables, their answers are computed again by the next call
+        Usage: instance.abolish_tables( predicates )
+        predicates - predicate indicator or list of them (default: None, all tables)
 
-    def _printer(self, lvars, query):
-        '''Private method for constructing a result printing query.
-        Usage: instance._printer( lvars, query )
-        lvars - list of logical variables to print
-        query - query containing the variables to be printed
+        Raises: XSBQueryError'''
+        self._invalidate()
+        if predicates is None:
+            self._query('abolish_all_tables.')
+        else:
+            self._query(','.join('abolish_table_pred(' + i + ')' for i in self._indicators(predicates)) + '.')
 
-        Returns: string of the form 'query, writeln( res( 'VarName1', VarName1 ) ) ... writeln( res( 'VarNameN', VarNameN ) ),nl,fail.'
-        '''
-        query = query[:-1]
-        elems = ["writeln( res('''" + i + "'''," + i + ") )" for i in lvars]
-        printer = query + ',' + ','.join(elems) + ',nl,fail.'
-        return printer
+    def refresh(self, predicates):
+        '''Recomputes the tables of predicates for all arguments
+        Usage: instance.refresh( predicates )
+        predicates - predicate indicator or list of them (example: 'path/2')
+
+        The tables are abolished and filled again by running the most
+        general call of each predicate to completion, so later queries
+        are answered from complete tables.
+
+        Raises: XSBQueryError'''
+        goals = []
+        for n, i in enumerate(self._indicators(predicates)):
+            name, arity = i.rsplit('/', 1)
+            goal = '_G' + str(n)
+            goals.append('abolish_table_pred(' + i + '),functor(' + goal + ',' + name + ',' + arity + '),(call(' + goal + '),fail;true)')
+        self._invalidate()
+        self._query('(' + '),('.join(goals) + ').')
+
+    def tables(self, predicates=None):
+        '''Returns the size of tables
+        Usage: instance.tables( predicates )
+        predicates - predicate indicator or list of them (default: None,
+          the predicates declared with table())
+
+        Returns: dictionary from predicate indicator to a dictionary with
+          calls - number of tabled calls (subgoals) of the predicate
+          answers - number of answers in these tables
+
+        Raises: XSBQueryError'''
+        indicators = self._tabled if predicates is None else self._indicators(predicates)
+        if not indicators:
+            return {}
+        query = '(import get_calls/3,get_returns/2 from tables),(import member/2 from basics),member(P,[' + ','.join(indicators) + ']),P=_N/_A,functor(_G,_N,_A),' \
+                'findall(_H,get_calls(_G,_H,_),_Hs),length(_Hs,C),findall(_T,(get_calls(_G,_H2,_T),get_returns(_H2,_T)),_Ts),length(_Ts,R).'
+        return OrderedDict((row['P'], {'calls': int(row['C']), 'answers': int(row['R'])}) for row in self._query(query))
+
+    def tablespace(self):
+        '''Returns the memory used by tables
+        Usage: instance.tablespace()
+
+        Returns: dictionary with allocated and used, bytes of table space
+          as reported by statistics( tablespace, ... )
+
+        Raises: XSBQueryError'''
+        row = self._query('statistics(tablespace,[A,U]).')[0]
+        return {'allocated': int(row['A']), 'used': int(row['U'])}
 
 swiprompt = '[?][-][ ]'
 swierror = 'ERROR.*'
@@ -159,98 +2316,112 @@ class SWIQueryError(Exception):
     pass
 
 
-class swipl:
+class SWIQueryTimeout(Exception):
+    '''Exception raised if a query or load exceeds its deadline.'''
+    pass
+
+
+class swipl(_prolog):
     '''Python interface to SWI Prolog (http://www.swi-prolog.org)'''
-    def __init__(self, path='swipl', args='-q +tty'):
+    name = 'SWI'
+    prompt = swiprompt
+    error = swierror
+    QueryError = SWIQueryError
+    QueryTimeout = SWIQueryTimeout
+    interrupted = 'Action [(]h for help[)] [?] '
+    extensions = ('.pl', '.prolog')
+    objext = '.qlf'
+    statistics = (('cputime', 'statistics(cputime,', ')'), ('inferences', 'statistics(inferences,', ')'), ('table_space_used', 'statistics(table_space_used,', ')'))
+
+    def __init__(self, path='swipl', args='-q +tty', state=None, transport='pty'):
         '''Constructor method
-        Usage: swipl( path, args )
+        Usage: swipl( path, args, state, transport )
         path - path to SWI executable (default: 'swipl')
         args - command line arguments (default: '-q +tty')
+        state - saved state written by save() to start from (default: None)
+        transport - 'pty' (pseudo terminal) or 'pipe' (plain pipes, no
+          echo or terminal line discipline), see transports (default: 'pty')
 
         self.engine becomes pexpect spawn instance of SWI Prolog shell
 
         Raises: SWIExecutableNotFound'''
+        if state is not None:
+            args = '-x ' + state + ' ' + args
         try:
-            self.engine = px.spawn(path + ' ' + args, timeout=5)
-            self.engine.expect(swiprompt)
+            self._spawn(path + ' ' + args, transport)
         except px.ExceptionPexpect:
             raise SWIExecutableNotFound('SWI-Prolog executable not found on the specified path. Try installing swi-prolog or using swipl( "/path/to/swipl" )')
 
-    def load(self, module):
+    def load(self, module, timeout=None):
         '''Loads module into self.engine
-        Usage: instance.load( path )
+        Usage: instance.load( path, timeout )
         module - path to module file
+        timeout - deadline in seconds (default: None, no deadline)
 
-        Raises: SWICompileError'''
-        self.engine.sendline("['" + module + "'].")
-        index = self.engine.expect([swierror, swiprompt])
-        if index == 0:
-            raise SWICompileError('Error while compiling module "' + module + '". Error from SWI:\n' + str( self.engine.after ))
+        If self.compiled is set, the module is compiled once per version of
+        its source and loaded from the compiled file afterwards.
 
-    def query(self, query):
-        '''Queries current engine state
-        Usage: instance.query( query )
-        query - usual SWI Prolog query (example: 'likes( X, Y )')
+        Raises: SWICompileError, SWIQueryTimeout'''
+        self._within('load', module, timeout, self._load, module)
 
-        Returns:
-          True - if yes/no query and answer is yes
-          False - if yes/no query and answer is no
-          List of dictionaries - if normal query. Dictionary keys are returned
-          variable names. Example:
-          >>> instance.query( 'likes( Person, Food )' )
-          [{'Person': 'john', 'Food': 'curry'}, {'Person': 'sandy', 'Food': 'mushrooms'}]
+    def _loaded(self, module):
+        '''Private method reading the answer of a load command already sent.'''
+        self._invalidate()
+        index = self._expect([swierror, swiprompt])
+        if index == 0:
+            message = str( self.engine.after )
+            self._sync()  # the prompt following the error
+            raise SWICompileError('Error while compiling module "' + module + '". Error from SWI:\n' + message)
+        self._remember(module)
+
+    def _compile(self, source, compiled):
+        '''Private method returning the command that compiles a source file into compiled and loads it.'''
+        return "qcompile('" + source + "')."
+
+    def _page(self, goal, row, page):
+        '''Private method for constructing a goal running row for some solutions of goal (see _prolog._page()).
+        SWI-Prolog has limit/2 and offset/2 (library solution_sequences) for this.'''
+        offset, limit = page
+        if offset:
+            goal = 'offset(' + str(offset) + ',' + goal + ')'
+        if limit is not None:
+            goal = 'limit(' + str(limit) + ',' + goal + ')'
+        return '(' + goal + ',' + row + ',fail;true)'
+
+    def _profiling(self):
+        '''Private method returning the goals running the sampling profiler of SWI-Prolog around a query.'''
+        return 'reset_profiler,profiler(_,cputime)', 'profiler(_,false)'
+
+    def _profiled(self):
+        '''Private method returning the _item() tuple printing calls and seconds per predicate from profile_data/1.'''
+        tag = _sentinel[:6]
+        name, calls, seconds = 'P' + tag, 'C' + tag, 'S' + tag
+        data, summary, ticks, total, nodes, node, own = ['_' + v + tag for v in ('D', 'M', 'K', 'W', 'N', 'X', 'T')]
+        goal = 'profile_data(' + data + '),get_dict(summary,' + data + ',' + summary + '),get_dict(ticks,' + summary + ',' + ticks + '),' \
+               'get_dict(time,' + summary + ',' + total + '),get_dict(nodes,' + data + ',' + nodes + '),member(' + node + ',' + nodes + '),' \
+               'get_dict(predicate,' + node + ',' + name + '),get_dict(call,' + node + ',' + calls + '),get_dict(ticks_self,' + node + ',' + own + '),' \
+               '(' + ticks + '>0->' + seconds + ' is ' + own + '*' + total + '/' + ticks + ';' + seconds + '=0)'
+        lvars = [name, calls, seconds]
+        return [('profile_data', lvars, self._printer(lvars, goal + '.')[:-1])]
+
+    def _predicates(self, results):
+        '''Private method turning the printed profile_data/1 nodes into the predicates of a ProfileReport.'''
+        tag = _sentinel[:6]
+        predicates = {}
+        for row in results[0] or []:
+            predicates[row['P' + tag]] = {'calls': int(row['C' + tag]), 'seconds': self._number(row['S' + tag])}
+        return predicates
+
+    def save(self, state):
+        '''Saves the current engine state, with all loaded modules, to a file
+        Usage: instance.save( path )
+        state - path of the saved state
+
+        A new engine started with swipl( state=path ) begins with this
+        state without compiling anything.
 
         Raises: SWIQueryError'''
-        query = query.strip()
-        if query[-1] != '.':
-            query += '.'
-        lvars = var_re.findall(query)
-        lvars = list(set(lvars))
-        if lvars == []:  # yes/no query (no variables)
-            self.engine.sendline(query)
-            index = self.engine.expect([swiprompt, swierror])
-            if index == 1:
-                raise SWIQueryError('Error while executing query "' + query + '". Error from SWI:\n' + str( self.engine.after ))
-            else:
-                if 'true' in str( self.engine.before ):
-                    return True
-                else:
-                    return False
-        else:  # normal query
-            printer = self._printer(lvars, query)
-            self.engine.sendline(printer)
-            index = self.engine.expect([swierror, swiprompt])
-            if index == 0:
-                raise SWIQueryError('Error while executing query "' + query + '". Error from SWI:\n' + str( self.engine.after ))
-            else:
-                state = str( self.engine.before )
-                state = state.replace( '\\r', '\r' ).replace( '\\n', '\n' )
-                res = res_re.findall( state.split(',nl,fail.\n')[-1])
-                results = []
-                counter = 0
-                temp = []
-                for i in res:
-                    counter += 1
-                    temp.append(i)
-                    if counter % len(lvars) == 0:
-                        results.append(dict(temp))
-                        temp = []
-                if results == []:
-                    return False
-                return results
-
-    def _printer(self, lvars, query):
-        '''Private method for constructing a result printing query.
-        Usage: instance._printer( lvars, query )
-        lvars - list of logical variables to print
-        query - query containing the variables to be printed
-
-        Returns: string of the form 'query, writeln( res( 'VarName1', VarName1 ) ) ... writeln( res( 'VarNameN', VarNameN ) ),nl,fail.'
-        '''
-        query = query[:-1]
-        elems = ["writeln( res('''" + i + "'''," + i + ") )" for i in lvars]
-        printer = query + ',' + ','.join(elems) + ',nl,fail.'
-        return printer
+        self.query("qsave_program('" + state + "')")
 
 eclipseprompt = '[\[]eclipse [0-9]+[\]][:] '
 eclipseerror = 'Abort.*'
@@ -271,98 +2442,209 @@ class ECLiPSeQueryError(Exception):
     pass
 
 
-class eclipse:
-    '''Python interface to ECLiPSe Prolog (http://eclipseclp.org)'''
-    def __init__(self, path='eclipse', args=''):
+class ECLiPSeQueryTimeout(Exception):
+    '''Exception raised if a query or load exceeds its deadline.'''
+    pass
+
+
+class eclipse(_prolog):
+    '''Python interface to ECLiPSe Prolog (http://eclipseclp.org)
+
+    Answers are read from the toplevel; eclipsepeer reads length
+    delimited frames instead.'''
+    name = 'ECLiPSe'
+    prompt = eclipseprompt
+    error = eclipseerror
+    QueryError = ECLiPSeQueryError
+    QueryTimeout = ECLiPSeQueryTimeout
+    interrupted = 'interruption: type'
+    extensions = ('.ecl', '.pl')
+    objext = '.eco'
+    prompttext = '[eclipse 1]: '
+    errortext = 'Abort: '
+    flush = 'flush(output)'
+
+    def __init__(self, path='eclipse', args='', transport='pty'):
         '''Constructor method
-        Usage: eclipse( path, args )
+        Usage: eclipse( path, args, transport )
         path - path to ECLiPSe executable (default: 'eclipse')
         args - command line arguments (default: '')
+        transport - 'pty' (pseudo terminal) or 'pipe' (plain pipes, no
+          echo or terminal line discipline), see transports (default: 'pty')
 
         self.engine becomes pexpect spawn instance of ECLiPSe Prolog shell
 
         Raises: ECLiPSeExecutableNotFound'''
         try:
-            self.engine = px.spawn(path + ' ' + args, timeout=5)
+            self._spawn(path + ' ' + args, transport)
         except px.ExceptionPexpect:
             raise ECLiPSeExecutableNotFound('ECLiPSe Prolog executable not found on the specified path.')
-        self.engine.expect(eclipseprompt)
 
-    def load(self, module):
+    def load(self, module, timeout=None):
         '''Loads module into self.engine
-        Usage: instance.load( path )
+        Usage: instance.load( path, timeout )
         module - path to module file
+        timeout - deadline in seconds (default: None, no deadline)
 
-        Raises: ECLiPSeCompileError'''
-        self.engine.sendline("['" + module + "'].")
-        index = self.engine.expect([eclipseerror, eclipseprompt])
-        if index == 0:
-            raise ECLiPSeCompileError('Error while compiling module "' + module + '". Error from ECLiPSe:\n' + str( self.engine.after ))
-
-    def query(self, query):
-        '''Queries current engine state
-        Usage: instance.query( query )
-        query - usual ECLiPSe Prolog query (example: 'likes( X, Y )')
-
-        Returns:
-          True - if yes/no query and answer is yes
-          False - if yes/no query and answer is no
-          List of dictionaries - if normal query. Dictionary keys are returned
-          variable names. Example:
-          >>> instance.query( 'likes( Person, Food )' )
-          [{'Person': 'john', 'Food': 'curry'}, {'Person': 'sandy', 'Food': 'mushrooms'}]
-
-        Raises: ECLiPSeQueryError'''
-        query = query.strip()
-        if query[-1] != '.':
-            query += '.'
-        lvars = var_re.findall(query)
-        lvars = list(set(lvars))
-        if lvars == []:  # yes/no query (no variables)
-            self.engine.sendline(query)
-            index = self.engine.expect([eclipseprompt, eclipseerror])
-            if index == 1:
-                raise ECLiPSeQueryError('Error while executing query "' + query + '". Error from ECLiPSe:\n' + str( self.engine.after ))
-            else:
-                if 'Yes' in str( self.engine.before ):
-                    return True
-                else:
-                    return False
-        else:  # normal query
-            printer = self._printer(lvars, query)
-            self.engine.sendline(printer)
-            index = self.engine.expect([eclipseerror, eclipseprompt])
-            if index == 0:
-                raise ECLiPSeQueryError('Error while executing query "' + query + '". Error from ECLiPSe:\n' + str( self.engine.after ))
-            else:
-                state = str( self.engine.before )
-                state = state.replace( '\\r', '\r' ).replace( '\\n', '\n' )
-                res = res_re.findall( state.split(',nl,fail.\n')[-1])
-                results = []
-                counter = 0
-                temp = []
-                for i in res:
-                    counter += 1
-                    temp.append(i)
-                    if counter % len(lvars) == 0:
-                        results.append(dict(temp))
-                        temp = []
-                if results == []:
-                    return False
-                return results
+        If self.compiled is set, the module is compiled once per version of
+        its source and loaded from the compiled file afterwards.
 
-    def _printer(self, lvars, query):
-        '''Private method for constructing a result printing query.
-        Usage: instance._printer( lvars, query )
-        lvars - list of logical variables to print
-        query - query containing the variables to be printed
+        Raises: ECLiPSeCompileError, ECLiPSeQueryTimeout'''
+        self._within('load', module, timeout, self._load, module)
 
-        Returns: string of the form 'query, writeln( res( 'VarName1', VarName1 ) ) ... writeln( res( 'VarNameN', VarNameN ) ),nl,fail.'
-        '''
+    def _loaded(self, module):
+        '''Private method reading the answer of a load command already sent.'''
+        self._invalidate()
+        index = self._expect([eclipseerror, eclipseprompt])
+        if index == 0:
+            message = str( self.engine.after )
+            self._sync()  # the prompt following the error
+            raise ECLiPSeCompileError('Error while compiling module "' + module + '". Error from ECLiPSe:\n' + message)
+        self._remember(module)
+
+    def _compile(self, source, compiled):
+        '''Private method returning the command that compiles a source file into compiled and loads it.'''
+        return "compile('" + source + "',[output:eco]),compile('" + compiled + "')."
+
+    def _counter(self, name, var):
+        '''Private method returning the goals resetting a global counter and incrementing it into var.'''
+        return 'setval(' + name + ',0)', 'incval(' + name + '),getval(' + name + ',' + var + ')'
+
+
+class eclipsepeer(eclipse):
+    '''Python interface to ECLiPSe Prolog exchanging length delimited frames instead of scraping the toplevel
+
+    A small read-execute loop replaces the ECLiPSe toplevel. Goals are
+    still sent as full stop terminated terms, but everything the engine
+    writes back is a frame: the sentinel, a one letter tag, the length of
+    the payload in bytes, a colon and the payload. The tags are those of
+    _prolog records (s, v, e, x and d, values and errors carry a payload) and
+    r, which the loop writes before reading the next goal and which takes
+    the place of the prompt. Values are sliced out by their length, so
+    they may contain newlines or anything resembling a prompt, and no
+    regular expression runs over the answers.'''
+    prompt = _sentinel + 'r0:'
+    _record = None  # the prompt is a frame and cannot appear in values
+
+    def __init__(self, path='eclipse', args='', transport='pipe'):
+        '''Constructor method
+        Usage: eclipsepeer( path, args, transport )
+        path - path to ECLiPSe executable (default: 'eclipse')
+        args - command line arguments (default: '')
+        transport - 'pipe' or a callable, see transports (default: 'pipe').
+          Pseudo terminals translate line ends, which breaks the frame
+          lengths, so 'pty' is refused.
+
+        Raises: ECLiPSeExecutableNotFound, ValueError'''
+        if transport == 'pty':
+            raise ValueError('eclipsepeer needs a transport that passes output through unchanged, not "pty".')
+        eclipse.__init__(self, path, args, transport)
+
+    def _start(self):
+        '''Private method defining the frame writing predicate and starting the peer loop.'''
+        helper = self._helper() + '(T,V,H):-open(string(""),write,S),(H==c->write_canonical(S,V);write(S,V)),get_stream_info(S,name,Str),close(S),string_length(Str,L),' + self._mark('') + ",write(T),write(L),write(':'),write(Str)"
+        error = self._frame('x', 'E')
+        self._sendline('assert((' + helper + ')),repeat,' + self._frame('r') + ',flush(output),catch(read(G),E,(' + error + ',G=true)),(G==end_of_file->halt;catch(G,E,' + error + ')->true;true),fail.')
+        self._expect(self.prompt)
+
+    def _helper(self):
+        '''Private method returning the name of the frame writing predicate.'''
+        return "'pyxf" + _sentinel[:6] + "_frame'"
+
+    def _frame(self, tag, value=None, how='w'):
+        '''Private method for constructing a goal writing one frame
+        Usage: instance._frame( tag, value, how )
+        value - variable written as the payload (default: None, empty payload)
+        how - 'w' for write/1 or 'c' for write_canonical/1 (default: 'w')'''
+        if value is None:
+            return self._mark(tag) + ",write('0:')"
+        return self._helper() + '(' + tag + ',' + value + ',' + how + ')'
+
+    def _printer(self, lvars, query, columns=(), page=None):
+        '''Private method for constructing a result printing query, see _prolog._printer()
+
+        Returns: string of the form
+          'catch((((query),<s>,<v VarName1>,...,<e>,fail;true),<d>),E,(<x E>,<d>)).'
+        where <t> writes a frame with tag t (see eclipsepeer).'''
         query = query[:-1]
-        elems = ["writeln( res('\\'" + i + "\\''," + i + ") )" for i in lvars]
-        printer = query + ',' + ','.join(elems) + ',nl,fail.'
-        return printer
+        frame = self._frame
+        error = 'E' + _sentinel[:6]
+        if lvars:
+            row = frame('s') + ',' + ','.join(frame('v', i, 'c' if i in columns else 'w') for i in lvars) + ',' + frame('e')
+            if page is None:
+                found = '((' + query + '),' + row + ',fail;true)'
+            else:
+                found = self._page('(' + query + ')', row, page)
+        else:
+            found = '((' + query + ')->' + frame('s') + ',' + frame('e') + ';true)'
+        return 'catch((' + found + ',' + frame('d') + '),' + error + ',(' + frame('x', error) + ',' + frame('d') + ')).'
+
+    def _frames(self):
+        '''Private generator yielding ( tag, payload ) per frame as the output arrives.
+
+        Output between frames (messages the engine writes to stderr) is
+        yielded as ( None, text ). Stops after the r frame and leaves what
+        follows it in the pexpect buffer.'''
+        head = _sentinel.encode('ascii')
+        data = bytearray(self.engine.buffer)
+        pos = 0
+        self._unread(b'')
+        try:
+            while True:
+                start = data.find(head, pos)
+                colon = data.find(b':', start + len(head)) if start >= 0 else -1
+                end = colon + 1 + int(data[start + len(head) + 1:colon]) if colon >= 0 else -1
+                if colon < 0 or end > len(data):
+                    if pos > self.chunksize:
+                        del data[:pos]
+                        pos = 0
+                    data += self._recv(self._wait())
+                    continue
+                if start > pos:
+                    yield None, data[pos:start].decode('utf-8', 'replace')
+                tag = chr(data[start + len(head)])
+                payload = data[colon + 1:end].decode('utf-8', 'replace')
+                pos = end
+                yield tag, payload
+                if tag == 'r':
+                    return
+        finally:
+            self._unread(bytes(data[pos:]))
+
+    def _records(self, count=1):
+        '''Private generator parsing the frames of the goals sent last.
+        count - number of goals whose records are read; the answer always
+          ends at the r frame the loop writes before reading again
+
+        Yields the ( tag, fields ) tuples of _prolog._records(). A solution
+        is only yielded once its e frame arrived, a solution interrupted by
+        an error is dropped.'''
+        row = None
+        for tag, payload in self._frames():
+            if tag == 'v' and row is not None:
+                row.append(payload)
+                continue
+            if tag == 'e' and row is not None:
+                yield 's', row
+            row = None
+            if tag == 's':
+                row = []
+            elif tag == 'x':
+                yield 'x', payload
+            elif tag == 'd':
+                yield 'd', None
+            elif tag is None:
+                for line in payload.splitlines():
+                    if re.search(self.error, line):
+                        yield '!', line
+
+    def _loaded(self, module):
+        '''Private method reading the answer of a load command already sent.'''
+        self._invalidate()
+        error = [fields for tag, fields in self._records() if tag == 'x' or tag == '!']
+        if error:
+            raise ECLiPSeCompileError('Error while compiling module "' + module + '". Error from ECLiPSe:\n' + '\n'.join(error))
+        self._remember(module)
 
 flora2prompt = 'flora2 [?][-][ ]'
 flora2error = '[+][+]Error.*'
@@ -384,6 +2666,11 @@ class Flora2CompileError(Exception):
 class Flora2QueryError(Exception):
     '''Exception raised if query raises an error.'''
     pass
+
+
+class Flora2QueryTimeout(Exception):
+    '''Exception raised if a query or load exceeds its deadline.'''
+    pass
   
   
 class Flora2FactError(Exception):
@@ -391,44 +2678,77 @@ class Flora2FactError(Exception):
     pass
 
 
-class flora2:
+class flora2(_aflora2, _backend):
     '''Python interface to Flora2 (http://flora.sf.net)'''
-    def __init__(self, path='runflora', args='--nobanner --quietload', expert=False):
+    name = 'Flora2'
+    prompt = flora2prompt
+    error = flora2error
+    QueryError = Flora2QueryError
+    QueryTimeout = Flora2QueryTimeout
+    placeholder = '[?](?![a-zA-Z0-9_])'  # a lone ?, use ?_ for anonymous variables in templates
+
+    def __init__(self, path='runflora', args='--nobanner --quietload', expert=False, transport='pty'):
         '''Constructor method
-        Usage: flora2( path, args )
+        Usage: flora2( path, args, expert, transport )
         path - path to Flora2 executable (default: 'runflora')
         args - command line arguments (default: '--nobanner --quietload')
         expert - whether to activate expert mode
+        transport - 'pty' (pseudo terminal) or a callable, see transports
+          (default: 'pty'). The Flora2 shell writes no prompt without a
+          terminal, so 'pipe' is refused.
 
         self.engine becomes pexpect spawn instance of Flora2 shell
 
-        Raises: SWIExecutableNotFound'''
+        Raises: Flora2ExecutableNotFound, ValueError'''
+        if transport == 'pipe':
+            raise ValueError('The Flora2 shell writes no prompt on pipes, use transport="pty".')
+        self.expert = expert
+        self._synced = {}  # name -> set of normalized facts pushed by sync()
         try:
-            self.engine = px.spawn(path + ' ' + args, timeout=5)
-            self.engine.expect(flora2prompt)
-            if expert:
-                self.engine.sendline('expert{yes}.')
-                index = self.engine.expect([flora2prompt, flora2error])
-                if index == 1:
-                    raise Flora2CompileError('Error setting expert mode. Error from Flora2:\n' + str( self.engine.after ))
+            self._spawn(path + ' ' + args, transport)
         except px.ExceptionPexpect:
             raise Flora2ExecutableNotFound('Flora-2 executable not found on the specified path. Try using flora2( "/path/to/flora2/runflora" )')
 
-    def load(self, module):
+    def _start(self):
+        '''Private method waiting for the first prompt and setting expert mode.'''
+        self._expect(flora2prompt)
+        if self.expert:
+            self._sendline('expert{yes}.')
+            index = self._expect([flora2prompt, flora2error])
+            if index == 1:
+                raise Flora2CompileError('Error setting expert mode. Error from Flora2:\n' + str( self.engine.after ))
+
+    def load(self, module, timeout=None):
         '''Loads module into self.engine
-        Usage: instance.load( path )
+        Usage: instance.load( path, timeout )
         module - path to module file
+        timeout - deadline in seconds (default: None, no deadline)
+
+        Raises: Flora2CompileError, Flora2QueryTimeout'''
+        self._within('load', module, timeout, self._load, module)
 
-        Raises: Flora2CompileError'''
-        self.engine.sendline("['" + module + "'].")
-        index = self.engine.expect([flora2prompt, flora2error])
+    def _loaded(self, module):
+        '''Private method reading the answer of a load command already sent.'''
+        self._invalidate()
+        index = self._expect([flora2prompt, flora2error])
         if index == 1:
             raise Flora2CompileError('Error while compiling module "' + module + '". Error from Flora2:\n' + str( self.engine.after ))
+        self._remember(module)
 
-    def query(self, query):
+    def query(self, query, timeout=None, decode=None, resultset=False, limit=None, offset=0):
         '''Queries current engine state
-        Usage: instance.query( query )
+        Usage: instance.query( query, timeout, decode, resultset, limit, offset )
         query - usual Flora2 query (example: '?x[ likes->?y ]')
+        timeout - deadline in seconds (default: None, no deadline)
+        decode - True to turn all values into Python values with decode(), or
+          the names of the variables to decode, without the ? (default:
+          None, values are the strings printed by Flora2)
+        resultset - return a ResultSet instead of a list of dictionaries
+          (default: False)
+        limit - maximum number of solutions (default: None, all)
+        offset - number of solutions to skip first (default: 0)
+          The Flora2 shell has no way to stop a query after some answers,
+          so the solutions outside of the page are read and dropped.
 
         Returns:
           True - if yes/no query and answer is yes
@@ -438,41 +2758,250 @@ class flora2:
           >>> instance.query( '?person[ likes->?food ]' )
           [{'person': 'john', 'food': 'curry'}, {'person': 'sandy', 'food': 'mushrooms'}]
 
+        Raises: Flora2QueryError, Flora2QueryTimeout'''
+        return self._within('query', query, timeout, self._cached, self._terminate(query), self._query, *self._options(decode, resultset, limit, offset))
+
+    def _run(self, item, columns=(), resultset=False, page=None):
+        '''Private method sending one _item() tuple and returning its query() result.'''
+        self._sendline(item[2])
+        return self._reply(item, columns, resultset, page)
+
+    def _reply(self, item, columns=(), resultset=False, page=None):
+        '''Private method reading the query() result of an _item() tuple already sent.'''
+        query, lvars, goal = item
+        if lvars == []:  # yes/no query (no variables)
+            return self._ask(query)
+        solutions = self._solutions(lvars, query)
+        if page is not None:
+            offset, limit = page
+            paged = list(itertools.islice(solutions, offset, None if limit is None else offset + limit))
+            self._drain(solutions)
+            solutions = paged
+        if resultset:
+            names = [v[1:] for v in lvars]
+            return ResultSet(names, ([s.get(n) for n in names] for s in solutions))
+        return list(solutions)
+
+    def _variables(self, text):
+        '''Private method returning the distinct variables of a query in order of appearance.'''
+        lvars = fvar_re.findall(text)
+        return list( OrderedDict.fromkeys( lvars ) )
+
+    def _columns(self, lvars, decode):
+        '''Private method returning the variables of a query whose values are decoded, without the ?.'''
+        return _backend._columns(self, [v[1:] for v in lvars], decode)
+
+    def _quote(self, text):
+        '''Private method writing text as a quoted Flora2 symbol.'''
+        text = text.replace('\\', '\\\\').replace("'", "\\'").replace('\n', '\\n')
+        return "'" + text + "'"
+
+    def _ask(self, query, echo=()):
+        '''Private method reading the answer of a yes/no query already sent.
+        echo - other queries sent together with this one (see _batch())'''
+        error = []
+        answer = False
+        for line in self._lines(flora2prompt):
+            if error or re.search(flora2error, line):
+                error.append(line)
+            elif 'Yes' in line and line.strip() != query and line.strip() not in echo:
+                answer = True
+        if error:
+            self._raise(query, error)
+        return answer
+
+    def iquery(self, query, decode=None):
+        '''Queries current engine state, yielding solutions as they arrive
+        Usage: for solution in instance.iquery( query, decode ): ...
+        query - usual Flora2 query (example: '?x[ likes->?y ]')
+        decode - variables whose values are decoded (see query())
+
+        Yields: one dictionary per solution, keys are variable names. A
+        yes/no query yields a single empty dictionary if the answer is yes.
+        Solutions are parsed one at a time while Flora2 is still printing,
+        so memory use does not grow with the number of solutions.
+
         Raises: Flora2QueryError'''
-        query = query.strip()
-        if query[-1] != '.':
-            query += '.'
+        query = self._terminate(query)
         lvars = fvar_re.findall(query)
-        lvars = list(set(lvars))
-        if lvars == []:  # yes/no query (no variables)
-            self.engine.sendline(query)
-            index = self.engine.expect([flora2prompt, flora2error])
-            if index == 1:
-                raise Flora2QueryError('Error while executing query "' + query + '". Error from Flora2:\n' + str( self.engine.after ))
-            else:
-                if 'Yes' in str( self.engine.before ):
-                    return True
-                else:
-                    return False
-        else:  # normal query
-            self.engine.sendline(query)
-            index = self.engine.expect([flora2error, flora2prompt])
-            if index == 0:
-                raise Flora2QueryError('Error while executing query "' + query + '". Error from Flora2:\n' + str( self.engine.after ))
-            else:
-                state = str( self.engine.before )
-                state = state.replace( '\\r', '\r' )
-                res = fres_re.findall( state )
-                results = []
-                counter = 0
-                temp = []
-                for i in res:
-                    counter += 1
-                    temp.append(i)
-                    if counter % len(lvars) == 0:
-                        results.append(dict(temp))
+        lvars = list( OrderedDict.fromkeys( lvars ) )
+        if lvars == []:
+            if self.query(query):
+                yield {}
+            return
+        columns = self._columns(lvars, decode)
+        self._sendline(query)
+        for solution in self._invalidating(query, self._solutions(lvars, query)):
+            yield self._decode(solution, columns)
+
+    def _solutions(self, lvars, query, echo=()):
+        '''Private generator parsing the output of a query already sent.
+        echo - other queries sent together with this one (see _batch())'''
+        lines = self._lines(flora2prompt)
+        error = []
+        temp = []
+        try:
+            for line in lines:
+                if error or re.search(flora2error, line):
+                    error.append(line)
+                    continue
+                if line.strip() == query or line.strip() in echo:  # echoed query
+                    continue
+                res = fres_re.search(line)
+                if res:
+                    temp.append(res.groups())
+                    if len(temp) == len(lvars):
+                        yield dict(temp)
                         temp = []
-                return results
+        finally:
+            self._drain(lines)
+        if error:
+            self._raise(query, error)
+
+    def _item(self, query, columns=(), page=None):
+        '''Private method returning the ( query, variables, goal ) tuple used by query_batch().'''
+        lvars = fvar_re.findall(query)
+        lvars = list( OrderedDict.fromkeys( lvars ) )
+        return query, lvars, query
+
+    def _write(self, items):
+        '''Private method writing a group of queries at once.'''
+        self._send(''.join(goal + '\n' for query, lvars, goal in items))
+
+    def _ends(self, items):
+        '''Private method returning the prompts that end the answers of a group of queries.'''
+        return [flora2prompt] * len(items)
+
+    def _read(self, items):
+        '''Private method reading the answers of a group of queries sent by _write() in order.'''
+        echo = set(query for query, lvars, goal in items)
+        results = []
+        for query, lvars, goal in items:
+            try:
+                if lvars == []:
+                    results.append(self._ask(query, echo))
+                else:
+                    results.append(list(self._solutions(lvars, query, echo)))
+            except Flora2QueryError as e:
+                results.append(e)
+        return results
+
+    def loadfacts(self, facts, predicate=None, progress=None):
+        '''Adds many facts to the reasoner at once
+        Usage: instance.loadfacts( facts, predicate, progress )
+        facts - iterable of usual Flora2 fact strings (example: 'bob[ likes->tomato ]') or,
+          if predicate is given, of tuples of Python values (example: ('bob', 'tomato'))
+        predicate - predicate name for tuple facts (default: None)
+        progress - callable receiving the number of facts processed so far,
+          called every 10000 facts and once more at the end (default: None)
+
+        Facts are inserted with one insert{ f1, ..., fN } command per
+        self.batchsize characters, and the commands are pipelined with
+        query_batch().
+
+        Returns: number of facts loaded
+
+        Raises: Flora2FactError'''
+        count = 0
+        commands, command = [], []
+        size = 0
+        for fact in self._facts(facts, predicate, progress):
+            if command and size + len(fact) > self.batchsize:
+                commands.append('insert{' + ','.join(command) + '}.')
+                command, size = [], 0
+            command.append(fact)
+            size += len(fact) + 1
+            count += 1
+            if len(commands) == 64:
+                self._insert(commands)
+                commands = []
+        if command:
+            commands.append('insert{' + ','.join(command) + '}.')
+        self._insert(commands)
+        if progress is not None:
+            progress(count)
+        return count
+
+    def _insert(self, commands):
+        '''Private method running insert commands and raising Flora2FactError if one fails.'''
+        self._inserted(commands, self.query_batch(commands))
+
+    def _inserted(self, commands, results):
+        '''Private method raising Flora2FactError for the first insert command that failed.'''
+        for command, result in zip(commands, results):
+            if result is not True:
+                raise Flora2FactError('Error while adding facts. The command sent was ' + command + '. Error from Flora2:\n' + str( result ))
+
+    def sync(self, facts, predicate=None, name=None):
+        '''Makes the facts pushed by earlier calls equal to a new set of facts
+        Usage: instance.sync( facts, predicate, name )
+        facts - iterable of usual Flora2 fact strings (example: 'bob[ likes->tomato ]') or,
+          if predicate is given, of tuples of Python values (example: ('bob', 'tomato'))
+        predicate - predicate name for tuple facts (default: None)
+        name - name of the fact set, to keep several sets in sync
+          independently of each other (default: None)
+
+        Only the difference to the facts of the last sync() with the same
+        name is sent: facts no longer given are deleted and new facts are
+        inserted, with one t_delete{ ... }, t_insert{ ... } command per
+        self.batchsize characters, pipelined with query_batch(). A fact
+        that also belongs to a set with another name stays in the engine
+        and is only taken out of, or added to, this set. Each
+        command is a transaction that either applies completely or not at
+        all, and the commands that succeeded are remembered even if
+        others failed. Facts are compared in normalized form (see
+        normalize()), so spacing does not matter. When a timed out query
+        restarts the engine, the pushed facts are forgotten, and the
+        next sync() inserts all of them again.
+
+        Returns: ( number of facts inserted, number of facts deleted )
+
+        Raises: Flora2FactError'''
+        old = self._synced.get(name, set())
+        new = set(normalize(fact) for fact in self._facts(facts, predicate))
+        deleted, inserted = old - new, new - old
+        shared = set()
+        for other, owned in self._synced.items():
+            if other != name:
+                shared |= owned
+        commands, changes = [], []
+        command, size = [], 0
+        for op, fact in itertools.chain((('t_delete', f) for f in deleted - shared), (('t_insert', f) for f in inserted - shared)):
+            if command and size + len(fact) > self.batchsize:
+                commands.append(self._transaction(command))
+                changes.append(command)
+                command, size = [], 0
+            command.append((op, fact))
+            size += len(fact) + 1
+        if command:
+            commands.append(self._transaction(command))
+            changes.append(command)
+        results = self.query_batch(commands) if commands else []
+        synced = (old - (deleted & shared)) | (inserted & shared)
+        for change, result in zip(changes, results):
+            if result is True:
+                for op, fact in change:
+                    if op == 't_insert':
+                        synced.add(fact)
+                    else:
+                        synced.discard(fact)
+        self._synced[name] = synced
+        for command, result in zip(commands, results):
+            if result is not True:
+                raise Flora2FactError('Error while synchronizing facts. The command sent was ' + command + '. Error from Flora2:\n' + str( result ))
+        return len(inserted), len(deleted)
+
+    def _transaction(self, changes):
+        '''Private method writing ( operation, fact ) pairs as one command, grouping runs of the same operation.'''
+        groups = []
+        for op, facts in itertools.groupby(changes, lambda c: c[0]):
+            groups.append(op + '{' + ','.join(f for o, f in facts) + '}')
+        return ','.join(groups) + '.'
+
+    def _restore(self, modules):
+        '''Private method loading modules into a restarted engine, which has lost the synchronized facts.'''
+        self._synced = {}
+        _backend._restore(self, modules)
 
     def addfacts(self, facts):
         '''
@@ -482,11 +3011,11 @@ class flora2:
 
         Raises Flora2FactError on error inserting fact. 
         '''
-
+        self._invalidate()
         for f in facts:
             command = 'insert{' + f + '}.'
-            self.engine.sendline(command)
-            index = self.engine.expect([flora2prompt, flora2error])
+            self._sendline(command)
+            index = self._expect([flora2prompt, flora2error])
             if index == 1:
                 raise Flora2FactError('Error while adding fact "' + f + '". The command sent was ' + command + '. Error from Flora2:\n' + str( self.engine.after ))
             else:
@@ -495,6 +3024,9 @@ class flora2:
 
 
 desprompt = '[D][E][S][>][ ]'
+# SQL and relational algebra queries, the rest is taken as Datalog
+sql_re = re.compile('\\s*(select|with)\\s.*\\sfrom\\s', re.I | re.S)
+ra_re = re.compile('\\s*(project|select|rename|product|njoin|ljoin|rjoin|fjoin|zjoin|union|difference|intersect|division|group_by)\\b', re.I)
 deserror = 'Error[:][ ].*'
 destapiprompt = '[|][:]'
 destapierror = '[$]error[\r][\n][01].*'
@@ -516,20 +3048,166 @@ class DESQueryError(Exception):
     pass
 
 
-class des:
+class DESQueryTimeout(Exception):
+    '''Exception raised if a query or load exceeds its deadline.'''
+    pass
+
+
+class Cursor:
+    '''Cursor streaming the answer of a DES query, see des.cursor()
+
+    Attributes:
+      query - the query sent
+      description - list of ( name, type ) per column of the answer, type
+        is None if DES gives none (Datalog answers), example:
+        [('t.a', 'string(varchar)'), ('t.b', 'number(integer)')]
+      rowcount - number of tuples fetched so far
+      arraysize - default number of tuples returned by fetchmany()
+
+    Tuples are read from DES only as they are fetched, so the answer is
+    never held in memory as a whole. While a cursor is open the engine
+    cannot run anything else; using the engine again closes the cursor.'''
+    def __init__(self, engine, query, typed=True, arraysize=1000):
+        '''Constructor method, use engine.cursor( query, typed, arraysize ) instead
+        Usage: Cursor( engine, query, typed, arraysize )
+
+        Sends the query and reads the answer up to its schema line.
+
+        Raises: DESQueryError'''
+        self.engine = engine
+        self.query = query
+        self.typed = typed
+        self.arraysize = arraysize
+        self.rowcount = 0
+        self.description = []
+        self._answer = engine._tapi(query, True)
+        self._first = None  # tuple read while looking for the schema
+        for kind, data in self._answer:
+            if kind == 'answer':
+                self.description = self._schema(data)
+            else:
+                self._first = data
+            break
+        self._kinds = [self._kind(t) for n, t in self.description]
+        self._rows = self._tuples()
+
+    def _schema(self, line):
+        '''Private method returning the ( name, type ) columns of a schema line like answer(a:int,b:string).'''
+        columns = []
+        depth, start = 0, len('answer(')
+        for i in range(start, len(line)):
+            c = line[i]
+            if c == '(':
+                depth += 1
+            elif c == ')' and depth:
+                depth -= 1
+            elif (c == ',' and not depth) or (c == ')' and i == len(line) - 1):
+                if i > start:
+                    name, sep, kind = line[start:i].partition(':')
+                    columns.append((name.strip(), kind.strip() or None))
+                start = i + 1
+        return columns
+
+    def _kind(self, type):
+        '''Private method classifying a column type as 'int', 'float', 'str' or None (any term).'''
+        if type is None or not self.typed:
+            return None
+        type = type.lower()
+        if 'int' in type:
+            return 'int'
+        if re.search('float|real|double|decimal|numeric|number', type):
+            return 'float'
+        return 'str'
+
+    def _value(self, text, kind):
+        '''Private method converting the text of a value to the Python value of its column.'''
+        if text == 'null':
+            return None
+        if kind is None:
+            return decode(text)
+        if text[:1] == "'":
+            text = text[1:-1].replace("''", "'")
+            if kind == 'str':
+                return text
+        try:
+            return int(text) if kind == 'int' or '.' not in text else float(text)
+        except ValueError:
+            return text
+
+    def _tuples(self):
+        '''Private generator converting the tuples of the answer.'''
+        rows = self._answer if self._first is None else itertools.chain([('$', self._first)], self._answer)
+        self._first = None
+        kinds = self._kinds
+        for kind, values in rows:
+            if kind != '$':
+                continue
+            if self.typed:
+                if len(kinds) != len(values):
+                    kinds = self._kinds = [None] * len(values)
+                values = [self._value(v, k) for v, k in zip(values, kinds)]
+            self.rowcount += 1
+            yield tuple(values)
+
+    def __iter__(self):
+        return self._rows
+
+    def __next__(self):
+        return next(self._rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def fetchone(self):
+        '''Returns the next tuple or None at the end of the answer.'''
+        return next(self._rows, None)
+
+    def fetchmany(self, size=None):
+        '''Returns a list of at most size (default: self.arraysize) next tuples.'''
+        return list(itertools.islice(self._rows, self.arraysize if size is None else size))
+
+    def fetchall(self):
+        '''Returns a list of the remaining tuples.'''
+        return list(self._rows)
+
+    def close(self):
+        '''Reads and drops the rest of the answer, leaving the engine ready for other commands.'''
+        if self.engine._cursor is self:
+            self.engine._cursor = None
+        self._rows.close()
+        self._answer.close()
+
+
+class des(_ades, _backend):
     '''Python interface to Datalog Educational System (http://des.sf.net)'''
-    def __init__(self, path='des_start', args=''):
+    name = 'DES'
+    prompt = desprompt
+    error = deserror
+    QueryError = DESQueryError
+    QueryTimeout = DESQueryTimeout
+    dsn = None  # ( dsn, username, password ) given to connect()
+    _tapiend = '|'.join([destapisuccess, destapiend, destapierror])  # regex matching the end of a TAPI command answer
+    _cursor = None  # open Cursor, whose answer is still being read
+
+    def __init__(self, path='des_start', args='', transport='pty'):
         '''Constructor method
-        Usage: des( path, args )
+        Usage: des( path, args, transport )
         path - path to DES executable (default: 'des_start')
         args - command line arguments (default: '')
+        transport - 'pty' (pseudo terminal) or a callable, see transports
+          (default: 'pty'). DES writes no prompt without a terminal, so
+          'pipe' is refused.
 
         self.engine becomes pexpect spawn instance of XSB Prolog shell
 
-        Raises: DESExecutableNotFound'''
+        Raises: DESExecutableNotFound, ValueError'''
+        if transport == 'pipe':
+            raise ValueError('DES writes no prompt on pipes, use transport="pty".')
         try:
-            self.engine = px.spawn(path + ' ' + args, timeout=5)
-            self.engine.expect(desprompt)
+            self._spawn(path + ' ' + args, transport)
         except px.ExceptionPexpect:
             raise DESExecutableNotFound('DES executable not found on the specified path. Try using xsb( "/path/to/DES/bin/des_start" )')
 
@@ -547,10 +3225,18 @@ class des:
         if password:
             query += " password('%s')" % password
 
-        self.engine.sendline( '/tapi ' + query )
-        index = self.engine.expect([destapisuccess, destapierror])
+        self._invalidate()
+        self._sendline( '/tapi ' + query )
+        index = self._expect([destapisuccess, destapierror])
         if index == 1:
             raise DESCompileError('Error while connecting to DSN "' + dsn + '". Error from DES:\n' + str( self.engine.after ))
+        self.dsn = (dsn, username, password)
+
+    def _restore(self, modules):
+        '''Private method connecting a restarted engine and loading modules into it.'''
+        if self.dsn is not None:
+            self.connect(*self.dsn)
+        _backend._restore(self, modules)
 
     def command(self, cmd, args=''):
         '''Issues a DES command
@@ -559,29 +3245,84 @@ class des:
         args - optional (string, not list) arguments (default '')
         
         Returns: raw text command output (utf8 string)'''
-        self.engine.sendline(cmd + ' ' + args)
-        index = self.engine.expect([desprompt, destapiprompt, deserror])
+        self._invalidate()
+        self._sendline(cmd + ' ' + args)
+        index = self._expect([desprompt, destapiprompt, deserror])
         if index == 2:
             raise DESCompileError('Error while issuing command "' + cmd + '". Error from DES:\n' + str( self.engine.after ))
         res = self.engine.before
         return res.decode( 'utf8' )
         
         
-    def load(self, module):
+    def load(self, module, timeout=None):
         '''Loads/restores module (DDB) into self.engine
-        Usage: instance.load( path )
+        Usage: instance.load( path, timeout )
         module - path to module file
+        timeout - deadline in seconds (default: None, no deadline)
 
-        Raises: Warning'''
-        self.engine.sendline("/tapi /restore_ddb " + module)
-        index = self.engine.expect([destapisuccess, destapiend, destapierror])
+        Raises: Warning, DESQueryTimeout'''
+        self._within('load', module, timeout, self._load, module)
+
+    def _load(self, module):
+        '''Private method running load() without a deadline.'''
+        self._sendline("/tapi /restore_ddb " + module)
+        self._loaded(module)
+
+    def _loaded(self, module):
+        '''Private method reading the answer of a load command already sent.'''
+        self._invalidate()
+        index = self._expect([destapisuccess, destapiend, destapierror])
         if index == 1:
             warnings.warn('Possible error while restoring DDB "' + module + '". Output from DES:\n' + str( self.engine.after ))
+        self._remember(module)
+
+    def loadfacts(self, facts, predicate=None, progress=None):
+        '''Adds many facts to the current database at once
+        Usage: instance.loadfacts( facts, predicate, progress )
+        facts - iterable of fact strings (example: 'likes( john, curry )') or,
+          if predicate is given, of tuples of Python values (example: ('john', 'curry'))
+        predicate - predicate name for tuple facts (default: None)
+        progress - callable receiving the number of facts written so far,
+          called every 10000 facts and once more after loading (default: None)
+
+        The facts are streamed into a temporary file which is added to the
+        database with /reconsult, keeping the rules already loaded.
+
+        Returns: number of facts loaded
+
+        Raises: DESCompileError'''
+        path, count = self._dump(self._facts(facts, predicate, progress), '.dl')
+        try:
+            self._sendline('/tapi /reconsult ' + path)
+            self._reconsulted()
+        finally:
+            os.remove(path)
+        if progress is not None:
+            progress(count)
+        return count
+
+    def _reconsulted(self):
+        '''Private method reading the answer of a /reconsult command already sent.'''
+        self._invalidate()
+        index = self._expect([destapisuccess, destapiend, destapierror])
+        if index == 2:
+            raise DESCompileError('Error while loading facts. Error from DES:\n' + str( self.engine.after ))
 
-    def query(self, query):
+    def query(self, query, timeout=None, decode=None, resultset=False, limit=None, offset=0):
         '''Queries current engine state
-        Usage: instance.query( query )
+        Usage: instance.query( query, timeout, decode, resultset, limit, offset )
         query - usual DES query (example: 'likes( X, Y )')
+        timeout - deadline in seconds (default: None, no deadline)
+        decode - True to turn all values into Python values with decode(), or
+          the names of the variables to decode (default: None, values are
+          the strings printed by DES without the quotes of quoted atoms)
+        resultset - return a ResultSet instead of a list of dictionaries
+          (default: False)
+        limit - maximum number of solutions (default: None, all)
+        offset - number of solutions to skip first (default: 0)
+          With a limit the query is sent as top( offset + limit, query ), so
+          DES computes no more tuples than needed; the first offset tuples
+          are dropped while reading.
 
         Returns:
           True - if yes/no query and answer is yes
@@ -591,53 +3332,264 @@ class des:
           >>> instance.query( 'likes( Person, Food )' )
           [{'Person': 'john', 'Food': 'curry'}, {'Person': 'sandy', 'Food': 'mushrooms'}]
 
+        Raises: DESQueryError, DESQueryTimeout'''
+        return self._within('query', query, timeout, self._cached, self._terminate(query), self._query, *self._options(decode, resultset, limit, offset))
+
+    def _run(self, item, columns=(), resultset=False, page=None):
+        '''Private method sending one _item() tuple and returning its query() result.
+        columns - variables whose values are kept as printed, for decoding'''
+        self._sendline(item[2])
+        return self._reply(item, columns, resultset, page)
+
+    def _reply(self, item, columns=(), resultset=False, page=None):
+        '''Private method reading the query() result of an _item() tuple already sent.'''
+        query, lvars, goal = item
+        return self._answer(lvars, query, columns, resultset, page)
+
+    def _prepare(self, prepared, helper):
+        '''Private method returning the goal layout of a prepared query (see _backend._prepare()).'''
+        return self._goal(prepared.lvars, ''), '.', False
+
+    def _goal(self, lvars, query, page=None):
+        '''Private method returning the line sent to DES for a query.
+        page - ( offset, limit ) of the tuples to return, None for all'''
+        if lvars == []:  # yes/no query (no variables)
+            return query
+        if page is not None and page[1] is not None and query[:1] != '/':
+            query = 'top(' + str(max(page[0] + page[1], 1)) + ',' + query[:-1] + ').'
+        return '/tapi ' + query
+
+    def _answer(self, lvars, query, columns=(), resultset=False, page=None):
+        '''Private method reading the answer of a query already sent.'''
+        if lvars == []:  # yes/no query (no variables)
+            error = []
+            answer = True
+            for line in self._lines(desprompt):
+                if error or re.search(deserror, line):
+                    error.append(line)
+                elif '0 tuples computed' in line:
+                    answer = False
+            if error:
+                self._raise(query, error)
+            return answer
+        else:  # normal query
+            if '/assert' in query: # assertion, if there's no error, it's fine
+                self._drain(self._solutions(lvars, query))
+                return True
+            rows = self._rows(lvars, query, columns)
+            if page is not None:
+                offset, limit = page
+                paged = list(itertools.islice(rows, offset, None if limit is None else offset + limit))
+                self._drain(rows)
+                rows = paged
+            if resultset:
+                return ResultSet(lvars, rows)
+            return [dict( zip( lvars, row ) ) for row in rows]
+
+    def _item(self, query, columns=(), page=None):
+        '''Private method returning the ( query, variables, goal ) tuple used by query_batch().'''
+        lvars = var_re.findall(query)
+        lvars = list( OrderedDict.fromkeys( lvars ) )
+        return query, lvars, self._goal(lvars, query, page)
+
+    def _write(self, items):
+        '''Private method writing a group of queries at once.'''
+        self._send(''.join(goal + '\n' for query, lvars, goal in items))
+
+    def _ends(self, items):
+        '''Private method returning the prompts that end the answers of a group of queries.'''
+        return [destapiprompt if lvars else desprompt for query, lvars, goal in items]
+
+    def _read(self, items):
+        '''Private method reading the answers of a group of queries sent by _write() in order.'''
+        results = []
+        for query, lvars, goal in items:
+            try:
+                results.append(self._answer(lvars, query))
+            except DESQueryError as e:
+                results.append(e)
+        return results
+
+    def iquery(self, query, decode=None):
+        '''Queries current engine state, yielding tuples as they arrive
+        Usage: for solution in instance.iquery( query, decode ): ...
+        query - usual DES query (example: 'likes( X, Y )')
+        decode - variables whose values are decoded (see query())
+
+        Yields: one dictionary per tuple, keys are variable names. A
+        yes/no query yields a single empty dictionary if the answer is yes.
+        Tuples are parsed one at a time from the TAPI output while DES is
+        still printing, so memory use does not grow with the answer size.
+
         Raises: DESQueryError'''
-        query = query.strip()
-        if query[-1] != '.':
-            query += '.'
+        query = self._terminate(query)
         lvars = var_re.findall(query)
         lvars = list( OrderedDict.fromkeys( lvars ) )
-        if lvars == []:  # yes/no query (no variables)
-            self.engine.sendline(query)
-            index = self.engine.expect([desprompt, deserror])
-            if index == 1:
-                raise DESQueryError('Error while executing query "' + query + '". Error from XSB:\n' + str( self.engine.after ))
-            else:
-                if '0 tuples computed' in str( self.engine.before ):
-                    return False
-                else:
-                    return True
-        else:  # normal query
-            self.engine.sendline('/tapi ' + query)
-            index = self.engine.expect([destapierror, destapiprompt])
-            if index == 0:
-                raise DESQueryError('Error while executing query "' + query + '". Error from DES:\n' + str( self.engine.after ))
-            else:
-                if '/assert' in query: # assertion, if there's no error, it's fine
-                    return True
-                state = str( self.engine.before )
-                state = state.split( '$eot' )
-                if 'Processing:' in state[ 0 ]:
-                    state = state[ 1 ]
-                else:
-                    state = state[ 0 ]
-                
-                state = state.split( '$\\r\\n' )
-                py2 = False
-                if len( state ) == 1:
-                    py2 = True
-                    state = state[ 0 ].split( '$\r\n' ) # Py2 hack
-                if py2:
-                    res = [ i.split( '\r\n' )[ :-1 ] for i in state[ 1: ] ]
+        if lvars == []:
+            if self.query(query):
+                yield {}
+            return
+        columns = self._columns(lvars, decode)
+        self._sendline('/tapi ' + query)
+        for solution in self._invalidating(query, self._solutions(lvars, query, columns)):
+            yield self._decode(solution, columns)
+
+    def _solutions(self, lvars, query, columns=()):
+        '''Private generator parsing the TAPI output of a query already sent.
+        Tuples are delimited by '$' lines and the answer ends with '$eot';
+        an answer preceded by a 'Processing:' block is skipped up to its
+        own '$eot'. Values of columns keep their quotes.'''
+        for row in self._rows(lvars, query, columns):
+            yield dict( zip( lvars, row ) )
+
+    def _rows(self, lvars, query, columns=()):
+        '''Private generator like _solutions(), yielding lists of values in order of lvars.'''
+        for kind, values in self._tapi(query, set(i for i, v in enumerate(lvars) if v in columns)):
+            if kind == '$':
+                yield values
+
+    def _tapi(self, query, raw=()):
+        '''Private generator parsing the TAPI answer of a query already sent.
+        Usage: for kind, data in instance._tapi( query, raw ): ...
+        raw - positions of the values that keep their quotes, True for all
+
+        Yields ( 'answer', schema line ) for the schema of the answer (for
+        example 'answer(X,Y)' or 'answer(t.a:string,t.b:int)') and
+        ( '$', list of values ) per tuple. Tuples are delimited by '$'
+        lines and the answer ends with '$eot'; an answer preceded by a
+        'Processing:' block is skipped up to its own '$eot'. The rest of
+        the answer is read when the generator is closed early.
+
+        Raises: DESQueryError once the answer is read, if DES reports '$error'.'''
+        lines = self._lines(destapiprompt)
+        error = []
+        temp = None
+        skip = False
+        try:
+            for line in lines:
+                if error or line == '$error':
+                    error.append(line)
+                    continue
+                if skip or 'Processing:' in line:
+                    skip = line != '$eot'
+                    continue
+                if line == '$' or line == '$eot':
+                    if temp is not None:
+                        yield '$', temp
+                    temp = [] if line == '$' else None
+                elif temp is not None:
+                    temp.append( line[ 1:-1 ] if line[ :1 ] == "'" and raw is not True and len( temp ) not in raw else line )
+                elif line.startswith('answer('):
+                    yield 'answer', line
+        finally:
+            self._drain(lines)
+        if error:
+            self._raise(query, error)
+
+    def cursor(self, query, typed=True, arraysize=1000):
+        '''Runs a Datalog, SQL or relational algebra query, streaming its answer
+        Usage: instance.cursor( query, typed, arraysize )
+        query - any query DES answers with a relation (example:
+          'select * from emp', 'project name (emp)' or 'likes( X, Y )');
+          SQL goes to the database opened with connect(), if any
+        typed - convert values by the column types of the answer: numbers to
+          int or float, strings without quotes, null to None and, for
+          Datalog answers without types, terms with decode() (default: True)
+        arraysize - default size of fetchmany() (default: 1000)
+
+        Returns: Cursor instance, example:
+          >>> with instance.cursor( 'select * from emp' ) as c:
+          ...     for row in c: ...
+
+        Raises: DESQueryError'''
+        self._release()
+        self._invalidate()
+        query = query.strip()
+        self._sendline('/tapi ' + query)
+        self._cursor = Cursor(self, query, typed, arraysize)
+        return self._cursor
+
+    def export(self, query, path, format='csv', timeout=None, typed=True):
+        '''Writes all tuples of the answer of a query into a file
+        Usage: instance.export( query, path, format, timeout, typed )
+        query - any query cursor() accepts (example: 'select * from emp')
+        path - file to write
+        format - 'csv' or 'tsv', see ExportReader (default: 'csv')
+        timeout - deadline in seconds (default: None, no deadline)
+        typed - passed to ExportReader (default: True)
+
+        DES writes the tuples into a file itself (/csv) while its display
+        output is switched off, so the answer never passes the terminal.
+        The engine has to run on the same machine. The header line holds
+        the variables of a Datalog query, or the columns of an SQL or
+        relational algebra query, which are read from the answer schema
+        of the query restricted to no tuples.
+
+        Returns: ExportReader over the file
+
+        Raises: ValueError, DESQueryError'''
+        if format not in ExportReader.separators:
+            raise ValueError('Unknown export format "' + str(format) + '", use "csv" or "tsv".')
+        self._within('query', query, timeout, self._export, query.strip(), path, ExportReader.separators[format])
+        return ExportReader(path, format, typed)
+
+    def _export(self, query, path, separator):
+        '''Private method running export() without a deadline.
+        The commands end with /test_tapi, whose answer tells that DES has
+        run all of them and closed the answer file.'''
+        names = self._names(query)
+        dump = path + '.des'
+        if os.path.exists(dump):
+            os.remove(dump)
+        try:
+            for command in ('/output off', '/csv ' + dump, query, '/csv off', '/output on', '/tapi /test_tapi'):
+                self._sendline(command)
+            self._expect([destapisuccess], self._wait())
+            error = re.search(deserror, self.engine.before.decode('utf-8', 'replace'))
+            if error:
+                raise DESQueryError('Error while executing query "' + query + '". Error from DES:\n' + error.group().strip())
+            if not os.path.exists(dump):
+                raise DESQueryError('Error while executing query "' + query + '". DES wrote no answer file.')
+            with open(path, 'w') as f, open(dump) as answer:
+                f.write(separator.join(names) + '\n')
+                if separator == ',':
+                    shutil.copyfileobj(answer, f)
                 else:
-                    res = [ i.split( '\\r\\n' )[ :-1 ] for i in state[ 1: ] ]
-                res = [ [ j[ 1:-1 ] for j in i ] for i in res ]
-                results = []
-                for i in res:
-                    results.append( dict( zip( lvars, i ) ) )
-                return results
+                    f.writelines(separator.join(row) + '\n' for row in csv.reader(answer))
+        finally:
+            if os.path.exists(dump):
+                os.remove(dump)
+
+    def _names(self, query):
+        '''Private method returning the column names of the answer of a query.'''
+        if sql_re.match(query):
+            probe = 'select * from (' + query + ') pyxf where 1=0'
+        elif ra_re.match(query):
+            probe = 'select 1=0 (' + query + ')'
+        else:  # Datalog
+            return self._variables(' ' + query)
+        with self.cursor(probe, typed=False) as c:
+            return [name for name, type in c.description]
+
+    def _release(self):
+        '''Private method closing the open cursor, if any, before the engine is used again.'''
+        if self._cursor is not None:
+            self._cursor.close()
+
+    def _sendline(self, line):
+        '''Private method writing a line, after the answer of an open cursor (see cursor()).'''
+        if self._cursor is not None:
+            self._release()
+        _backend._sendline(self, line)
+
+    def _send(self, data):
+        '''Private method writing data, after the answer of an open cursor (see cursor()).'''
+        if self._cursor is not None:
+            self._release()
+        _backend._send(self, data)
+
+
 
-                
 if __name__ == '__main__':
     x = xsb()
     x.load('test/logic/test_xsb')
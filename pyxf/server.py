@@ -0,0 +1,482 @@
+# -*- coding: utf-8 -*-
+__doc__ = ''' Engine server sharing warm pyxf engines between processes and hosts
+ by the pyxf contributors, 2026
+
+ An EngineServer owns an EnginePool of one backend and answers requests
+ on a Unix or TCP socket, so many worker processes can share a few
+ interpreters with their modules already loaded:
+
+   python -m pyxf.server --backend xsb --size 4 --module kb.P --unix /tmp/pyxf.sock
+
+ The client class has the methods of the backend classes and sends
+ them to the server:
+
+   from pyxf.server import client
+   engine = client( '/tmp/pyxf.sock' )
+   engine.query( 'likes( X, Y )' )
+
+ Wire protocol: every message is a 4 byte big endian length followed by
+ that many bytes of UTF-8 JSON. A request is [ id, method, args, kwargs ]
+ and its response [ id, true, result ] or [ id, false, [ exception class
+ name, message ] ]. Requests of one connection run concurrently on the
+ engines of the pool and are answered as they finish, each response
+ carrying the id of its request. A connection has at most maxinflight
+ requests running; the server stops reading from it until one of them
+ is answered, which pushes back on the client through the socket.
+
+ Security: the server runs every goal a client sends, and a goal can
+ read and write files and start programs with the rights of the server.
+ There is no authentication. Use a Unix socket whose directory only
+ trusted users can reach, or TCP on a loopback address (the default).
+ EngineServer refuses other TCP addresses unless public=True (--public)
+ is given, in which case the network has to be protected otherwise.
+
+ This library is free software; you can redistribute it and/or
+ modify it under the terms of the GNU Lesser General Public
+ License as published by the Free Software Foundation; either
+ version 2.1 of the License, or (at your option) any later version.'''
+
+import argparse
+import builtins
+import ipaddress
+import itertools
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pyxf.pool as pools
+import pyxf.pyxf as backends
+from pyxf.pool import EnginePool, EnginePoolBroadcastError
+from pyxf.pyxf import ResultSet, Term
+
+header = struct.Struct('>I')
+
+
+class EngineServerError(Exception):
+    '''Exception raised if the connection to the server fails or the server reports an unknown error.'''
+    pass
+
+
+def _pack(value):
+    '''Private function turning a result into JSON values, see _unpack().'''
+    if isinstance(value, Exception):  # query_batch() entry
+        return {'$error': [type(value).__name__, str(value)]}
+    if isinstance(value, Term):
+        return {'$term': [value.name, [_pack(a) for a in value.args]]}
+    if isinstance(value, ResultSet):
+        return {'$resultset': [list(value.names), [[_pack(v) for v in c] for c in value.columns]]}
+    if isinstance(value, (list, tuple)):
+        return [_pack(v) for v in value]
+    if isinstance(value, dict):
+        return dict((k, _pack(v)) for k, v in value.items())
+    return value
+
+
+def _unpack(value):
+    '''Private function turning JSON values back into a result.'''
+    if isinstance(value, list):
+        return [_unpack(v) for v in value]
+    if isinstance(value, dict):
+        if '$term' in value:
+            name, args = value['$term']
+            return Term(name, [_unpack(a) for a in args])
+        if '$error' in value:
+            return _exception(*value['$error'])
+        if '$resultset' in value:
+            names, columns = value['$resultset']
+            return ResultSet(names, columns=[_unpack(c) for c in columns])
+        return dict((k, _unpack(v)) for k, v in value.items())
+    return value
+
+
+def _exception(name, message, results=None):
+    '''Private function rebuilding an exception raised on the server from its class name and message.
+    results - packed results of every engine of a failed broadcast, see EnginePoolBroadcastError'''
+    if results is not None:
+        return EnginePoolBroadcastError(message, _unpack(results))
+    for namespace in (backends, pools, sys.modules[__name__], builtins):
+        cls = getattr(namespace, name, None)
+        if isinstance(cls, type) and issubclass(cls, Exception):
+            return cls(message)
+    return EngineServerError(name + ': ' + message)
+
+
+def send(sock, message):
+    '''Writes one message to a socket
+    Usage: send( sock, message )'''
+    data = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    sock.sendall(header.pack(len(data)) + data)
+
+
+def receive(sock):
+    '''Reads one message from a socket
+    Usage: receive( sock )
+
+    Returns: the message, None if the socket was closed between messages
+
+    Raises: EngineServerError if it was closed within a message'''
+    data = _read(sock, header.size)
+    if data is None:
+        return None
+    data = _read(sock, header.unpack(data)[0])
+    if data is None:
+        raise EngineServerError('Connection closed within a message.')
+    return json.loads(data.decode('utf-8'))
+
+
+def _read(sock, size):
+    '''Private function reading exactly size bytes, None at the end of the stream.'''
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            if chunks:
+                raise EngineServerError('Connection closed within a message.')
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _loopback(host):
+    '''Private function telling whether a host name only resolves to loopback addresses.'''
+    try:
+        addresses = [info[4][0] for info in socket.getaddrinfo(host, None)]
+    except (socket.gaierror, UnicodeError):
+        return False
+    return bool(addresses) and all(ipaddress.ip_address(a.split('%')[0]).is_loopback for a in addresses)
+
+
+def _socket(address):
+    '''Private function creating the socket for an address, a path (Unix) or a ( host, port ) tuple (TCP).'''
+    if isinstance(address, str):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    return socket.socket(socket.AF_INET6 if ':' in address[0] else socket.AF_INET, socket.SOCK_STREAM)
+
+
+class EngineServer:
+    '''Server answering the requests of clients with a pool of engines'''
+    maxinflight = 32  # requests of one connection running at once
+    methods = ('load', 'query', 'query_one', 'query_batch', 'addfacts', 'loadfacts', 'command', 'update')
+
+    def __init__(self, backend, address, size=None, modules=(), *args, public=False, **kwargs):
+        '''Constructor method
+        Usage: EngineServer( backend, address, size, modules, *args, public=False, **kwargs )
+        backend - backend class (example: xsb, swipl, eclipse, flora2, des)
+        address - path of a Unix socket or ( host, port ) of a TCP socket
+          (example: ( '127.0.0.1', 7000 ), port 0 picks a free port)
+        size, modules, args, kwargs - passed to EnginePool
+        public - allow a TCP address that is not a loopback address
+          (default: False)
+
+        Clients can run any goal, with the rights of the server process,
+        and are not authenticated. Other hosts can only connect if public
+        is True, see the security note of this module.
+
+        Starts the engines and listens on the address, call serve_forever()
+        to answer requests. self.address is the address listened on.
+
+        Requests run as follows:
+          query, query_one, query_batch - on one idle engine
+          load - on every engine, and on engines started later
+          addfacts, loadfacts, command, update - on every engine, command
+            only on backends with a command() (des), update runs a query
+            changing the engine state (example: 'assertz( p( 1 ) )')
+        If a request for every engine fails on some of them only, the
+        client gets an EnginePoolBroadcastError with the result or error
+        of every engine, and all engines are restarted with the modules of
+        the pool, so they never answer from different states.
+
+        Raises: EngineServerError for a TCP address that is not a loopback
+          address without public'''
+        if not isinstance(address, str) and not public and not _loopback(address[0]):
+            raise EngineServerError('Refusing to listen on "' + str(address[0]) + '", which is not a loopback address. '
+                                    'Clients can run any goal without authentication, pass public=True (--public) to allow it.')
+        self.address = address
+        self.pool = EnginePool(backend, size, modules, *args, **kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=self.pool.size)
+        self._closed = False
+        self._connections = set()
+        self._lock = threading.Lock()  # guards self._connections
+        if isinstance(address, str) and os.path.exists(address):
+            os.remove(address)
+        self._socket = _socket(address)
+        if not isinstance(address, str):
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(address)
+        self._socket.listen(128)
+        if not isinstance(address, str):
+            self.address = self._socket.getsockname()[:2]
+
+    def serve_forever(self):
+        '''Accepts connections until close() is called
+        Usage: instance.serve_forever()'''
+        while not self._closed:
+            try:
+                conn, peer = self._socket.accept()
+            except OSError:
+                break
+            with self._lock:
+                self._connections.add(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def start(self):
+        '''Runs serve_forever() in a background thread
+        Usage: instance.start()
+
+        Returns: the thread'''
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def _serve(self, conn):
+        '''Private method reading the requests of one connection and answering them as they finish.'''
+        lock = threading.Lock()
+        slots = threading.BoundedSemaphore(self.maxinflight)
+        try:
+            while True:
+                request = receive(conn)
+                if request is None:
+                    break
+                slots.acquire()
+                try:
+                    self._executor.submit(self._answer, conn, lock, slots, request)
+                except RuntimeError:  # closed meanwhile
+                    slots.release()
+                    break
+        except (OSError, EngineServerError, ValueError):
+            pass
+        finally:
+            for i in range(self.maxinflight):  # wait for the running requests
+                slots.acquire()
+            with self._lock:
+                self._connections.discard(conn)
+            conn.close()
+
+    def _answer(self, conn, lock, slots, request):
+        '''Private method running one request and sending its response.'''
+        try:
+            id, method, args, kwargs = request
+            try:
+                response = [id, True, _pack(self._call(method, args, kwargs))]
+            except EnginePoolBroadcastError as e:
+                response = [id, False, [type(e).__name__, str(e), _pack(e.results)]]
+            except Exception as e:
+                response = [id, False, [type(e).__name__, str(e)]]
+            with lock:
+                send(conn, response)
+        except (OSError, ValueError, TypeError):
+            pass
+        finally:
+            slots.release()
+
+    def _call(self, method, args, kwargs):
+        '''Private method running a request on the pool.'''
+        if method not in self.methods:
+            raise EngineServerError('Unknown method "' + str(method) + '".')
+        if method == 'load':
+            return self.pool.load(*args, **kwargs)
+        if method == 'command':
+            if not hasattr(self.pool.backend, 'command'):
+                raise EngineServerError('Backend ' + self.pool.backend.__name__ + ' has no command().')
+            return self.pool.broadcast('command', *args, **kwargs)[0]
+        if method == 'update':
+            return self.pool.broadcast('query', *args, **kwargs)[0]
+        if method in ('addfacts', 'loadfacts'):
+            if method == 'addfacts' and not hasattr(self.pool.backend, 'addfacts'):
+                method = 'loadfacts'
+            return self.pool.broadcast(method, *args, **kwargs)[0]
+        with self.pool.engine() as e:
+            return getattr(e, method)(*args, **kwargs)
+
+    def close(self):
+        '''Stops accepting connections, ends the open ones and terminates the engines
+        Usage: instance.close()'''
+        self._closed = True
+        try:
+            self._socket.close()
+        except OSError:
+            pass
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:  # their clients fail instead of waiting for answers
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+        self._executor.shutdown(wait=False)
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class client:
+    '''Python interface to an EngineServer, with the methods of the backend classes'''
+    def __init__(self, address):
+        '''Constructor method
+        Usage: client( address )
+        address - path of the Unix socket or ( host, port ) of the TCP socket of the server
+
+        One client may be used by many threads at once, their requests
+        share the connection and run concurrently on the server.
+
+        Raises: EngineServerError'''
+        try:
+            self._socket = _socket(address)
+            self._socket.connect(address)
+        except OSError as e:
+            raise EngineServerError('Cannot connect to pyxf server at ' + str(address) + ': ' + str(e))
+        self._ids = itertools.count()
+        self._pending = {}  # request id -> Future
+        self._lock = threading.Lock()  # guards self._pending and self._closed
+        self._sending = threading.Lock()  # keeps the requests of several threads apart on the socket
+        self._closed = False
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        '''Private method reading responses and completing the futures of their requests.'''
+        error = EngineServerError('Connection to the pyxf server closed.')
+        try:
+            while True:
+                response = receive(self._socket)
+                if response is None:
+                    break
+                id, ok, result = response
+                with self._lock:
+                    future = self._pending.pop(id, None)
+                if future is None:
+                    continue
+                if ok:
+                    future.set_result(_unpack(result))
+                else:
+                    future.set_exception(_exception(*result))
+        except (OSError, EngineServerError, ValueError) as e:
+            error = EngineServerError('Connection to the pyxf server failed: ' + str(e))
+        with self._lock:
+            self._closed = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(error)
+
+    def _call(self, method, *args, **kwargs):
+        '''Private method sending a request and waiting for its result.'''
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise EngineServerError('Connection to the pyxf server closed.')
+            id = next(self._ids)
+            self._pending[id] = future
+        try:
+            with self._sending:  # not under self._lock, the reader has to drain responses meanwhile
+                send(self._socket, [id, method, _pack(args), kwargs])
+        except Exception:
+            with self._lock:
+                self._pending.pop(id, None)
+            raise
+        return future.result()
+
+    def load(self, module, timeout=None):
+        '''Loads a module into all engines of the server, see the load() of the backend.'''
+        return self._call('load', module, timeout=timeout)
+
+    def query(self, query, timeout=None, decode=None, resultset=False, limit=None, offset=0):
+        '''Queries one engine of the server, see the query() of the backend.'''
+        return self._call('query', query, timeout=timeout, decode=decode, resultset=resultset, limit=limit, offset=offset)
+
+    def query_one(self, query, timeout=None, decode=None):
+        '''Returns the first solution of a query, see the query_one() of the backend.'''
+        return self._call('query_one', query, timeout=timeout, decode=decode)
+
+    def query_batch(self, queries):
+        '''Runs many queries on one engine of the server, see the query_batch() of the backend.
+
+        Errors of single queries are returned as exceptions rebuilt from
+        their class name and message.'''
+        return self._call('query_batch', list(queries))
+
+    def addfacts(self, facts):
+        '''Adds facts to all engines of the server, with loadfacts() on backends without addfacts().'''
+        return self._call('addfacts', list(facts))
+
+    def loadfacts(self, facts, predicate=None):
+        '''Adds many facts to all engines of the server, see the loadfacts() of the backend.'''
+        return self._call('loadfacts', list(facts), predicate)
+
+    def command(self, cmd, args=''):
+        '''Issues a command on all engines of the server, see the command() of the backend (des only).'''
+        return self._call('command', cmd, args)
+
+    def update(self, query, timeout=None):
+        '''Runs a query changing the engine state on all engines of the server (example: 'assertz( p( 1 ) )').'''
+        return self._call('update', query, timeout=timeout)
+
+    def close(self):
+        '''Closes the connection to the server
+        Usage: instance.close()'''
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    '''Command line entry point, see python -m pyxf.server --help'''
+    parser = argparse.ArgumentParser(prog='python -m pyxf.server', description='Serve a pool of warm pyxf engines on a socket.')
+    parser.add_argument('--backend', default='xsb', choices=['xsb', 'swipl', 'eclipse', 'eclipsepeer', 'flora2', 'des'], help='engine to run (default: xsb)')
+    parser.add_argument('--path', help='path of the engine executable')
+    parser.add_argument('--args', help='command line arguments of the engine')
+    parser.add_argument('--transport', choices=['pty', 'pipe'], help='connection to the engines (default: pipe for eclipsepeer, pty otherwise)')
+    parser.add_argument('--size', type=int, help='number of engines (default: number of CPU cores)')
+    parser.add_argument('--module', action='append', default=[], help='module every engine loads, may be repeated')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--unix', help='path of the Unix socket to listen on')
+    group.add_argument('--tcp', help='host:port to listen on (host default: 127.0.0.1)')
+    parser.add_argument('--public', action='store_true', help='allow a TCP host that is not a loopback address; clients can run any goal without authentication')
+    options = parser.parse_args(argv)
+    if options.backend == 'eclipsepeer' and options.transport == 'pty':
+        parser.error('eclipsepeer needs --transport pipe')
+    if options.backend in ('flora2', 'des') and options.transport == 'pipe':
+        parser.error(options.backend + ' needs --transport pty')
+    kwargs = {'transport': options.transport or ('pipe' if options.backend == 'eclipsepeer' else 'pty')}
+    if options.path:
+        kwargs['path'] = options.path
+    if options.args is not None:
+        kwargs['args'] = options.args
+    if options.unix:
+        address = options.unix
+    else:
+        host, sep, port = options.tcp.rpartition(':')
+        address = (host.strip('[]') or '127.0.0.1', int(port))
+    try:
+        server = EngineServer(getattr(backends, options.backend), address, options.size, options.module, public=options.public, **kwargs)
+    except EngineServerError as e:
+        parser.error(str(e))
+    sys.stderr.write('pyxf server: ' + str(server.pool.size) + ' ' + options.backend + ' engines on ' + str(server.address) + '\n')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 #!/usr/bin/env python
 
-from distutils.core import setup
+from setuptools import setup
 from pyxf.pyxf import __version__
 
 setup(name='PyXF',
@@ -9,5 +9,5 @@ setup(name='PyXF',
       author='Markus Schatten',
       author_email='markus.schatten@foi.hr',
       url='https://github.com/AILab-FOI/pyxf',
-      packages=['pyxf'],
+      packages=['pyxf', 'pyxf.bench'],
      )
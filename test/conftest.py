@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from pyxf import pyxf
+from pyxf.bench import fake
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LOGIC = os.path.join(HERE, 'logic')
+
+backends = {'xsb': pyxf.xsb, 'swipl': pyxf.swipl, 'eclipse': pyxf.eclipse, 'eclipsepeer': pyxf.eclipsepeer}
+modules = {'xsb': 'test_xsb.P', 'swipl': 'test_swi.pl', 'eclipse': 'test_eclipse.ecl', 'eclipsepeer': 'test_eclipse.ecl'}
+stand_ins = {'eclipsepeer': 'eclipse'}  # dialect of the stand-in engine, if not the backend name
+# eclipsepeer needs pipes
+dialects = [(dialect, transport) for dialect in sorted(backends) for transport in ('pty', 'pipe') if (dialect, transport) != ('eclipsepeer', 'pty')]
+
+
+def spawn(dialect, transport='pty', *options):
+    '''Starts a Prolog backend on the stand-in engine of pyxf.bench.fake.'''
+    return backends[dialect](*fake.command(stand_ins.get(dialect, dialect), *options), transport=transport)
+
+
+def module(dialect):
+    '''Returns the path of the test module of a dialect in test/logic.'''
+    return os.path.join(LOGIC, modules[dialect])
+
+
+@pytest.fixture(params=dialects, ids=['-'.join(p) for p in dialects])
+def engine(request):
+    '''Prolog backend on the stand-in engine with the test module loaded, per dialect and transport.'''
+    e = spawn(*request.param)
+    e.load(module(request.param[0]))
+    yield e
+    e.close()
+
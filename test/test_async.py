@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from conftest import module
+from pyxf.bench import fake
+from pyxf.pyxf import aspawn, flora2, xsb, XSBQueryTimeout
+
+
+def test_aquery(engine):
+    assert asyncio.run(engine.aquery('likes( X, curry )')) == [{'X': 'john'}]
+    assert asyncio.run(engine.aquery('likes( john, curry )')) is True
+    assert asyncio.run(engine.aquery('member( X, [1, 2, 3] )', decode=True, limit=1, offset=1)) == [{'X': 2}]
+
+
+def test_aquery_batch(engine):
+    results = asyncio.run(engine.aquery_batch(['likes( X, curry )', 'throw( oops )', 'likes( nobody, X )']))
+    assert results[0] == [{'X': 'john'}]
+    assert isinstance(results[1], engine.QueryError)
+    assert results[2] is False
+
+
+def test_aloadfacts(engine):
+    assert asyncio.run(engine.aloadfacts([('a', 1), ('b', 2)], 'pair')) == 2
+    assert asyncio.run(engine.aquery('pair( X, 2 )')) == [{'X': 'b'}]
+
+
+def test_coroutines_share_an_engine(engine):
+    async def both():
+        return await asyncio.gather(*[engine.aquery('between( 1, %d, X )' % n) for n in range(1, 30)])
+    answers = asyncio.run(both())
+    assert [len(a) for a in answers] == list(range(1, 30))
+
+
+@pytest.mark.parametrize('transport', ['pty', 'pipe'])
+def test_aspawn(transport):
+    async def session():
+        async with aspawn(xsb, *fake.command('xsb'), transport=transport) as engine:
+            await engine.aload(module('xsb'))
+            return await engine.aquery('likes( sandy, X )')
+    assert asyncio.run(session()) == [{'X': 'mushrooms'}]
+
+
+def test_deadline():
+    async def session():
+        engine = await aspawn(xsb, *fake.command('xsb'))
+        try:
+            with pytest.raises(XSBQueryTimeout):
+                await engine.aquery('sleep( 10 )', timeout=0.5)
+            return await engine.aquery('member( X, [1] )')
+        finally:
+            await engine.aclose()
+    assert asyncio.run(session()) == [{'X': '1'}]
+
+
+def test_no_deadline():
+    async def session():
+        engine = await aspawn(xsb, *fake.command('xsb'))
+        try:
+            await engine.aload(module('xsb'))
+            assert await engine.aquery('sleep( 7 ), X = 1') == [{'X': '1'}]
+            return await engine.aquery('likes( X, curry )')
+        finally:
+            await engine.aclose()
+    assert asyncio.run(session()) == [{'X': 'john'}]
+
+
+def test_flora2_aloadfacts():
+    async def session():
+        engine = await aspawn(flora2, *fake.command('flora2'))
+        try:
+            engine.batchsize = 20  # one insert{} command per fact
+            batches = []
+            aquery_batch = engine.aquery_batch
+
+            async def pipelined(commands):
+                batches.append(len(commands))
+                return await aquery_batch(commands)
+            engine.aquery_batch = pipelined
+            count = await engine.aloadfacts([('p' + str(n), 'tea') for n in range(200)], 'drinks')
+            assert await engine.aloadfacts([], 'drinks') == 0
+            return count, batches, await engine.aquery('drinks( ?x, tea )')
+        finally:
+            await engine.aclose()
+    count, batches, answer = asyncio.run(session())
+    assert count == 200 and len(answer) == 200
+    # pipelined in batches of 64 commands, as loadfacts() does
+    assert batches == [64, 64, 64, 8, 0]
@@ -0,0 +1,44 @@
+def test_query_batch(engine):
+    queries = ['likes( X, curry )', 'likes( john, curry )', 'likes( X, Y )', 'likes( nobody, X )', 'likes( john, mushrooms )']
+    assert engine.query_batch(queries) == [
+        [{'X': 'john'}],
+        True,
+        [{'X': 'john', 'Y': 'curry'}, {'X': 'sandy', 'Y': 'mushrooms'}],
+        False,
+        False,
+    ]
+
+
+def test_goal_variables_are_not_shared(engine):
+    # every goal of the conjunction has variables of its own, although they have the same names
+    assert engine.query_batch(['likes( john, X )', 'likes( sandy, X )', 'member( X, [a, b] )']) == [
+        [{'X': 'curry'}], [{'X': 'mushrooms'}], [{'X': 'a'}, {'X': 'b'}]]
+
+
+def test_errors_stay_in_their_entry(engine):
+    results = engine.query_batch(['throw( first )', 'likes( X, curry )', 'undefined( X )', 'throw( second )', 'likes( sandy, X )'])
+    assert isinstance(results[0], engine.QueryError) and 'first' in str(results[0])
+    assert results[1] == [{'X': 'john'}]
+    assert isinstance(results[2], engine.QueryError) and 'undefined' in str(results[2])
+    assert isinstance(results[3], engine.QueryError) and 'second' in str(results[3])
+    assert 'first' not in str(results[3])
+    assert results[4] == [{'X': 'mushrooms'}]
+
+
+def test_syntax_error_rejects_only_its_query(engine):
+    results = engine.query_batch(['likes( X, curry )', 'likes( X, ', 'likes( sandy, X )'])
+    assert results[0] == [{'X': 'john'}]
+    assert isinstance(results[1], engine.QueryError)
+    assert results[2] == [{'X': 'mushrooms'}]
+
+
+def test_several_batches(engine):
+    engine.batchsize = 512  # a few goals per line
+    queries = ['between( 1, %d, X )' % i for i in range(1, 41)]
+    results = engine.query_batch(queries)
+    assert [len(r) for r in results] == list(range(1, 41))
+    assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+
+
+def test_empty_batch(engine):
+    assert engine.query_batch([]) == []
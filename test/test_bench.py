@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from pyxf.bench.kb import KnowledgeBase
+from pyxf.bench.run import Benchmark, backends, ptyonly, scenarios, compare, main
+
+runs = [(backend, transport) for backend in backends for transport in ('pty', 'pipe') if transport == 'pty' or backend not in ptyonly]
+
+
+@pytest.mark.parametrize('backend,transport', runs, ids=['-'.join(r) for r in runs])
+def test_run(backend, transport):
+    kb = KnowledgeBase(facts=40, solutions=4, width=3, rules=2)
+    results = Benchmark(backend, transport=transport, kb=kb, repeat=1, batch=5).run()
+    assert [r['scenario'] for r in results] == list(scenarios)
+    rows = dict((r['scenario'], r['rows']) for r in results)
+    assert rows == {'startup': None, 'load': None, 'yesno': 1, 'solutions': 4, 'wide': 4, 'large': 40, 'rule': 4, 'batch': 20, 'insert': 40}
+    assert all(r['seconds']['min'] >= 0 for r in results)
+
+
+def test_main(tmp_path):
+    output = str(tmp_path / 'results.json')
+    argv = ['--backend', 'xsb', '--transport', 'pipe', '--facts', '20', '--repeat', '1', '--scenario', 'yesno', '--scenario', 'large']
+    main(argv + ['--output', output])
+    with open(output) as f:
+        results = json.load(f)['results']
+    assert [(r['scenario'], r['backend'], r['transport'], r['rows']) for r in results] == [('yesno', 'xsb', 'pipe', 1), ('large', 'xsb', 'pipe', 20)]
+    main(argv + ['--output', str(tmp_path / 'again.json'), '--compare', output])
+    assert [row[:3] for row in compare(output, results)] == [('yesno', 'xsb', 'pipe'), ('large', 'xsb', 'pipe')]
@@ -0,0 +1,54 @@
+import pytest
+
+from pyxf.pyxf import QueryCache, update_re
+
+updates = ['assertz( p( 1 ) )', 'retract( p( X ) )', 'retractall( p( _ ) )', 'abolish_all_tables', "consult( 'a.P' )",
+           "['a.P']", "use_module( library( lists ) )", 'recordz( k, v )', 'recorda( k, v, R )', 'erase( R )',
+           'nb_setval( k, 1 )', 'b_setval( k, 1 )', 'setval( k, 1 )', 'incval( k )', 'decval( k )', 'conset( k, 1 )',
+           'flag( k, N, N + 1 )', 'set_prolog_flag( double_quotes, codes )', 'member( X, [1] ), assert( p( X ) )']
+reads = ['likes( X, Y )', 'recorded( k, V )', 'nb_getval( k, V )', 'getval( k, V )', 'conget( k, V )',
+         'current_prolog_flag( bounded, V )', 'inserted( X )', 'my_flag( X )', 'setvalue( X )']
+
+
+@pytest.mark.parametrize('query', updates)
+def test_updates(query):
+    assert update_re.search(query)
+
+
+@pytest.mark.parametrize('query', reads)
+def test_reads(query):
+    assert not update_re.search(query)
+
+
+def test_results_are_cached(engine):
+    engine.cache = QueryCache(16)
+    assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+    result = engine.query('likes(X,curry)')
+    assert result == [{'X': 'john'}]
+    assert engine.cache.hits == 1
+    result[0]['X'] = 'changed'  # results are copies
+    assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+
+
+@pytest.mark.parametrize('update, read', [
+    ('assertz( likes( ann, curry ) )', 'likes( X, curry )'),
+    ('conset( count, 7 )', 'conget( count, X )'),
+    ('setval( count, 7 )', 'getval( count, X )'),
+    ('nb_setval( count, 7 )', 'nb_getval( count, X )'),
+])
+def test_updates_invalidate(engine, update, read):
+    engine.cache = QueryCache(16)
+    engine.query_batch(['conset( count, 1 )', 'setval( count, 1 )', 'nb_setval( count, 1 )'])
+    before = engine.query(read)
+    assert engine.query(read) == before
+    assert engine.query(update) is True
+    assert engine.cache.invalidations >= 1
+    assert engine.query(read) != before
+
+
+def test_batch_updates_invalidate(engine):
+    engine.cache = QueryCache(16)
+    engine.query('nb_setval( count, 1 )')
+    assert engine.query('nb_getval( count, X )') == [{'X': '1'}]
+    assert engine.query_batch(['likes( X, curry )', 'nb_setval( count, 2 )']) == [[{'X': 'john'}], True]
+    assert engine.query('nb_getval( count, X )') == [{'X': '2'}]
@@ -0,0 +1,118 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import spawn, module
+from pyxf.bench import fake
+from pyxf.pyxf import ModuleCache, swipl
+
+objexts = {'xsb': '.xwam', 'swipl': '.qlf', 'eclipse': '.eco'}
+sources = {'xsb': 'kb.P', 'swipl': 'kb.pl', 'eclipse': 'kb.ecl'}
+compiled = [(dialect, transport) for dialect in sorted(objexts) for transport in ('pty', 'pipe')]
+
+
+@pytest.fixture(params=compiled, ids=['-'.join(c) for c in compiled])
+def setup(request, tmp_path):
+    '''Yields a function starting engines that load modules through a ModuleCache, the cache, a module source and the extension of compiled modules.'''
+    dialect, transport = request.param
+    source = tmp_path / 'src' / sources[dialect]
+    source.parent.mkdir()
+    shutil.copyfile(module(dialect), str(source))
+    cache = ModuleCache(str(tmp_path / 'cache'))
+    engines = []
+
+    def start():
+        engines.append(spawn(dialect, transport))
+        engines[-1].compiled = cache
+        return engines[-1]
+    yield start, cache, str(source), objexts[dialect]
+    for e in engines:
+        e.close()
+
+
+def test_miss_then_hit(setup):
+    start, cache, source, objext = setup
+    engine = start()
+    engine.load(source)
+    assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+    files = os.listdir(cache.directory)
+    assert len(files) == 1 and files[0].endswith(objext)
+    # the engine compiled a copy, nothing is written next to the source
+    assert os.listdir(os.path.dirname(source)) == [os.path.basename(source)]
+    path = os.path.join(cache.directory, files[0])
+    with open(path, 'a') as f:  # the object file of the stand-in is source text
+        f.write('\ncached( yes ).\n')
+    stat = os.stat(path)
+    engine = start()
+    engine.load(source)
+    assert engine.query('cached( yes )') is True
+    assert engine.query('likes( sandy, X )') == [{'X': 'mushrooms'}]
+    assert os.listdir(cache.directory) == files and os.stat(path).st_mtime == stat.st_mtime
+    assert engine.modules == (source,)
+
+
+def test_source_changes(setup):
+    start, cache, source, objext = setup
+    start().load(source)
+    old = os.listdir(cache.directory)
+    stat = os.stat(source)
+    os.utime(source, (stat.st_atime, stat.st_mtime + 10))
+    start().load(source)
+    assert os.listdir(cache.directory) == old  # same content, same compiled module
+    with open(source, 'a') as f:
+        f.write('\nlikes( ann, tea ).\n')
+    os.utime(source, (stat.st_atime, stat.st_mtime + 20))
+    engine = start()
+    engine.load(source)
+    new = os.listdir(cache.directory)
+    assert len(new) == 1 and new != old  # the older version is removed
+    assert engine.query('likes( ann, X )') == [{'X': 'tea'}]
+
+
+def test_missing_module(setup):
+    start, cache, source, objext = setup
+    engine = start()
+    with pytest.raises(Exception) as e:
+        engine.load(source + '.missing')
+    assert 'CompileError' in type(e.value).__name__
+    assert os.listdir(cache.directory) == []
+    assert engine.query('member( X, [1] )') == [{'X': '1'}]
+
+
+def test_cache_paths(tmp_path):
+    cache = ModuleCache(str(tmp_path / 'cache'))
+    source = tmp_path / 'kb.P'
+    source.write_text('p( 1 ).\n')
+    path = cache.path(str(source), '.xwam')
+    assert path.startswith(cache.directory) and path.endswith('.xwam')
+    assert cache.path(str(source), '.xwam') == path
+    assert cache.path(str(tmp_path / '..' / tmp_path.name / 'kb.P'), '.xwam') == path
+    other = tmp_path / 'other.P'
+    other.write_text('p( 1 ).\n')
+    assert cache.path(str(other), '.xwam') != path  # named after the path as well
+    compiled = tmp_path / 'kb.xwam'
+    compiled.write_text('object')
+    cache.store(str(compiled), path)
+    assert os.listdir(cache.directory) == [os.path.basename(path)] and not compiled.exists()
+    cache.clear()
+    assert os.listdir(cache.directory) == []
+
+
+@pytest.mark.parametrize('transport', ['pty', 'pipe'])
+def test_saved_state(tmp_path, transport):
+    state = str(tmp_path / 'kb.state')
+    engine = spawn('swipl', transport)
+    try:
+        engine.load(module('swipl'))
+        engine.query('assertz( drinks( ann, tea ) ), assertz(( thirsty( X ) :- drinks( X, _ ) ))')
+        engine.save(state)
+    finally:
+        engine.close()
+    engine = swipl(*fake.command('swipl'), state=state, transport=transport)
+    try:
+        assert engine.modules == ()
+        assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+        assert engine.query('thirsty( X )') == [{'X': 'ann'}]
+    finally:
+        engine.close()
@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+from conftest import LOGIC
+from pyxf.bench import fake
+from pyxf.pyxf import des, Cursor, DESQueryError, Term
+
+EMP = ''':- type( emp( name:string, age:int, salary:float ) ).
+emp( ann, 41, 3200.5 ).
+emp( 'o''brien', 35, null ).
+emp( '42', 29, 2800.0 ).
+'''
+
+
+@pytest.fixture
+def engine(tmp_path):
+    '''des backend on the stand-in engine with the test module and a typed relation emp loaded.'''
+    e = des(*fake.command('des'))
+    kb = tmp_path / 'kb.pl'
+    with open(os.path.join(LOGIC, 'test_des.pl')) as f:
+        kb.write_text(f.read() + EMP)
+    e.load(str(kb))
+    yield e
+    e.close()
+
+
+def test_description(engine):
+    with engine.cursor('likes( X, Y )') as c:
+        assert c.description == [('X', None), ('Y', None)]
+    with engine.cursor('select * from emp') as c:
+        assert c.description == [('emp.name', 'string(varchar)'), ('emp.age', 'number(integer)'), ('emp.salary', 'number(float)')]
+    with engine.cursor('likes( nobody, X )') as c:
+        assert c.description == [('X', None)] and c.fetchall() == []
+
+
+def test_fetch(engine):
+    with engine.cursor('between( 1, 10, X )', arraysize=4) as c:
+        assert isinstance(c, Cursor)
+        assert c.fetchone() == (1,)
+        assert c.fetchmany(2) == [(2,), (3,)]
+        assert c.fetchmany() == [(4,), (5,), (6,), (7,)]
+        assert c.rowcount == 7
+        assert c.fetchall() == [(8,), (9,), (10,)]
+        assert c.fetchone() is None and c.fetchmany() == [] and c.fetchall() == []
+        assert c.rowcount == 10
+
+
+def test_iteration(engine):
+    c = engine.cursor('likes( X, Y )')
+    assert list(c) == [('john', 'curry'), ('sandy', 'mushrooms')]
+    c = engine.cursor('likes( X, Y )')
+    assert next(c) == ('john', 'curry')
+    c.close()
+    assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+
+
+def test_typed(engine):
+    with engine.cursor('select * from emp') as c:
+        assert c.fetchall() == [('ann', 41, 3200.5), ("o'brien", 35, None), ('42', 29, 2800.0)]
+    with engine.cursor("X = f( 1, [x] ) ; X = 2.5 ; X = 'a b'") as c:
+        assert c.fetchall() == [(Term('f', (1, ['x'])),), (2.5,), ('a b',)]
+
+
+def test_untyped(engine):
+    with engine.cursor('select * from emp', typed=False) as c:
+        assert c.fetchone() == ("'ann'", '41', '3200.5')
+    with engine.cursor("X = f( 1, [x] ) ; X = 'a b'", typed=False) as c:
+        assert c.fetchall() == [('f(1,[x])',), ("'a b'",)]
+
+
+def test_errors(engine):
+    with pytest.raises(DESQueryError) as e:
+        engine.cursor('undefined( X )')
+    assert 'undefined' in str(e.value)
+    with pytest.raises(DESQueryError) as e:
+        engine.cursor('select * from nothing')
+    assert 'nothing' in str(e.value)
+    # the error framing is read up to the prompt
+    assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+    with engine.cursor('likes( sandy, X )') as c:
+        assert c.fetchall() == [('mushrooms',)]
+
+
+def test_released_by_other_commands(engine):
+    c = engine.cursor('between( 1, 1000, X )')
+    assert c.fetchone() == (1,)
+    # the rest of the answer is read before the query is sent
+    assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+    assert engine._cursor is None
+    assert c.fetchone() is None and c.rowcount == 1
+    c = engine.cursor('between( 1, 1000, X )')
+    assert c.fetchmany(2) == [(1,), (2,)]
+    d = engine.cursor('likes( X, Y )')
+    assert c.fetchall() == [] and engine._cursor is d
+    assert d.fetchall() == [('john', 'curry'), ('sandy', 'mushrooms')]
+    c = engine.cursor('between( 1, 1000, X )')
+    c.fetchone()
+    engine.load(os.path.join(LOGIC, 'test_des.pl'))
+    assert c.fetchone() is None
+    assert engine.query('likes( sandy, X )') == [{'X': 'mushrooms'}]
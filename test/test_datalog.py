@@ -0,0 +1,88 @@
+import asyncio
+import os
+
+import pytest
+
+from pyxf.datalog import datalog, DatalogCompileError, DatalogQueryError
+
+LIKES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logic', 'test_des.pl')
+
+
+@pytest.fixture
+def engine():
+    e = datalog()
+    e.load(LIKES)
+    return e
+
+
+def test_query(engine):
+    assert engine.query('likes( X, Y )') == [{'X': 'john', 'Y': 'curry'}, {'X': 'sandy', 'Y': 'mushrooms'}]
+    assert engine.query('likes( john, curry )') is True
+    assert engine.query('likes( nobody, X )') is False
+
+
+def test_negation(engine):
+    assert engine.query('dislikes( john, mushrooms )') is True
+    assert engine.query('dislikes( john, curry )') is False
+    assert {'X': 'sandy', 'Y': 'curry'} in engine.query('dislikes( X, Y )')
+
+
+def test_rules_and_comparisons():
+    engine = datalog()
+    engine.loadfacts(['edge( 1, 2 )', 'edge( 2, 3 )', 'edge( 3, 4 )'])
+    engine.loadfacts(['path( X, Y ) :- edge( X, Y )', 'path( X, Y ) :- edge( X, Z ), path( Z, Y )'])
+    assert engine.query('path( 1, X )') == [{'X': '2'}, {'X': '3'}, {'X': '4'}]
+    assert engine.query('path( X, Y ), Y > 3, X >= 2') == [{'X': '2', 'Y': '4'}, {'X': '3', 'Y': '4'}]
+
+
+def test_numbers_sort_numerically_before_atoms():
+    engine = datalog()
+    engine.loadfacts([('n', v) for v in [10, 2, 'abc', 1, -3, 1.5, 'b10', 100]], 'value')
+    order = ['-3', '1', '1.5', '2', '10', '100', 'abc', 'b10']
+    assert [s['X'] for s in engine.query('value( n, X )')] == order
+    assert [s['X'] for s in engine.iquery('value( n, X )')] == order
+    assert engine.query('value( n, X )', limit=3, offset=2) == [{'X': '1.5'}, {'X': '2'}, {'X': '10'}]
+    assert engine.query('value( n, X )', decode=True, limit=2) == [{'X': -3}, {'X': 1}]
+    assert engine.query_one('value( n, X )') == {'X': '-3'}
+
+
+def test_loadfacts(engine, tmp_path):
+    assert engine.loadfacts(['', 'likes( ann, tea )', '   ', '\n', '.', 'likes( bob, tea ).\n']) == 2
+    assert engine.query('likes( X, tea )') == [{'X': 'ann'}, {'X': 'bob'}]
+    path = tmp_path / 'facts.dl'
+    path.write_text('likes( cid, tea ).\n\n  \nlikes( dan, tea ).\n')
+    with open(str(path)) as f:
+        assert engine.loadfacts(f) == 2
+    assert len(engine.query('likes( X, tea )')) == 4
+
+
+def test_loadfacts_single_values(engine):
+    assert engine.loadfacts(['curry', 'tea', 42, 2.5], 'food') == 4
+    assert engine.query('food( X )', decode=True) == [{'X': 2.5}, {'X': 42}, {'X': 'curry'}, {'X': 'tea'}]
+    assert engine.loadfacts([['ann', 'tea'], ('bob', 3)], 'drinks') == 2
+    assert engine.query('drinks( X, Y )') == [{'X': 'ann', 'Y': 'tea'}, {'X': 'bob', 'Y': '3'}]
+
+
+def test_resultset(engine):
+    result = engine.query('likes( X, Y )', resultset=True)
+    assert result.names == ('X', 'Y')
+    assert list(result) == [('john', 'curry'), ('sandy', 'mushrooms')]
+
+
+def test_errors(engine, tmp_path):
+    with pytest.raises(DatalogQueryError):
+        engine.query('unknown( X )')
+    with pytest.raises(DatalogQueryError):
+        engine.query('likes( X, ')
+    with pytest.raises(DatalogCompileError):
+        engine.load(str(tmp_path / 'missing.dl'))
+    results = engine.query_batch(['likes( X, curry )', 'unknown( X )'])
+    assert results[0] == [{'X': 'john'}]
+    assert isinstance(results[1], DatalogQueryError)
+
+
+def test_coroutines(engine):
+    async def session():
+        await engine.aloadfacts([('ann', 'curry')], 'likes')
+        return await engine.aquery('likes( X, curry )')
+    assert asyncio.run(session()) == [{'X': 'ann'}, {'X': 'john'}]
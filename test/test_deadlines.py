@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from conftest import spawn, module
+
+
+def test_query_within_its_deadline(engine):
+    assert engine.query('likes( X, curry )', timeout=5) == [{'X': 'john'}]
+
+
+def test_deadline_interrupts_the_query(engine):
+    start = time.time()
+    with pytest.raises(engine.QueryTimeout) as e:
+        engine.query('sleep( 30 )', timeout=0.5)
+    assert time.time() - start < 10
+    assert 'deadline of 0.5 seconds' in str(e.value)
+    assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+    assert engine.query_batch(['likes( sandy, X )', 'member( X, [1] )']) == [[{'X': 'mushrooms'}], [{'X': '1'}]]
+
+
+@pytest.mark.parametrize('dialect', ['xsb', 'swipl', 'eclipse'])
+def test_interrupted_engine_keeps_its_process(dialect):
+    engine = spawn(dialect, 'pty')
+    try:
+        engine.load(module(dialect))
+        pid = engine.engine.pid
+        with pytest.raises(engine.QueryTimeout) as e:
+            engine.query('sleep( 30 )', timeout=0.5)
+        assert 'interrupted' in str(e.value)
+        assert engine.engine.pid == pid
+        assert engine.query('likes( sandy, X )') == [{'X': 'mushrooms'}]
+    finally:
+        engine.close()
+
+
+@pytest.mark.parametrize('transport', ['pty', 'pipe'])
+def test_unresponsive_engine_is_restarted(transport):
+    engine = spawn('xsb', transport, '--nointerrupt')
+    try:
+        engine.recovery = 1
+        engine.load(module('xsb'))
+        pid = engine.engine.pid
+        with pytest.raises(engine.QueryTimeout) as e:
+            engine.query('sleep( 30 )', timeout=0.5)
+        assert 'restarted' in str(e.value)
+        assert engine.engine.pid != pid
+        assert engine.modules == (module('xsb'),)
+        assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+    finally:
+        engine.close()
+
+
+@pytest.mark.parametrize('transport', ['pty', 'pipe'])
+def test_query_without_deadline_takes_as_long_as_it_needs(transport):
+    # longer than the 5 seconds the engine process is spawned with
+    engine = spawn('xsb', transport)
+    try:
+        engine.load(module('xsb'))
+        assert engine.query('sleep( 7 ), X = 1') == [{'X': '1'}]
+        assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+    finally:
+        engine.close()
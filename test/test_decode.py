@@ -0,0 +1,65 @@
+import pytest
+
+from pyxf.pyxf import decode, Term
+
+
+@pytest.mark.parametrize('text, value', [
+    ('42', 42),
+    ('-7', -7),
+    ('2.5', 2.5),
+    ('1.0e10', 1.0e10),
+    ('-3e2', -3e2),
+    ('atom', 'atom'),
+    ("'A b'", 'A b'),
+    ("'it''s'", "it's"),
+    ("'a\\nb'", 'a\nb'),
+    ("'\\x41\\'", 'A'),
+    ('"str"', 'str'),
+    ('"2020-01-01"^^\\date', '2020-01-01'),
+    ('[]', []),
+    ('[a,1,2.5]', ['a', 1, 2.5]),
+    ('[[1],[]]', [[1], []]),
+    ('f(x,g(y))', Term('f', ('x', Term('g', ('y',))))),
+    ("'hello world'(1)", Term('hello world', (1,))),
+    ('f( a , [ b ] )', Term('f', ('a', ['b']))),
+    ('[a|b]', Term('[|]', ('a', 'b'))),
+    ('[a|[b]]', ['a', 'b']),
+    ('{a,b}', Term('{}', (Term(',', ('a', 'b')),))),
+    ('+(1,2)', Term('+', (1, 2))),
+    ('X', 'X'),
+    ('_G123', '_G123'),
+    ('?x', '?x'),
+])
+def test_decode(text, value):
+    assert decode(text) == value
+
+
+@pytest.mark.parametrize('text', ['a + b', 'f(', 'f(a', '[a,b', 'a b', '(a,b)', 'f(a))'])
+def test_not_a_term(text):
+    assert decode(text) == text
+
+
+def test_deep_terms():
+    # the parser keeps its own stack, so nesting is not limited by recursion
+    text = 'f(' * 5000 + 'x' + ')' * 5000
+    value = decode(text)
+    for i in range(5000):
+        assert value.name == 'f' and value.arity == 1
+        value = value[0]
+    assert value == 'x'
+
+
+def test_terms():
+    term = decode('point(1,2)')
+    assert (term.name, term.arity, term[1]) == ('point', 2, 2)
+    assert term == Term('point', [1, 2]) and term != Term('point', [2, 1])
+    assert hash(term) == hash(Term('point', (1, 2)))
+    assert repr(term) == 'point(1, 2)'
+
+
+def test_decoded_queries(engine):
+    query = "member( X, [f( 'a b', [1, 2.5] )] ), Y = 10, Z = 'it''s'"
+    assert engine.query(query, decode=True) == [{'X': Term('f', ('a b', [1, 2.5])), 'Y': 10, 'Z': "it's"}]
+    assert engine.query(query, decode='Y') == [{'X': 'f(a b,[1,2.5])', 'Y': 10, 'Z': "it's"}]
+    result = engine.query('member( X, [1, 2] ), Y = X', decode=['X'], resultset=True)
+    assert result['X'] == [1, 2] and result['Y'] == ['1', '2']
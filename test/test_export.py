@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from conftest import LOGIC
+from pyxf.bench import fake
+from pyxf.pyxf import des, DESQueryError, DESQueryTimeout, Term
+
+
+def spawn_des(*options):
+    '''Starts the des backend on the stand-in engine of pyxf.bench.fake.'''
+    engine = des(*fake.command('des', *options))
+    engine.load(os.path.join(LOGIC, 'test_des.pl'))
+    return engine
+
+
+def test_export(engine, tmp_path):
+    path = str(tmp_path / 'likes.csv')
+    reader = engine.export("likes( X, Y ) ; X = 'a, b', Y = f( 1, [x] )", path)
+    assert reader.names == ['X', 'Y']
+    assert list(reader) == [('john', 'curry'), ('sandy', 'mushrooms'), ('a, b', Term('f', (1, ['x'])))]
+    reader.close()
+    reader = engine.export('member( X, [1, 2] )', str(tmp_path / 'numbers.tsv'), 'tsv', typed=False)
+    assert list(reader) == [('1',), ('2',)]
+    reader.close()
+
+
+def test_export_errors(engine, tmp_path):
+    with pytest.raises(engine.QueryError):
+        engine.export('undefined( X )', str(tmp_path / 'none.csv'))
+    assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+    with pytest.raises(ValueError):
+        engine.export('likes( X, Y )', str(tmp_path / 'likes.xml'), 'xml')
+
+
+def test_des_export_waits_for_the_answer(tmp_path):
+    # every query takes longer than any quiet period the answer could be mistaken for
+    engine = spawn_des('--delay', '0.5')
+    try:
+        path = str(tmp_path / 'likes.csv')
+        reader = engine.export('likes( X, Y )', path)
+        assert reader.names == ['X', 'Y']
+        assert list(reader) == [('john', 'curry'), ('sandy', 'mushrooms')]
+        reader.close()
+        assert not os.path.exists(path + '.des')
+        assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+    finally:
+        engine.close()
+
+
+def test_des_export_errors(tmp_path):
+    engine = spawn_des()
+    try:
+        with pytest.raises(DESQueryError) as e:
+            engine.export('undefined( X )', str(tmp_path / 'none.csv'))
+        assert 'undefined' in str(e.value)
+        assert engine.query('likes( sandy, X )') == [{'X': 'mushrooms'}]
+    finally:
+        engine.close()
+
+
+def test_des_export_deadline(tmp_path):
+    engine = spawn_des('--delay', '3')
+    try:
+        with pytest.raises(DESQueryTimeout):
+            engine.export('likes( X, Y )', str(tmp_path / 'likes.csv'), timeout=1)
+    finally:
+        engine.close()
@@ -0,0 +1,87 @@
+import pytest
+
+from test_pool import LIKES
+from pyxf.datalog import datalog, DatalogQueryError
+from pyxf.federation import Federation, FederationError, variable
+from pyxf.pool import EnginePool
+
+
+@pytest.fixture
+def federation():
+    '''Federation of two datalog engines, likes( person, food ) in one and food facts in the other.'''
+    people = datalog()
+    people.load(LIKES)
+    food = datalog()
+    food.loadfacts([('curry', 'hot'), ('mushrooms', 'mild'), ('tea', 'mild')], 'taste')
+    food.loadfacts([('curry', 12), ('tea', 3)], 'price')
+    with Federation({'people': people, 'food': food}) as f:
+        yield f
+
+
+def test_join(federation):
+    answer = federation.query([('people', 'likes( Person, Food )'), ('food', 'taste( Food, Taste )')])
+    assert sorted(answer, key=lambda s: s['person']) == [{'person': 'john', 'food': 'curry', 'taste': 'hot'},
+                                                         {'person': 'sandy', 'food': 'mushrooms', 'taste': 'mild'}]
+    # mushrooms have no price
+    answer = federation.query({'people': 'likes( Person, Food )', 'food': 'price( Food, Price )'})
+    assert answer == [{'person': 'john', 'food': 'curry', 'price': '12'}]
+    assert federation.query([('people', 'likes( X, Food )'), ('food', 'price( Food, P ), P > 100')]) is False
+
+
+def test_join_without_shared_variables(federation):
+    answer = federation.query([('people', 'likes( P, curry )'), ('food', 'price( F, X )')])
+    assert sorted(answer, key=lambda s: s['f']) == [{'p': 'john', 'f': 'curry', 'x': '12'}, {'p': 'john', 'f': 'tea', 'x': '3'}]
+    assert federation.query([('people', 'likes( john, curry )'), ('food', 'taste( tea, mild )')]) is True
+    assert federation.query([('people', 'likes( john, curry )'), ('food', 'taste( tea, hot )')]) is False
+
+
+def test_join_on_several_parts(federation):
+    answer = federation.query([('food', 'price( Food, Price )'), ('people', 'likes( Who, Food )'), ('food', 'taste( Food, T )')])
+    assert answer == [{'food': 'curry', 'price': '12', 'who': 'john', 't': 'hot'}]
+
+
+def test_decoded_join(federation):
+    federation.engines['people'].loadfacts([('john', 12)], 'budget')
+    answer = federation.query([('people', 'budget( Person, Price )'), ('food', 'price( Food, Price )')], decode=True)
+    assert answer == [{'person': 'john', 'price': 12, 'food': 'curry'}]
+
+
+def test_union(federation):
+    answer = federation.query([('people', 'likes( X, Y )'), ('food', 'taste( Y, mild )')], how='union')
+    assert answer == [{'x': 'john', 'y': 'curry'}, {'x': 'sandy', 'y': 'mushrooms'}, {'y': 'mushrooms'}, {'y': 'tea'}]
+    # duplicates are dropped
+    answer = federation.query([('people', 'likes( X, curry )'), ('people', 'likes( X, curry )')], how='union')
+    assert answer == [{'x': 'john'}]
+    assert federation.query([('people', 'likes( X, tea )'), ('food', 'taste( X, cold )')], how='union') is False
+
+
+def test_variable_names(federation):
+    assert variable('?Person') == variable('Person') == variable('PERSON') == 'person'
+    assert variable('?_x') == '_x'
+    answer = federation.query([('people', 'likes( PERSON, Food )'), ('food', 'taste( FOOD, hot )')])
+    assert answer == [{'person': 'john', 'food': 'curry'}]
+    with pytest.raises(FederationError) as e:
+        federation.query([('people', 'likes( Person, PERSON )')])
+    assert 'clash' in str(e.value)
+
+
+def test_errors(federation):
+    with pytest.raises(DatalogQueryError) as e:
+        federation.query([('people', 'likes( X, Y )'), ('food', 'unknown( Y )')])
+    assert 'unknown' in str(e.value)
+    with pytest.raises(FederationError):
+        federation.query([('people', 'likes( X, Y )'), ('nowhere', 'likes( X, Y )')])
+    with pytest.raises(ValueError):
+        federation.query([('people', 'likes( X, Y )')], how='intersect')
+    assert federation.query([]) is False
+    # the engines are usable after a failed part
+    assert federation.query([('food', 'taste( curry, T )')]) == [{'t': 'hot'}]
+
+
+def test_pool_member():
+    with Federation({'pool': EnginePool(datalog, 2, [LIKES]), 'one': datalog()}) as federation:
+        federation.engines['one'].loadfacts([('curry', 'hot')], 'taste')
+        parts = [('pool', 'likes( X, Food )'), ('one', 'taste( Food, T )')]
+        assert federation.query(parts) == [{'x': 'john', 'food': 'curry', 't': 'hot'}]
+        with pytest.raises(DatalogQueryError):
+            federation.query([('pool', 'unknown( X )'), ('one', 'taste( Food, T )')])
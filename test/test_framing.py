@@ -0,0 +1,78 @@
+import pytest
+
+from conftest import spawn
+from pyxf.bench import fake
+from pyxf.pyxf import eclipsepeer
+
+# values that resemble the prompts and error messages of the engines or span several lines
+tricky = ['a\nb', 'čaj\n2', '| ?- ', '?- ', '[eclipse 3]: ', 'ERROR: none', '++Error[XSB]: none', 'Abort', 'yes', '']
+
+
+def codes(value):
+    return '[' + ','.join(str(ord(c)) for c in value) + ']'
+
+
+def test_solutions(engine):
+    assert engine.query('likes( X, Y )') == [{'X': 'john', 'Y': 'curry'}, {'X': 'sandy', 'Y': 'mushrooms'}]
+    assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+    assert engine.query('likes( nobody, X )') is False
+
+
+def test_yes_no(engine):
+    assert engine.query('likes( john, curry )') is True
+    assert engine.query('likes( john, mushrooms )') is False
+    assert engine.query('dislikes( john, mushrooms )') is True
+
+
+@pytest.mark.parametrize('value', tricky)
+def test_values_stay_in_their_record(engine, value):
+    assert engine.query('atom_codes( X, ' + codes(value) + ' ), Y = 1') == [{'X': value, 'Y': '1'}]
+    assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+
+
+def test_many_solutions(engine):
+    result = engine.query('between( 1, 3000, X )')
+    assert [s['X'] for s in result] == [str(i) for i in range(1, 3001)]
+
+
+def test_errors(engine):
+    with pytest.raises(engine.QueryError) as e:
+        engine.query('undefined_predicate( X )')
+    assert 'undefined_predicate' in str(e.value)
+    with pytest.raises(engine.QueryError):
+        engine.query('likes( X, )')
+    assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+
+
+def test_error_after_solutions(engine):
+    with pytest.raises(engine.QueryError) as e:
+        engine.query('member( X, [1, 2] ), X > 1, throw( oops )')
+    assert 'oops' in str(e.value)
+    assert engine.query('likes( sandy, X )') == [{'X': 'mushrooms'}]
+
+
+@pytest.mark.parametrize('helper', [True, False])
+def test_prepared_queries(engine, helper):
+    # with helper the printing goal becomes the body of an asserted clause
+    likes = engine.prepare('likes( ?, Y )', helper)
+    assert likes.query('john') == [{'Y': 'curry'}]
+    assert likes.query_batch([('sandy',), ('nobody',)]) == [[{'Y': 'mushrooms'}], False]
+
+
+@pytest.mark.parametrize('dialect', ['xsb', 'swipl', 'eclipse'])
+def test_error_leaves_no_bindings_at_the_toplevel(dialect):
+    # the toplevel writes the bindings a goal leaves and waits for an answer, the error variable of the printer must not be one
+    engine = spawn(dialect, 'pty')
+    try:
+        for i in range(3):
+            with pytest.raises(engine.QueryError):
+                engine.query('throw( oops )')
+        assert engine.query('member( X, [1] )') == [{'X': '1'}]
+    finally:
+        engine.close()
+
+
+def test_eclipsepeer_refuses_pty():
+    # a terminal turns line ends into two bytes, which breaks the frame lengths
+    with pytest.raises(ValueError):
+        eclipsepeer(*fake.command('eclipse'), transport='pty')
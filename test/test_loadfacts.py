@@ -0,0 +1,25 @@
+def test_fact_strings(engine):
+    assert engine.loadfacts(['likes( ann, tea )', 'likes( bob, tea ).', '  likes( cid, tea ) .  ']) == 3
+    assert engine.query('likes( X, tea )') == [{'X': 'ann'}, {'X': 'bob'}, {'X': 'cid'}]
+    assert engine.query('likes( john, curry )') is True
+
+
+def test_blank_fact_strings_are_skipped(engine):
+    assert engine.loadfacts(['', 'likes( ann, tea )', '   ', '\n', '.', 'likes( bob, tea )\n']) == 2
+    assert engine.query('likes( X, tea )') == [{'X': 'ann'}, {'X': 'bob'}]
+
+
+def test_tuples(engine):
+    counts = []
+    facts = [('n%d' % i, i) for i in range(25)]
+    assert engine.loadfacts(facts, 'number', counts.append) == 25
+    assert counts == [25]
+    assert engine.query('number( n7, X )') == [{'X': '7'}]
+
+
+def test_file_lines(engine, tmp_path):
+    path = tmp_path / 'facts.pl'
+    path.write_text('likes( ann, tea ).\n\nlikes( bob, tea ).\n\n')
+    with open(str(path)) as f:
+        assert engine.loadfacts(f) == 2
+    assert engine.query('likes( X, tea )') == [{'X': 'ann'}, {'X': 'bob'}]
@@ -0,0 +1,142 @@
+import asyncio
+import warnings
+
+import pytest
+
+from pyxf.pyxf import CallStats, Metrics
+
+
+@pytest.fixture
+def calls(engine):
+    '''CallStats of every observed call of engine.'''
+    seen = []
+    engine.observer = seen.append
+    yield seen
+    engine.observer = None
+
+
+def test_query(engine, calls):
+    assert engine.query('likes( X, Y )') == [{'X': 'john', 'Y': 'curry'}, {'X': 'sandy', 'Y': 'mushrooms'}]
+    assert engine.query('likes( john, curry )') is True
+    assert engine.query('likes( nobody, X )') is False
+    assert [(c.backend, c.kind, c.text, c.solutions, c.errors, c.error) for c in calls] == [
+        (engine.name, 'query', 'likes( X, Y )', 2, 0, None),
+        (engine.name, 'query', 'likes( john, curry )', 1, 0, None),
+        (engine.name, 'query', 'likes( nobody, X )', 0, 0, None)]
+    for c in calls:
+        assert c.bytes > 0 and c.read > 0 and c.write > 0
+        assert c.total >= c.build + c.write + c.read
+        assert c.parse == pytest.approx(c.total - c.build - c.write - c.read)
+
+
+def test_query_error(engine, calls):
+    with pytest.raises(engine.QueryError) as e:
+        engine.query('throw( oops )')
+    assert len(calls) == 1
+    assert (calls[0].kind, calls[0].errors, calls[0].solutions) == ('query', 1, 0)
+    assert calls[0].error is e.value
+
+
+def test_query_batch(engine, calls):
+    results = engine.query_batch(['likes( X, curry )', 'throw( oops )', 'member( X, [1, 2, 3] )'])
+    assert isinstance(results[1], engine.QueryError)
+    # one CallStats for the batch, none for the queries in it
+    assert len(calls) == 1
+    assert (calls[0].kind, calls[0].text, calls[0].solutions, calls[0].errors, calls[0].error) == ('query_batch', '3 queries', 4, 1, None)
+
+
+def test_prepared(engine, calls):
+    prepared = engine.prepare('likes( ?, Food )')
+    del calls[:]
+    assert prepared.query('john') == [{'Food': 'curry'}]
+    assert prepared.query_batch([('john',), ('sandy',)]) == [[{'Food': 'curry'}], [{'Food': 'mushrooms'}]]
+    assert [(c.kind, c.solutions) for c in calls] == [('query', 1), ('query_batch', 2)]
+    assert calls[1].text == '2 rows of ' + prepared.template
+
+
+def test_load(engine, calls, tmp_path):
+    kb = tmp_path / 'kb.pl'
+    kb.write_text('drinks( ann, tea ).\n')
+    engine.load(str(kb))
+    assert [(c.kind, c.text, c.errors) for c in calls] == [('load', str(kb), 0)]
+    with pytest.raises(Exception):
+        engine.load(str(tmp_path / 'missing.pl'))
+    assert [(c.kind, c.errors) for c in calls[1:]] == [('load', 1)]
+
+
+def test_async(engine, calls):
+    assert asyncio.run(engine.aquery('likes( X, curry )')) == [{'X': 'john'}]
+    asyncio.run(engine.aquery_batch(['likes( sandy, X )', 'throw( oops )']))
+    assert [(c.kind, c.solutions, c.errors) for c in calls] == [('query', 1, 0), ('query_batch', 1, 1)]
+    assert all(c.read > 0 and c.bytes > 0 for c in calls)
+
+
+def test_failing_observer(engine):
+    def observer(stats):
+        raise ValueError('broken')
+    engine.observer = observer
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+    assert len(caught) == 1 and 'broken' in str(caught[0].message)
+
+
+def test_metrics(engine):
+    metrics = engine.observer = Metrics()
+    for n in range(5):
+        engine.query('member( X, [1, 2] )')
+    with pytest.raises(engine.QueryError):
+        engine.query('throw( oops )')
+    engine.query_batch(['likes( X, curry )', 'throw( oops )'])
+    snapshot = metrics.snapshot()
+    assert list(snapshot) == [engine.name]
+    query, batch = snapshot[engine.name]['query'], snapshot[engine.name]['query_batch']
+    assert (query['calls'], query['solutions'], query['errors']) == (6, 10, 1)
+    assert (batch['calls'], batch['solutions'], batch['errors']) == (1, 1, 1)
+    assert query['bytes'] > 0
+    for phase in CallStats.phases:
+        assert sorted(query[phase]) == ['p50', 'p95', 'p99']
+        assert query[phase]['p50'] <= query[phase]['p95'] <= query[phase]['p99']
+    assert query['total']['p50'] > 0 and query['read']['p50'] > 0
+    metrics.reset()
+    assert metrics.snapshot() == {}
+    engine.query('likes( X, curry )')
+    assert metrics.snapshot()[engine.name]['query']['calls'] == 1
+
+
+def stats(backend, kind, seconds, solutions=1, errors=0):
+    s = CallStats(backend, kind, 'q')
+    s.read = s.total = seconds
+    s.solutions = solutions
+    s.errors = errors
+    return s
+
+
+def test_percentiles():
+    metrics = Metrics()
+    for n in range(1, 101):
+        metrics(stats('XSB', 'query', n / 1000.0))
+    read = metrics.snapshot(percentiles=(10, 50, 90, 100))['XSB']['query']['read']
+    for q, seconds in [(10, 0.010), (50, 0.050), (90, 0.090), (100, 0.100)]:
+        # the upper bound of a bucket 5% wide
+        assert seconds <= read['p' + str(q)] <= seconds * Metrics.base
+    # phases that took no time
+    assert metrics.snapshot()['XSB']['query']['build'] == {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+
+
+def test_backends_and_kinds():
+    metrics = Metrics()
+    metrics(stats('XSB', 'query', 0.01, solutions=3))
+    metrics(stats('XSB', 'load', 0.02, solutions=0))
+    metrics(stats('SWI', 'query', 0.01, solutions=0, errors=1))
+    snapshot = metrics.snapshot()
+    assert sorted(snapshot) == ['SWI', 'XSB'] and sorted(snapshot['XSB']) == ['load', 'query']
+    assert (snapshot['XSB']['query']['calls'], snapshot['XSB']['query']['solutions']) == (1, 3)
+    assert snapshot['SWI']['query']['errors'] == 1
+
+
+def test_count():
+    s = CallStats('XSB', 'query_batch', '4 queries')
+    for result in [[{'X': '1'}, {'X': '2'}], True, False, ValueError('oops')]:
+        s.count(result)
+    assert (s.solutions, s.errors) == (3, 1)
@@ -0,0 +1,47 @@
+import pytest
+
+from conftest import spawn
+
+numbers = 'member( X, [1, 2, 3, 4, 5] )'
+
+
+def test_limit_and_offset(engine):
+    assert engine.query(numbers, limit=2) == [{'X': '1'}, {'X': '2'}]
+    assert engine.query(numbers, limit=2, offset=2) == [{'X': '3'}, {'X': '4'}]
+    assert engine.query(numbers, offset=3) == [{'X': '4'}, {'X': '5'}]
+    assert engine.query(numbers, limit=10, offset=4) == [{'X': '5'}]
+    assert engine.query(numbers, limit=2, offset=5) is False
+    assert engine.query(numbers, limit=0) is False
+    assert engine.query(numbers, limit=2, decode=True, resultset=True)['X'] == [1, 2]
+    with pytest.raises(ValueError):
+        engine.query(numbers, limit=-1)
+
+
+def test_solutions_after_the_page_are_not_computed(engine):
+    query = 'member( X, [1, 2, 3] ), ( X > 2 -> throw( computed ) ; true )'
+    assert engine.query(query, limit=2) == [{'X': '1'}, {'X': '2'}]
+
+
+def test_query_one(engine):
+    assert engine.query_one('likes( X, Y )') == {'X': 'john', 'Y': 'curry'}
+    assert engine.query_one('likes( john, curry )') == {}
+    assert engine.query_one('likes( nobody, X )') is None
+    assert engine.query_one('member( X, [1, 2] )', decode=True) == {'X': 1}
+
+
+def test_pages_in_a_batch(engine):
+    items = [engine._item(numbers + '.', page=(1, 2)), engine._item(numbers + '.', page=(0, 1))]
+    assert engine._batch_items(items) == [[{'X': '2'}, {'X': '3'}], [{'X': '1'}]]
+
+
+@pytest.mark.parametrize('dialect', ['xsb', 'swipl', 'eclipse'])
+@pytest.mark.parametrize('page', [(0, 1), (1, 2), (2, None)])
+def test_page_goal_leaves_no_bindings(dialect, page):
+    # the toplevel writes the bindings a goal leaves and waits for an answer instead of prompting
+    engine = spawn(dialect, 'pty')
+    try:
+        engine._sendline(engine._page('(' + numbers + ')', 'write(X),nl', page) + '.')
+        assert engine.engine.expect([engine.prompt, '[A-Z][a-zA-Z0-9_]* = '], timeout=5) == 0
+        assert engine.query_one(numbers, decode=True) == {'X': 1}
+    finally:
+        engine.close()
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from pyxf.datalog import datalog, DatalogCompileError
+from pyxf.pool import EnginePool, EnginePoolBroadcastError
+
+LOGIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logic')
+LIKES = os.path.join(LOGIC, 'test_des.pl')
+
+
+class flaky(datalog):
+    '''datalog engine whose next loads of a module fail, see failures.'''
+    failures = {}  # module -> number of load() calls still to fail
+
+    def load(self, module, timeout=None):
+        if flaky.failures.get(module):
+            flaky.failures[module] -= 1
+            raise DatalogCompileError('Cannot load "' + module + '".')
+        datalog.load(self, module, timeout)
+
+
+@pytest.fixture
+def kb(tmp_path):
+    path = tmp_path / 'kb.dl'
+    path.write_text('cheap( curry ).\n')
+    return str(path)
+
+
+def test_query_and_map():
+    with EnginePool(datalog, 2, [LIKES]) as pool:
+        assert len(pool) == 2
+        assert pool.query('likes( john, Y )') == [{'Y': 'curry'}]
+        assert pool.map(['likes( X, curry )', 'likes( X, mushrooms )']) == [[{'X': 'john'}], [{'X': 'sandy'}]]
+
+
+def test_load_reaches_every_engine(kb):
+    with EnginePool(datalog, 3, [LIKES]) as pool:
+        pool.load(kb)
+        assert pool.modules == [LIKES, kb]
+        assert [e.query('cheap( X )') for e in pool.engines] == [[{'X': 'curry'}]] * 3
+
+
+def test_broadcast_calls_every_engine_after_a_failure(kb):
+    flaky.failures = {kb: 1}
+    with EnginePool(flaky, 3, [LIKES]) as pool:
+        before = list(pool.engines)
+        with pytest.raises(EnginePoolBroadcastError) as e:
+            pool.load(kb)
+        results = e.value.results
+        assert len(results) == 3
+        assert isinstance(results[0], DatalogCompileError)
+        assert results[1:] == [None, None]
+        # the engines that loaded the module differ from the pool, so all were replaced
+        assert pool.modules == [LIKES]
+        assert len(pool) == 3
+        assert not set(before) & set(pool.engines)
+        for engine in pool.engines:
+            assert engine.modules == (LIKES,)
+            assert engine.query('likes( john, Y )') == [{'Y': 'curry'}]
+
+
+def test_broadcast_failing_everywhere_raises_the_engine_error(tmp_path):
+    with EnginePool(datalog, 2, [LIKES]) as pool:
+        with pytest.raises(DatalogCompileError):
+            pool.load(str(tmp_path / 'missing.dl'))
+        assert pool.modules == [LIKES]
+        assert len(pool) == 2
+        assert pool.broadcast('query', 'likes( sandy, Y )') == [[{'Y': 'mushrooms'}]] * 2
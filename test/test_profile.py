@@ -0,0 +1,48 @@
+import pytest
+
+from conftest import spawn, module
+
+# the stand-in engine has no sampling profiler, which swipl runs around profiled queries
+profiled = [(dialect, transport) for dialect in ('xsb', 'eclipse') for transport in ('pty', 'pipe')]
+statistics = {'XSB': ['cputime', 'tablespace'], 'ECLiPSe': ['cputime']}
+
+
+@pytest.fixture(params=profiled, ids=['-'.join(p) for p in profiled])
+def engine(request):
+    e = spawn(*request.param)
+    e.load(module(request.param[0]))
+    yield e
+    e.close()
+
+
+def test_profile(engine):
+    result, report = engine.profile('likes( X, Y )')
+    assert result == [{'X': 'john', 'Y': 'curry'}, {'X': 'sandy', 'Y': 'mushrooms'}]
+    assert sorted(report.statistics) == statistics[engine.name]
+    assert all(value >= 0 for value in report.statistics.values())
+    assert report.query == 'likes( X, Y ).'
+    # the toplevel got no bindings to write, so the engine is at its prompt again
+    assert engine.query('likes( X, curry )') == [{'X': 'john'}]
+
+
+def test_profile_options(engine):
+    result, report = engine.profile('member( X, [1, 2, 3] )', decode=True, limit=2, offset=1)
+    assert result == [{'X': 2}, {'X': 3}]
+    result, report = engine.profile('likes( john, curry )')
+    assert result is True and 'cputime' in report.statistics
+    result, report = engine.profile('member( X, [1, 2] )', resultset=True)
+    assert result['X'] == ['1', '2']
+
+
+def test_profiler(engine):
+    reports = []
+    engine.profiler = reports.append
+    engine.query('likes( X, curry )')
+    engine.query('likes( sandy, X )')
+    assert [r.query for r in reports] == ['likes( X, curry ).', 'likes( sandy, X ).']
+
+
+def test_profile_errors(engine):
+    with pytest.raises(engine.QueryError):
+        engine.profile('throw( oops )')
+    assert engine.query('likes( sandy, X )') == [{'X': 'mushrooms'}]
@@ -0,0 +1,89 @@
+import pytest
+
+from pyxf.pyxf import ResultSet
+
+ROWS = [('john', 'curry'), ('sandy', 'mushrooms'), ('ann', 'tea')]
+
+
+@pytest.fixture
+def rs():
+    return ResultSet(['X', 'Y'], iter(ROWS))
+
+
+def test_columns(rs):
+    assert rs.names == ('X', 'Y')
+    assert rs.columns == [['john', 'sandy', 'ann'], ['curry', 'mushrooms', 'tea']]
+    assert rs['X'] == ['john', 'sandy', 'ann'] and rs['Y'] == ['curry', 'mushrooms', 'tea']
+    with pytest.raises(ValueError):
+        rs['Z']
+    assert ResultSet(['X'], columns=[[1, 2]])['X'] == [1, 2]
+
+
+def test_indexing(rs):
+    assert len(rs) == 3
+    assert rs[0] == ('john', 'curry') and rs[-1] == ('ann', 'tea')
+    with pytest.raises(IndexError):
+        rs[3]
+
+
+def test_slicing(rs):
+    part = rs[1:]
+    assert isinstance(part, ResultSet) and part.names == rs.names
+    assert list(part) == ROWS[1:]
+    assert list(rs[::2]) == [ROWS[0], ROWS[2]]
+    assert len(rs[5:]) == 0 and not rs[5:]
+    part['X'][0] = 'bob'  # slices copy the columns
+    assert rs['X'][1] == 'sandy'
+
+
+def test_iteration(rs):
+    assert list(rs) == ROWS
+    assert list(rs) == ROWS  # again
+    assert rs.dicts() == [{'X': x, 'Y': y} for x, y in ROWS]
+    assert rs == rs.dicts() and rs == ResultSet(['X', 'Y'], ROWS)
+    assert rs != ResultSet(['Y', 'X'], ROWS) and rs != ROWS[:2]
+    copy = rs.copy()
+    copy['X'].append('joe')
+    assert len(rs['X']) == 3
+    assert repr(rs) == "ResultSet(['X', 'Y'], 3 rows)"
+
+
+def test_generator_rows():
+    def rows():
+        for n in range(1000):
+            yield [n, str(n)]
+    rs = ResultSet(['N', 'S'], rows())
+    assert len(rs) == 1000 and rs[999] == (999, '999') and rs['S'][:2] == ['0', '1']
+
+
+def test_empty():
+    for rs in (ResultSet(['X', 'Y']), ResultSet(['X', 'Y'], iter([])), ResultSet(['X', 'Y'], ROWS)[3:]):
+        assert len(rs) == 0 and not rs
+        assert rs.columns == [[], []] and rs['X'] == []
+        assert list(rs) == [] and rs.dicts() == []
+        assert rs == [] and rs == ResultSet(['X', 'Y'])
+    assert len(ResultSet([])) == 0 and list(ResultSet([])) == []
+
+
+def test_queries(engine):
+    rs = engine.query('likes( X, Y )', resultset=True)
+    assert isinstance(rs, ResultSet) and rs.names == ('X', 'Y')
+    assert list(rs) == [('john', 'curry'), ('sandy', 'mushrooms')]
+    rs = engine.query('likes( nobody, X )', resultset=True)
+    assert isinstance(rs, ResultSet) and not rs and rs.columns == [[]]
+    assert engine.query('likes( john, curry )', resultset=True) is True
+    rs = engine.query('between( 1, 500, X )', resultset=True, decode=True)
+    assert rs['X'] == list(range(1, 501))
+
+
+def test_numpy(rs):
+    pytest.importorskip('numpy')
+    assert rs.to_numpy('X').tolist() == ['john', 'sandy', 'ann']
+    assert rs.to_numpy().shape == (3, 2)
+    assert ResultSet(['X']).to_numpy().shape == (0, 1)
+
+
+def test_pandas(rs):
+    pytest.importorskip('pandas')
+    frame = rs.to_pandas()
+    assert list(frame.columns) == ['X', 'Y'] and frame['Y'].tolist() == ['curry', 'mushrooms', 'tea']
@@ -0,0 +1,114 @@
+import socket
+import threading
+
+import pytest
+
+from test_pool import flaky, LIKES
+from pyxf.datalog import datalog
+from pyxf.pool import EnginePoolBroadcastError
+from pyxf.pyxf import ResultSet
+from pyxf.server import EngineServer, EngineServerError, client, main, send, receive
+
+
+@pytest.fixture(params=['unix', 'tcp'])
+def server(request, tmp_path):
+    address = str(tmp_path / 'pyxf.sock') if request.param == 'unix' else ('127.0.0.1', 0)
+    with EngineServer(datalog, address, 2, [LIKES]) as s:
+        s.start()
+        yield s
+
+
+def test_queries(server):
+    with client(server.address) as c:
+        assert c.query('likes( X, curry )') == [{'X': 'john'}]
+        assert c.query('likes( john, curry )') is True
+        assert c.query_one('likes( X, Y )') == {'X': 'john', 'Y': 'curry'}
+        result = c.query('likes( X, Y )', resultset=True)
+        assert isinstance(result, ResultSet) and result['Y'] == ['curry', 'mushrooms']
+        results = c.query_batch(['likes( sandy, X )', 'unknown( X )'])
+        assert results[0] == [{'X': 'mushrooms'}]
+        assert isinstance(results[1], Exception) and 'unknown' in str(results[1])
+        with pytest.raises(EngineServerError) as e:
+            c.query('unknown( X )')
+        assert 'DatalogQueryError' in str(e.value)
+
+
+def test_requests_run_concurrently(server):
+    with client(server.address) as c:
+        answers = {}
+
+        def ask(n):
+            answers[n] = c.query('likes( X, Y )', limit=1, offset=n % 2)
+        threads = [threading.Thread(target=ask, args=(n,)) for n in range(40)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert [answers[n][0]['X'] for n in range(40)] == ['john', 'sandy'] * 20
+
+
+def test_facts_reach_every_engine(server):
+    with client(server.address) as c:
+        assert c.loadfacts([['curry', 'hot']], 'taste') == 1
+        for e in server.pool.engines:
+            assert e.query('taste( curry, X )') == [{'X': 'hot'}]
+
+
+def test_unknown_method(server):
+    sock = socket.socket(socket.AF_UNIX if isinstance(server.address, str) else socket.AF_INET)
+    sock.connect(server.address)
+    try:
+        send(sock, [7, 'close', [], {}])
+        id, ok, error = receive(sock)
+        assert (id, ok, error[0]) == (7, False, 'EngineServerError')
+    finally:
+        sock.close()
+
+
+def test_partial_broadcast_failure(tmp_path):
+    kb = tmp_path / 'kb.dl'
+    kb.write_text('cheap( curry ).\n')
+    flaky.failures = {str(kb): 1}
+    with EngineServer(flaky, str(tmp_path / 'pyxf.sock'), 3, [LIKES]) as s:
+        s.start()
+        before = list(s.pool.engines)
+        with client(s.address) as c:
+            with pytest.raises(EnginePoolBroadcastError) as e:
+                c.load(str(kb))
+            results = e.value.results
+            assert len(results) == 3
+            assert isinstance(results[0], Exception) and 'Cannot load' in str(results[0])
+            assert results[1:] == [None, None]
+            # no engine keeps the module the others lack
+            assert s.pool.modules == [LIKES]
+            assert not set(before) & set(s.pool.engines)
+            assert c.query('likes( john, X )') == [{'X': 'curry'}]
+            with pytest.raises(EngineServerError):
+                c.query('cheap( X )')
+
+
+@pytest.mark.parametrize('host', ['0.0.0.0', ''])
+def test_refuses_public_addresses(host):
+    with pytest.raises(EngineServerError) as e:
+        EngineServer(datalog, (host, 0), 1)
+    assert 'public=True' in str(e.value)
+
+
+def test_command_line_refuses_public_addresses(capsys):
+    with pytest.raises(SystemExit):
+        main(['--backend', 'xsb', '--tcp', '0.0.0.0:0'])
+    assert 'not a loopback address' in capsys.readouterr().err
+
+
+def test_public_opt_in():
+    with EngineServer(datalog, ('0.0.0.0', 0), 1, [LIKES], public=True) as s:
+        s.start()
+        with client(('127.0.0.1', s.address[1])) as c:
+            assert c.query('likes( X, curry )') == [{'X': 'john'}]
+
+
+def test_loopback_addresses():
+    with EngineServer(datalog, ('localhost', 0), 1) as s:
+        assert s.address[1] > 0
+    with EngineServer(datalog, ('127.0.0.1', 0), 1) as s:
+        assert s.address[0] == '127.0.0.1'
@@ -0,0 +1,95 @@
+import pytest
+
+from pyxf.bench import fake
+from pyxf.pyxf import flora2, Flora2FactError
+
+
+@pytest.fixture
+def engine():
+    '''flora2 backend on the stand-in engine, whose shell needs a terminal.'''
+    e = flora2(*fake.command('flora2'))
+    yield e
+    e.close()
+
+
+def likes(engine):
+    answer = engine.query('?x[likes->?y]')
+    return sorted((s['x'], s['y']) for s in answer) if answer else []
+
+
+def test_diff(engine):
+    assert engine.sync(['bob[likes->tomato]', 'ann[likes->tea]', 'joe[likes->rice]']) == (3, 0)
+    assert likes(engine) == [('ann', 'tea'), ('bob', 'tomato'), ('joe', 'rice')]
+    # spacing does not matter, only the difference is sent
+    assert engine.sync(['bob[ likes->tomato ]', 'ann[likes->tea]', 'sue[likes->curry]']) == (1, 1)
+    assert likes(engine) == [('ann', 'tea'), ('bob', 'tomato'), ('sue', 'curry')]
+    assert engine.sync(['bob[likes->tomato]', 'ann[likes->tea]', 'sue[likes->curry]']) == (0, 0)
+
+
+def test_tuples(engine):
+    assert engine.sync([('bob', 'tomato'), ('ann', 'tea')], 'drinks') == (2, 0)
+    assert engine.query('drinks( ?x, tea )') == [{'x': 'ann'}]
+    assert engine.sync([('ann', 'tea')], 'drinks') == (0, 1)
+    assert engine.query('drinks( ?x, ?y )') == [{'x': 'ann', 'y': 'tea'}]
+
+
+def test_batches(engine):
+    engine.batchsize = 40
+    facts = ['p' + str(n) + '[likes->tea]' for n in range(30)]
+    assert engine.sync(facts) == (30, 0)
+    assert len(likes(engine)) == 30
+    assert engine.sync(facts[10:]) == (0, 10)
+    assert [x for x, y in likes(engine)] == sorted('p' + str(n) for n in range(10, 30))
+
+
+def test_named_sets(engine):
+    assert engine.sync(['bob[likes->tomato]', 'ann[likes->tea]'], name='a') == (2, 0)
+    assert engine.sync(['ann[likes->tea]', 'joe[likes->rice]'], name='b') == (2, 0)
+    assert likes(engine) == [('ann', 'tea'), ('bob', 'tomato'), ('joe', 'rice')]
+    # ann[likes->tea] still belongs to b
+    assert engine.sync([], name='a') == (0, 2)
+    assert likes(engine) == [('ann', 'tea'), ('joe', 'rice')]
+    # taking a shared fact into a set sends nothing for it
+    assert engine.sync(['joe[likes->rice]'], name='a') == (1, 0)
+    assert engine.sync([], name='b') == (0, 2)
+    assert likes(engine) == [('joe', 'rice')]
+    assert engine.sync([], name='a') == (0, 1)
+    assert likes(engine) == []
+
+
+def test_empty_set(engine):
+    assert engine.sync([]) == (0, 0)
+    engine.sync(['bob[likes->tomato]', 'ann[likes->tea]'])
+    assert engine.sync([]) == (0, 2)
+    assert likes(engine) == []
+    assert engine.sync(['bob[likes->tomato]']) == (1, 0)
+    assert likes(engine) == [('bob', 'tomato')]
+
+
+def test_rollback(engine):
+    engine.sync(['bob[likes->tomato]', 'ann[likes->tea]'])
+    # a fact deleted behind the back of sync() makes its t_delete{} fail
+    assert engine.query('delete{ann[likes->tea]}') is True
+    with pytest.raises(Flora2FactError) as e:
+        engine.sync(['joe[likes->rice]'])
+    assert 't_delete{' in str(e.value)
+    # the whole command was undone and nothing of it is remembered
+    assert likes(engine) == [('bob', 'tomato')]
+    assert engine.query('insert{ann[likes->tea]}') is True
+    assert engine.sync(['joe[likes->rice]']) == (1, 2)
+    assert likes(engine) == [('joe', 'rice')]
+
+
+def test_partial_failure(engine):
+    engine.batchsize = 1  # one command per fact
+    engine.sync(['bob[likes->tomato]', 'ann[likes->tea]'])
+    assert engine.query('delete{ann[likes->tea]}') is True
+    with pytest.raises(Flora2FactError):
+        engine.sync(['joe[likes->rice]'])
+    # the commands that succeeded are remembered, ann[likes->tea] is still to delete
+    assert likes(engine) == [('joe', 'rice')]
+    assert engine.query('insert{ann[likes->tea]}') is True
+    assert engine.sync(['joe[likes->rice]']) == (0, 1)
+    assert likes(engine) == [('joe', 'rice')]
+    assert engine.sync([]) == (0, 1)
+    assert likes(engine) == []
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+
+import pytest
+
+from conftest import spawn
+
+PATH = 'assertz(( path( X, Y ) :- edge( X, Y ) )), assertz(( path( X, Y ) :- edge( X, Z ), path( Z, Y ) ))'
+
+
+@pytest.fixture(params=['pty', 'pipe'])
+def engine(request):
+    e = spawn('xsb', request.param)
+    yield e
+    e.close()
+
+
+@pytest.fixture
+def goals(engine, monkeypatch):
+    '''Goals the tabling methods of engine run.'''
+    sent = []
+    query = engine._query
+
+    def spy(goal, *args):
+        sent.append(goal)
+        return query(goal, *args)
+    monkeypatch.setattr(engine, '_query', spy)
+    return sent
+
+
+def test_declarations(engine, goals):
+    engine.table('path/2')
+    engine.dynamic(['edge/2'], incremental=True)
+    engine.table(['path/2', 'reach/1'], incremental=True)
+    assert goals == ['table((path/2)).', 'dynamic((edge/2 as incremental)).',
+                     'table((path/2 as incremental)),table((reach/1 as incremental)).']
+    assert engine._tabled == ['path/2', 'reach/1']
+    assert engine.loadfacts([('a', 'b'), ('b', 'c')], 'edge') == 2
+    engine.query(PATH)
+    assert engine.query('path( a, X )') == [{'X': 'b'}, {'X': 'c'}]
+
+
+def test_abolish_tables(engine, goals):
+    engine.abolish_tables()
+    engine.abolish_tables('path/2')
+    engine.abolish_tables(['path/2', 'reach/1'])
+    assert goals == ['abolish_all_tables.', 'abolish_table_pred(path/2).', 'abolish_table_pred(path/2),abolish_table_pred(reach/1).']
+
+
+def test_refresh(engine, goals):
+    engine.table('path/2')
+    engine.loadfacts([('a', 'b')], 'edge')
+    engine.query(PATH)
+    del goals[:]
+    engine.refresh('path/2')
+    engine.refresh(['path/2', 'edge/2'])
+    assert goals == ['(abolish_table_pred(path/2),functor(_G0,path,2),(call(_G0),fail;true)).',
+                     '(abolish_table_pred(path/2),functor(_G0,path,2),(call(_G0),fail;true)),'
+                     '(abolish_table_pred(edge/2),functor(_G1,edge,2),(call(_G1),fail;true)).']
+    assert engine.query('path( X, Y )') == [{'X': 'a', 'Y': 'b'}]
+
+
+def test_tables(engine, monkeypatch):
+    assert engine.tables() == {}  # nothing declared, nothing asked
+    engine.table(['path/2', 'reach/1'])
+    sent = []
+
+    def answer(goal, *args):
+        sent.append(goal)
+        return [{'P': 'path/2', 'C': '3', 'R': '7'}, {'P': 'reach/1', 'C': '0', 'R': '0'}]
+    monkeypatch.setattr(engine, '_query', answer)
+    tables = engine.tables()
+    assert tables == OrderedDict([('path/2', {'calls': 3, 'answers': 7}), ('reach/1', {'calls': 0, 'answers': 0})])
+    assert list(tables) == ['path/2', 'reach/1']
+    assert 'member(P,[path/2,reach/1])' in sent[0]
+    assert 'get_calls(_G,_H,_)' in sent[0] and 'get_returns(_H2,_T)' in sent[0]
+    engine.tables('edge/2')
+    assert 'member(P,[edge/2])' in sent[1]
+
+
+def test_tablespace(engine, monkeypatch):
+    assert engine.tablespace() == {'allocated': 0, 'used': 0}
+    monkeypatch.setattr(engine, '_query', lambda goal, *args: [{'A': '65536', 'U': '1024'}])
+    assert engine.tablespace() == {'allocated': 65536, 'used': 1024}
+
+
+def test_declarations_survive_a_restart(engine, goals):
+    engine.dynamic('edge/2', incremental=True)
+    engine.table('path/2', incremental=True)
+    del goals[:]
+    engine._respawn()
+    assert goals == ['dynamic((edge/2 as incremental)).', 'table((path/2 as incremental)).']
+    assert engine._tabled == ['path/2']